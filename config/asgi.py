@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+if settings.QUIZ_ANSWER_KEY_WARM:
+    from quiz.answer_key import warm
+    warm()
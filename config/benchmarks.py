@@ -0,0 +1,108 @@
+#config\benchmarks.py
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку (ближайший ранг)."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def summarize(latencies, elapsed):
+    """Сводка по длительностям запросов в секундах: перцентили в миллисекундах и пропускная способность."""
+    values = sorted(duration * 1000 for duration in latencies)
+    return {
+        'requests': len(values),
+        'rps': round(len(values) / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(values, 0.50), 2),
+        'p95_ms': round(percentile(values, 0.95), 2),
+        'p99_ms': round(percentile(values, 0.99), 2),
+    }
+
+
+def send(client, method, url, data=None, **extra):
+    """
+    Выполняет запрос тестовым клиентом и дочитывает тело, в том числе потоковое.
+    extra передается клиенту (заголовки, content_type для тел не в JSON).
+    """
+    if 'content_type' not in extra:
+        extra['format'] = 'json'
+    response = getattr(client, method)(url, data, **extra)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def measure(client, method, url, data=None, requests=20, **extra):
+    """
+    Замеряет эндпоинт: один прогревочный запрос, затем число SQL-запросов и пик памяти
+    (tracemalloc) на отдельных запросах и latency на requests запросах подряд.
+    url и data могут быть функциями - тогда они вызываются (сначала url) перед каждым запросом,
+    вне замера: так готовится новый объект для неповторяемых запросов (ответ в сеансе, часть загрузки).
+    """
+    def prepare():
+        return (url() if callable(url) else url), (data() if callable(data) else data)
+
+    response = send(client, method, *prepare(), **extra)
+
+    target = prepare()
+    with CaptureQueriesContext(connection) as queries:
+        send(client, method, *target, **extra)
+    # Каждый следующий запрос очищает connection.queries (сигнал request_started) - считаем сразу
+    query_count = len(queries)
+
+    target = prepare()
+    tracemalloc.start()
+    try:
+        send(client, method, *target, **extra)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies = []
+    elapsed = 0.0
+    for _ in range(requests):
+        target = prepare()
+        request_started = time.perf_counter()
+        send(client, method, *target, **extra)
+        latency = time.perf_counter() - request_started
+        latencies.append(latency)
+        elapsed += latency
+
+    return {
+        'status': response.status_code,
+        'queries': query_count,
+        'peak_memory_kb': round(peak / 1024, 1),
+        **summarize(latencies, elapsed),
+    }
+
+
+def compare(results, baseline, threshold=0.2, noise_ms=1.0):
+    """
+    Сравнивает результаты с сохраненным базовым прогоном того же формата.
+    Регрессия: рост p95 или пика памяти больше чем на threshold (p95 - еще и больше
+    чем на noise_ms), любой рост числа запросов или смена статуса ответа.
+    """
+    regressions = []
+    for size, endpoints in results.items():
+        for name, current in endpoints.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            label = f'{name} [{size}]'
+            if current['status'] != base['status']:
+                regressions.append(f"{label}: статус {base['status']} -> {current['status']}")
+            if current['queries'] > base['queries']:
+                regressions.append(f"{label}: запросов {base['queries']} -> {current['queries']}")
+            if (current['p95_ms'] > base['p95_ms'] * (1 + threshold)
+                    and current['p95_ms'] - base['p95_ms'] > noise_ms):
+                regressions.append(f"{label}: p95 {base['p95_ms']} -> {current['p95_ms']} мс")
+            if current['peak_memory_kb'] > base['peak_memory_kb'] * (1 + threshold):
+                regressions.append(f"{label}: память {base['peak_memory_kb']} -> {current['peak_memory_kb']} КБ")
+    return regressions
@@ -0,0 +1,309 @@
+#config\cache_backends.py
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django_redis.cache import RedisCache
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+LOCAL_OPTIONS = ('LOCAL_MAX_ENTRIES', 'LOCAL_TIMEOUT', 'LOCAL_PREFIXES', 'HEALTH_RETRY_INTERVAL')
+REMOTE_ERRORS = (ConnectionInterrupted, RedisError, OSError)
+
+
+class LocalLRU:
+    """Ограниченный LRU-кэш процесса с TTL. Значения хранятся сериализованными, как в LocMemCache."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            expires, payload = entry
+            if expires <= time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+        return pickle.loads(payload)
+
+    def set(self, key, value, timeout=None):
+        ttl = self.timeout if timeout is None else min(timeout, self.timeout)
+        if ttl <= 0:
+            self.delete(key)
+            return
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.data[key] = (time.monotonic() + ttl, payload)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Кэш из двух уровней: ограниченный LRU в памяти процесса перед django_redis.
+
+    В LRU попадают только ключи с префиксами из LOCAL_PREFIXES. Это неизменяемые записи: ключ
+    включает поколение модели (кэш ответов, списки ID вопросов, счетчики поиска), поэтому при
+    изменении данных пишется новый ключ, а старая запись просто истекает через LOCAL_TIMEOUT секунд.
+    Согласовывать LRU процессов не нужно, и записи не стоят лишних обращений к Redis. Остальные
+    ключи (поколения, версии, снимки пользователей, состояние сеансов и адаптивного режима)
+    меняются на месте и всегда читаются и пишутся напрямую в Redis.
+
+    Доступность Redis проверяется лениво, при первой операции: если Redis не отвечает, кэш на
+    HEALTH_RETRY_INTERVAL секунд переключается на память процесса. Этот резервный кэш у каждого
+    процесса свой: пока Redis недоступен, подъем поколения (bump_generation, версия ключа ответов)
+    и сброс снимка пользователя видит только процесс, который их сделал, а остальные продолжают
+    отдавать прежние ответы из своей памяти. Ключи, измененные delete и incr за время сбоя,
+    запоминаются и удаляются в Redis при восстановлении, чтобы он не вернул устаревшие поколения.
+    Записи set и add, сделанные во время сбоя, в Redis не переносятся.
+    """
+
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS', {}))
+        local_options = {name: options.pop(name) for name in LOCAL_OPTIONS if name in options}
+        super().__init__({**params, 'OPTIONS': options})
+
+        self.remote = RedisCache(location, {**params, 'OPTIONS': options})
+        self.fallback = LocMemCache('two-tier-fallback', {**params, 'OPTIONS': {}})
+        self.local = LocalLRU(
+            max_entries=local_options.get('LOCAL_MAX_ENTRIES', 1000),
+            timeout=local_options.get('LOCAL_TIMEOUT', 5),
+        )
+        self.local_prefixes = tuple(local_options.get('LOCAL_PREFIXES', ()))
+        self.retry_interval = local_options.get('HEALTH_RETRY_INTERVAL', 30)
+
+        self._down_until = 0.0
+        # (ключ, версия), измененные в резервном кэше; удаляются в Redis при восстановлении
+        self._pending = set()
+        self._overflow = False
+        self._pending_lock = threading.Lock()
+
+    # --- доступность Redis ---
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self._down_until
+
+    def _mark_down(self, error):
+        if self.healthy:
+            logger.error("Redis недоступен, кэш переключен на память процесса: %s", error)
+        self._down_until = time.monotonic() + self.retry_interval
+        self.local.clear()
+
+    def _call(self, method, *args, **kwargs):
+        """Вызывает операцию в Redis, а при его недоступности - в локальном резервном кэше."""
+        if self.healthy:
+            try:
+                self._replay()
+                return getattr(self.remote, method)(*args, **kwargs)
+            except REMOTE_ERRORS as e:
+                self._mark_down(e)
+        return getattr(self.fallback, method)(*args, **kwargs)
+
+    def _remember(self, keys, version):
+        """Запоминает ключи, измененные во время сбоя; их число ограничено LOCAL_MAX_ENTRIES."""
+        if self.healthy:
+            return
+        with self._pending_lock:
+            for key in keys:
+                if len(self._pending) >= self.local.max_entries:
+                    if not self._overflow:
+                        logger.warning("Слишком много ключей изменено без Redis, часть не будет сброшена в нем")
+                        self._overflow = True
+                    return
+                self._pending.add((key, version))
+
+    def _replay(self):
+        """Удаляет в Redis ключи, измененные в резервном кэше, пока Redis был недоступен."""
+        if not self._pending:
+            return
+        with self._pending_lock:
+            pending, self._pending, self._overflow = self._pending, set(), False
+        try:
+            for key, version in pending:
+                self.remote.delete(key, version=version)
+        except REMOTE_ERRORS:
+            with self._pending_lock:
+                self._pending |= pending
+            raise
+        logger.info("Redis снова доступен, сброшено ключей, измененных во время сбоя: %s", len(pending))
+
+    # --- локальный уровень ---
+
+    def _local_key(self, key, version):
+        """Ключ в LRU или None, если ключ хранится только в Redis (нет в LOCAL_PREFIXES)."""
+        local_key = self.make_and_validate_key(key, version=version)
+        if self.local_prefixes and key.startswith(self.local_prefixes):
+            return local_key
+        return None
+
+    def _local_get(self, local_key):
+        return None if local_key is None else self.local.get(local_key)
+
+    def _local_set(self, local_key, value, timeout=DEFAULT_TIMEOUT):
+        if local_key is not None:
+            self.local.set(local_key, value, self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout)
+
+    def _local_delete(self, keys, version):
+        for key in keys:
+            local_key = self._local_key(key, version)
+            if local_key is not None:
+                self.local.delete(local_key)
+
+    # --- API кэша Django ---
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        value = self._local_get(local_key)
+        if value is not None:
+            return value
+        value = self._call('get', key, None, version=version)
+        if value is None:
+            return default
+        self._local_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._local_get(self._local_key(key, version))
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            remote = self._call('get_many', missing, version=version)
+            for key, value in remote.items():
+                self._local_set(self._local_key(key, version), value)
+            found.update(remote)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._call('set', key, value, timeout=timeout, version=version)
+        self._local_set(self._local_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._call('add', key, value, timeout=timeout, version=version)
+        if added:
+            self._local_set(self._local_key(key, version), value, timeout)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._call('set_many', data, timeout=timeout, version=version) or []
+        for key, value in data.items():
+            if key not in failed:
+                self._local_set(self._local_key(key, version), value, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('touch', key, timeout=timeout, version=version)
+
+    def has_key(self, key, version=None):
+        if self._local_get(self._local_key(key, version)) is not None:
+            return True
+        return self._call('has_key', key, version=version)
+
+    def delete(self, key, version=None):
+        deleted = self._call('delete', key, version=version)
+        self._local_delete([key], version)
+        self._remember([key], version)
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._call('delete_many', keys, version=version)
+        self._local_delete(keys, version)
+        self._remember(keys, version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self._call('incr', key, delta, version=version)
+        self._local_delete([key], version)
+        self._remember([key], version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self._call('clear')
+        self.fallback.clear()
+        self.local.clear()
+
+    def close(self, **kwargs):
+        self.remote.close(**kwargs)
+
+    # --- асинхронный API ---
+    # BaseCache выполняет a*-методы через sync_to_async(thread_sensitive=True), то есть в одном общем
+    # потоке синхронного кода, и async-представления ждали бы друг друга. Операции кэша не трогают
+    # БД и потокобезопасны, поэтому идут в пул потоков, а попадания в LRU отдаются без переключения.
+
+    def _offload(self, method, *args, **kwargs):
+        return sync_to_async(getattr(self, method), thread_sensitive=False)(*args, **kwargs)
+
+    async def aget(self, key, default=None, version=None):
+        value = self._local_get(self._local_key(key, version))
+        if value is not None:
+            return value
+        return await self._offload('get', key, default, version=version)
+
+    async def aget_many(self, keys, version=None):
+        keys = list(keys)
+        found = {}
+        for key in keys:
+            value = self._local_get(self._local_key(key, version))
+            if value is not None:
+                found[key] = value
+        if len(found) == len(keys):
+            return found
+        return await self._offload('get_many', keys, version=version)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self._offload('set', key, value, timeout=timeout, version=version)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self._offload('add', key, value, timeout=timeout, version=version)
+
+    async def aset_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self._offload('set_many', data, timeout=timeout, version=version)
+
+    async def atouch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return await self._offload('touch', key, timeout=timeout, version=version)
+
+    async def ahas_key(self, key, version=None):
+        return await self._offload('has_key', key, version=version)
+
+    async def adelete(self, key, version=None):
+        return await self._offload('delete', key, version=version)
+
+    async def adelete_many(self, keys, version=None):
+        return await self._offload('delete_many', list(keys), version=version)
+
+    async def aincr(self, key, delta=1, version=None):
+        return await self._offload('incr', key, delta, version=version)
+
+    async def aclear(self):
+        return await self._offload('clear')
@@ -0,0 +1,128 @@
+#config\downloads.py
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range с одним диапазоном байт. Возвращает (start, end) включительно,
+    None - если заголовок нужно игнорировать (нет, не байты, несколько диапазонов, синтаксически
+    неверный диапазон вроде bytes=5-3) и отдать файл целиком, False - если верный диапазон
+    не пересекается с файлом (416).
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N - последние N байт
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # RFC 9110, 14.1.1: такой диапазон неверен синтаксически, заголовок игнорируется
+        return None
+    if start >= size:
+        return False
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def range_applies(request, etag, last_modified):
+    """If-Range: диапазон отдается, только если файл не изменился с момента получения валидатора."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(last_modified) <= date
+
+
+def read_blocks(f, start, length, block_size=BLOCK_SIZE):
+    try:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(block_size, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        f.close()
+
+
+def sendfile_response(name, storage):
+    """
+    Пустой ответ с заголовком для веб-сервера, который сам отдаст файл (и обработает Range):
+    X-Sendfile (Apache, lighttpd) - путь на диске, X-Accel-Redirect (nginx) - внутренний URL.
+    """
+    response = HttpResponse()
+    if settings.SENDFILE_BACKEND == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.SENDFILE_URL + name
+    else:
+        response['X-Sendfile'] = storage.path(name)
+    # Тип определит Django, а не веб-сервер
+    del response['Content-Type']
+    return response
+
+
+def serve_file(request, field_file, filename=None, as_attachment=False):
+    """
+    Отдает файл из FileField с поддержкой условных запросов (ETag, Last-Modified -> 304/412)
+    и запросов одного диапазона байт (Range, If-Range -> 206/416). Если задан SENDFILE_BACKEND,
+    передача файла поручается веб-серверу, иначе файл читается блоками без загрузки в память.
+    """
+    storage, name = field_file.storage, field_file.name
+    size = storage.size(name)
+    last_modified = storage.get_modified_time(name).timestamp()
+    etag = f'"{size:x}-{int(last_modified * 1000000):x}"'
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if conditional is not None:
+        return conditional
+
+    filename = filename or os.path.basename(name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if settings.SENDFILE_BACKEND:
+        response = sendfile_response(name, storage)
+    else:
+        byte_range = parse_range(request.headers.get('Range'), size)
+        if byte_range is not None and not range_applies(request, etag, last_modified):
+            byte_range = None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif byte_range is None:
+            # FileResponse использует wsgi.file_wrapper (sendfile), если сервер его поддерживает
+            response = FileResponse(storage.open(name, 'rb'))
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                read_blocks(storage.open(name, 'rb'), start, end - start + 1), status=206,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+
+    if response.status_code != 416:
+        response['Content-Type'] = content_type
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,93 @@
+#config\log_handlers.py
+import atexit
+import copy
+import logging
+import logging.config
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+_listeners = []
+_exception_formatter = logging.Formatter()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler, который в потоке запроса только кладет запись в очередь. Стандартный prepare()
+    вызывает self.format() и подставляет args в msg; здесь запись лишь копируется, а сообщение
+    форматируют целевые обработчики в потоке QueueListener. Трассировка исключения (объекты кадров
+    не сериализуются и держат локальные переменные) заменяется текстом в exc_text - его
+    Formatter выводит так же, как exc_info.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SQLSampleFilter(logging.Filter):
+    """
+    Пропускает SQL-запросы из django.db.backends выборочно: все медленнее slow_ms
+    и доля sample_rate остальных. Стоит на логгере, поэтому отброшенные записи
+    не попадают в очередь и не форматируются.
+    """
+
+    def __init__(self, sample_rate=1.0, slow_ms=None):
+        super().__init__()
+        self.sample_rate = float(sample_rate)
+        self.slow_ms = float(slow_ms) if slow_ms not in (None, '') else None
+
+    def filter(self, record):
+        duration = getattr(record, 'duration', None)
+        if duration is None:
+            return True
+        if self.slow_ms is not None and duration * 1000 >= self.slow_ms:
+            return True
+        return random.random() < self.sample_rate
+
+
+def parse_levels(value):
+    """Разбирает строку вида "quiz=DEBUG,django.request=WARNING" в словарь уровней логгеров."""
+    levels = {}
+    for item in (value or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure(config):
+    """
+    LOGGING_CONFIG: применяет LOGGING через dictConfig, затем переносит обработчики
+    каждого логгера за QueueHandler. Запись в файл и консоль выполняет фоновый
+    QueueListener, а поток запроса только кладет запись в очередь.
+    """
+    logging.config.dictConfig(config)
+
+    names = [''] + list(config.get('loggers', {}))
+    queues = {}
+    for name in names:
+        logger = logging.getLogger(name)
+        targets = tuple(handler for handler in logger.handlers if not isinstance(handler, QueueHandler))
+        if not targets:
+            continue
+        if targets not in queues:
+            records = queue.SimpleQueue()
+            listener = QueueListener(records, *targets, respect_handler_level=True)
+            listener.start()
+            _listeners.append(listener)
+            queues[targets] = DeferredQueueHandler(records)
+        for handler in targets:
+            logger.removeHandler(handler)
+        logger.addHandler(queues[targets])
+
+
+@atexit.register
+def stop_listeners():
+    """Дописывает оставшиеся в очередях записи при завершении процесса."""
+    while _listeners:
+        _listeners.pop().stop()
@@ -0,0 +1,147 @@
+#config\middleware.py
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+IN_LIST_RE = re.compile(r'\((?:%s, )+%s\)')
+
+
+def sql_shape(sql):
+    """Форма запроса: параметры уже вынесены в %s, списки IN разной длины приводятся к одному виду."""
+    return IN_LIST_RE.sub('(%s, ...)', sql)
+
+
+def get_query_budget(url_name, method=None):
+    """
+    Бюджет запросов для представления из QUERY_BUDGETS: сначала по имени URL и методу
+    ('user-detail:PATCH'), затем по имени URL, иначе QUERY_BUDGET_DEFAULT.
+    """
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    if method is not None and f'{url_name}:{method.upper()}' in budgets:
+        return budgets[f'{url_name}:{method.upper()}']
+    return budgets.get(url_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+
+
+class QueryRecorder:
+    """Обертка execute_wrapper: считает запросы, их суммарное время и повторы одинаковых форм."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return {shape: count for shape, count in self.shapes.items() if count > 1}
+
+
+# Счетчик текущего асинхронного запроса. Async-представления выполняют ORM через sync_to_async
+# в другом потоке, а соединения Django свои у каждого потока, поэтому execute_wrapper на соединениях
+# потока цикла событий этих запросов не видит. Контекст же копируется в поток sync_to_async.
+_async_recorder = ContextVar('async_query_recorder', default=None)
+
+
+def record_async_queries(execute, sql, params, many, context):
+    recorder = _async_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_async_recorder(connection):
+    if record_async_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_async_queries)
+
+
+def install_on_new_connection(sender, connection, **kwargs):
+    install_async_recorder(connection)
+
+
+connection_created.connect(install_on_new_connection, dispatch_uid='query_budget_async_recorder')
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает SQL-запросы каждого запроса и возвращает их в заголовках X-DB-Queries,
+    X-DB-Time-Ms и X-DB-Duplicates. Если представление превысило свой бюджет из
+    QUERY_BUDGETS, пишет предупреждение с повторяющимися формами запросов.
+    Включается настройкой QUERY_INSPECTOR_ENABLED.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # Соединения, открытые до загрузки middleware, сигнал connection_created уже пропустили
+            for connection in connections.all():
+                install_async_recorder(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not getattr(settings, 'QUERY_INSPECTOR_ENABLED', False):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'QUERY_INSPECTOR_ENABLED', False):
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = _async_recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _async_recorder.reset(token)
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        duplicates = recorder.duplicates
+        response['X-DB-Queries'] = str(recorder.count)
+        response['X-DB-Time-Ms'] = f'{recorder.duration * 1000:.1f}'
+        response['X-DB-Duplicates'] = str(sum(count - 1 for count in duplicates.values()))
+
+        match = request.resolver_match
+        url_name = match.url_name if match else None
+        budget = get_query_budget(url_name, request.method)
+        if budget is not None:
+            response['X-DB-Budget'] = str(budget)
+            if recorder.count > budget:
+                repeated = '; '.join(
+                    f'{count}x {shape}' for shape, count in sorted(duplicates.items(), key=lambda item: -item[1])[:3]
+                )
+                logger.warning(
+                    "Превышен бюджет SQL для %s %s (%s): %s > %s, %.1f мс. Повторы: %s",
+                    request.method, request.path, url_name, recorder.count, budget,
+                    recorder.duration * 1000, repeated or 'нет',
+                )
+        return response
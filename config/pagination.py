@@ -0,0 +1,42 @@
+#config\pagination.py
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CursorOptionalPagination(PageNumberPagination):
+    """
+    Постраничная навигация по номеру страницы (?page=), а при наличии параметра ?cursor= -
+    по ключу cursor_ordering: без COUNT(*) и OFFSET, с постоянной стоимостью любой страницы.
+    Пустой ?cursor= возвращает первую страницу, дальше переходы по ссылкам next/previous.
+    """
+    cursor_query_param = 'cursor'
+    cursor_ordering = 'id'
+    cursor_page_size = None  # По умолчанию совпадает с page_size
+
+    def __init__(self):
+        self.cursor_pagination = None
+
+    def get_cursor_pagination(self):
+        paginator = CursorPagination()
+        paginator.cursor_query_param = self.cursor_query_param
+        paginator.ordering = self.cursor_ordering
+        paginator.page_size = self.cursor_page_size or self.page_size
+        paginator.page_size_query_param = self.page_size_query_param
+        paginator.max_page_size = self.max_page_size
+        return paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_pagination = self.get_cursor_pagination()
+            return self.cursor_pagination.paginate_queryset(queryset, request, view)
+        self.cursor_pagination = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_html_context()
+        return super().get_html_context()
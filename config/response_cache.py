@@ -0,0 +1,112 @@
+#config\response_cache.py
+import hashlib
+import logging
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+def generation_key(model):
+    return f'{settings.CACHE_MIDDLEWARE_KEY_PREFIX}gen:{model._meta.label_lower}'
+
+
+def initial_generation():
+    # Поколение, вытесненное из кэша, не должно начаться заново с уже использованного значения
+    return int(time.time() * 1000)
+
+
+def get_generations(models):
+    """Текущие поколения моделей одним обращением к кэшу."""
+    keys = [generation_key(model) for model in models]
+    values = cache.get_many(keys)
+    missing = {key: initial_generation() for key in keys if key not in values}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        values.update(missing)
+    return [values[key] for key in keys]
+
+
+async def aget_generations(models):
+    """Асинхронный вариант get_generations."""
+    keys = [generation_key(model) for model in models]
+    values = await cache.aget_many(keys)
+    missing = {key: initial_generation() for key in keys if key not in values}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        values.update(missing)
+    return [values[key] for key in keys]
+
+
+def _bump(model):
+    key = generation_key(model)
+    try:
+        cache.add(key, initial_generation(), timeout=None)
+        cache.incr(key)
+    except Exception as e:
+        logger.error("Не удалось обновить поколение кэша %s: %s", key, e)
+
+
+def bump_generation(model):
+    """
+    Делает недействительными все закэшированные ответы, зависящие от модели, за O(1):
+    новое поколение входит в ключ, старые записи просто истекают. Поколение поднимается
+    сразу и еще раз после фиксации транзакции, чтобы не закэшировать незафиксированное состояние.
+    """
+    _bump(model)
+    transaction.on_commit(lambda: _bump(model))
+
+
+class CachedResponseMixin:
+    """
+    Кэширует успешные GET-ответы list/retrieve. Ключ включает класс представления, формат,
+    путь со строкой запроса (а значит и номер страницы) и поколения моделей из cache_models.
+    Права проверяются до обращения к кэшу, поэтому подходит только для представлений, чей ответ
+    не зависит от пользователя и не требует объектных проверок прав. CACHE_ENABLED=False отключает кэш.
+    """
+    cache_models = ()
+    cache_timeout = None  # По умолчанию CACHE_MIDDLEWARE_SECONDS
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request):
+        query = urlencode(sorted((key, value) for key, values in request.query_params.lists() for value in values))
+        generations = '.'.join(str(gen) for gen in get_generations(self.cache_models))
+        # Хост входит в ключ: ссылки next/previous в ответе абсолютные
+        digest = hashlib.md5(f'{request.get_host()}{request.path}?{query}'.encode('utf-8')).hexdigest()
+        return (
+            f'{settings.CACHE_MIDDLEWARE_KEY_PREFIX}resp:{type(self).__name__}:'
+            f'{request.accepted_renderer.format}:{generations}:{digest}'
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not settings.CACHE_ENABLED:
+            return handler(request, *args, **kwargs)
+        try:
+            key = self.get_response_cache_key(request)
+            data = cache.get(key)
+        except Exception as e:
+            logger.error("Кэш ответов недоступен: %s", e)
+            return handler(request, *args, **kwargs)
+
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = self.cache_timeout if self.cache_timeout is not None else settings.CACHE_MIDDLEWARE_SECONDS
+            try:
+                cache.set(key, response.data, timeout)
+            except Exception as e:
+                logger.error("Не удалось сохранить ответ в кэш: %s", e)
+            response['X-Cache'] = 'MISS'
+        return response
@@ -3,6 +3,7 @@ import os
 import sys
 from dotenv import load_dotenv
 import datetime
+from config.log_handlers import parse_levels
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -26,12 +27,14 @@ INSTALLED_APPS = [
     'drf_yasg',
     'sections',
     'quiz',
+    'search',
 ]
 
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'config.middleware.QueryBudgetMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -95,11 +98,28 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузка файлов содержимого частями (sections/uploads.py). Временные файлы лучше держать
+# на том же диске, что и MEDIA_ROOT: тогда готовый файл переносится без копирования.
+CONTENT_UPLOAD_DIR = os.getenv('CONTENT_UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads'))
+CONTENT_UPLOAD_CHUNK_SIZE = int(os.getenv('CONTENT_UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+CONTENT_UPLOAD_MAX_SIZE = int(os.getenv('CONTENT_UPLOAD_MAX_SIZE', str(5 * 1024 ** 3)))
+CONTENT_UPLOAD_EXPIRE_HOURS = int(os.getenv('CONTENT_UPLOAD_EXPIRE_HOURS', '24'))
+
+# Уменьшенные копии фото профиля (users/renditions.py): процессов в пуле (0 - в потоке запроса
+# после фиксации транзакции) и предел пикселей исходника - защита от "бомб" декомпрессии
+PROFILE_PICTURE_WORKERS = int(os.getenv('PROFILE_PICTURE_WORKERS', '2'))
+PROFILE_PICTURE_MAX_PIXELS = int(os.getenv('PROFILE_PICTURE_MAX_PIXELS', str(40_000_000)))
+
+# Отдача файлов веб-сервером (config/downloads.py): '' - Django читает файл сам,
+# 'x-sendfile' - Apache/lighttpd, 'x-accel-redirect' - nginx с internal location SENDFILE_URL -> MEDIA_ROOT
+SENDFILE_BACKEND = os.getenv('SENDFILE_BACKEND', '')
+SENDFILE_URL = os.getenv('SENDFILE_URL', '/protected/')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ('django_filters.rest_framework.DjangoFilterBackend',),
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('users.authentication.CachedJWTAuthentication',),
     'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAuthenticated',),
 }
 
@@ -108,6 +128,10 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': datetime.timedelta(days=7),
 }
 
+# Снимок пользователя для аутентификации по JWT без запроса к БД (users/authentication.py), секунды.
+# Изменения пользователя через save() сбрасывают снимок сразу, через queryset.update() - не позже этого срока.
+USER_SNAPSHOT_TIMEOUT = int(os.getenv('USER_SNAPSHOT_TIMEOUT', '60'))
+
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
     'http://127.0.0.1:3000',
@@ -118,28 +142,49 @@ CSRF_TRUSTED_ORIGINS = [
     'http://127.0.0.1:3000',
 ]
 
-import logging
-logger = logging.getLogger(__name__)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+CACHE_MIDDLEWARE_ALIAS = "default"
+CACHE_MIDDLEWARE_SECONDS = 600
+CACHE_MIDDLEWARE_KEY_PREFIX = ""
+
+# Двухуровневый кэш: LRU в памяти процесса перед django_redis (config/cache_backends.py).
+# В LRU попадают только неизменяемые записи, ключ которых включает поколение модели (LOCAL_PREFIXES);
+# остальные ключи читаются и пишутся напрямую в Redis. Доступность Redis проверяется лениво
+# при первой операции, а не при загрузке настроек; если Redis недоступен, кэш временно
+# работает в памяти процесса.
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        "BACKEND": "config.cache_backends.TwoTierCache",
         "LOCATION": os.getenv("CACHE_LOCATION", "redis://127.0.0.1:6379/0"),
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
             "IGNORE_EXCEPTIONS": False,
-             "SOCKET_TIMEOUT": 1,
+            "SOCKET_TIMEOUT": 1,
+            "SOCKET_CONNECT_TIMEOUT": 1,
+            "LOCAL_MAX_ENTRIES": int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "1000")),
+            "LOCAL_TIMEOUT": float(os.getenv("CACHE_LOCAL_TIMEOUT", "5")),
+            "LOCAL_PREFIXES": (f"{CACHE_MIDDLEWARE_KEY_PREFIX}resp:", "quiz:ids:", "search:count:"),
+            "HEALTH_RETRY_INTERVAL": float(os.getenv("CACHE_HEALTH_RETRY_INTERVAL", "30")),
         }
     }
 }
-try:
-    from django.core.cache import cache
-    cache.get('test_cache_connection')
-except Exception as e:
-    logger.error(f"Redis connection error: {e}")
 
+# Логирование через очередь (config/log_handlers.py): поток запроса только кладет запись
+# в очередь, форматирование и запись в файл/консоль выполняет фоновый QueueListener.
+# Уровни: LOG_LEVEL для корневого логгера, LOG_LEVEL_SQL для django.db.backends,
+# LOG_LEVELS="quiz=DEBUG,django.request=WARNING" для остальных.
+# SQL пишется выборочно: все запросы медленнее LOG_SQL_SLOW_MS и доля LOG_SQL_SAMPLE_RATE остальных.
+LOGGING_CONFIG = 'config.log_handlers.configure'
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'sql_sample': {
+            '()': 'config.log_handlers.SQLSampleFilter',
+            'sample_rate': os.getenv('LOG_SQL_SAMPLE_RATE', '0.1'),
+            'slow_ms': os.getenv('LOG_SQL_SLOW_MS', '100'),
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
@@ -148,26 +193,131 @@ LOGGING = {
             'level': 'DEBUG',
             'class': 'logging.FileHandler',
             'filename': 'debug.log',
+            'delay': True,
         },
     },
     'loggers': {
         'django.db.backends': {
-            'level': 'DEBUG', # По умолчанию DEBUG
+            'level': os.getenv('LOG_LEVEL_SQL', 'DEBUG'),
             'handlers': ['console', 'file'],
+            'filters': ['sql_sample'],
             'propagate': False,
         },
          '': {
-            'level': 'DEBUG',
+            'level': os.getenv('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO'),
             'handlers': ['console', 'file'],
         },
     },
 }
+for _name, _level in parse_levels(os.getenv('LOG_LEVELS')).items():
+    LOGGING['loggers'].setdefault(_name, {})['level'] = _level
 
 # Отключаем логирование SQL во время тестов
 if 'test' in sys.argv:
     LOGGING['loggers']['django.db.backends']['level'] = 'INFO' # Или WARNING, ERROR
 
-CACHE_ENABLED = os.getenv("CACHE_ENABLED", "True").lower() == "true"
-CACHE_MIDDLEWARE_ALIAS = "default"
-CACHE_MIDDLEWARE_SECONDS = 600
-CACHE_MIDDLEWARE_KEY_PREFIX = ""
\ No newline at end of file
+# Ключ ответов в памяти процесса для check_answer (quiz/answer_key.py)
+QUIZ_ANSWER_KEY_ENABLED = os.getenv("QUIZ_ANSWER_KEY_ENABLED", "True").lower() == "true"
+QUIZ_ANSWER_KEY_WARM = os.getenv("QUIZ_ANSWER_KEY_WARM", "False").lower() == "true"
+QUIZ_ANSWER_KEY_CHECK_INTERVAL = float(os.getenv("QUIZ_ANSWER_KEY_CHECK_INTERVAL", "1"))
+# Сколько текстов вопросов ключ держит в памяти (читаются при первой проверке ответа на вопрос)
+QUIZ_ANSWER_KEY_MAX_TEXTS = int(os.getenv("QUIZ_ANSWER_KEY_MAX_TEXTS", "10000"))
+
+# Журнал попыток ответов (quiz/attempts.py): буфер процесса, который вставляется пачками по
+# QUIZ_ATTEMPT_BATCH_SIZE записей или раз в QUIZ_ATTEMPT_FLUSH_INTERVAL_MS; при переполнении
+# QUIZ_ATTEMPT_BUFFER_SIZE записи отбрасываются (drop_newest или drop_oldest), а не задерживают запрос
+QUIZ_ATTEMPT_LOG_ENABLED = os.getenv("QUIZ_ATTEMPT_LOG_ENABLED", "True").lower() == "true"
+QUIZ_ATTEMPT_BATCH_SIZE = int(os.getenv("QUIZ_ATTEMPT_BATCH_SIZE", "500"))
+QUIZ_ATTEMPT_FLUSH_INTERVAL_MS = int(os.getenv("QUIZ_ATTEMPT_FLUSH_INTERVAL_MS", "1000"))
+QUIZ_ATTEMPT_BUFFER_SIZE = int(os.getenv("QUIZ_ATTEMPT_BUFFER_SIZE", "50000"))
+QUIZ_ATTEMPT_OVERFLOW = os.getenv("QUIZ_ATTEMPT_OVERFLOW", "drop_newest")
+# Сколько раз повторять пачку, выбранную SQL Server жертвой взаимоблокировки
+QUIZ_ATTEMPT_DEADLOCK_RETRIES = int(os.getenv("QUIZ_ATTEMPT_DEADLOCK_RETRIES", "3"))
+if 'test' in sys.argv:
+    # Фоновый поток писал бы в тестовую БД мимо транзакций тестов; тесты журнала включают его сами
+    QUIZ_ATTEMPT_LOG_ENABLED = False
+
+# Сеансы викторины (quiz/sessions.py): время жизни состояния в кэше, предел вопросов
+# и время жизни списков ID вопросов по (категория, сложность) для случайной выборки
+QUIZ_SESSION_TIMEOUT = int(os.getenv("QUIZ_SESSION_TIMEOUT", "3600"))
+QUIZ_SESSION_MAX_QUESTIONS = int(os.getenv("QUIZ_SESSION_MAX_QUESTIONS", "50"))
+QUIZ_SESSION_IDS_TIMEOUT = int(os.getenv("QUIZ_SESSION_IDS_TIMEOUT", "3600"))
+
+# Адаптивный режим (quiz/adaptive.py): следующий вопрос выбирается случайно из QUIZ_ADAPTIVE_WINDOW
+# ближайших по трудности к способности пользователя; оценка способности и карта верно отвеченных
+# вопросов хранятся в кэше QUIZ_ADAPTIVE_TIMEOUT секунд и при промахе восстанавливаются по журналу попыток
+QUIZ_ADAPTIVE_WINDOW = int(os.getenv("QUIZ_ADAPTIVE_WINDOW", "3"))
+QUIZ_ADAPTIVE_TIMEOUT = int(os.getenv("QUIZ_ADAPTIVE_TIMEOUT", str(7 * 24 * 3600)))
+# Сколько секунд держится блокировка состояния пользователя на время ответа
+QUIZ_ADAPTIVE_LOCK_TIMEOUT = int(os.getenv("QUIZ_ADAPTIVE_LOCK_TIMEOUT", "5"))
+
+# Поиск (search/): 'auto' - полнотекстовый индекс SQL Server, если он построен,
+# иначе встроенный инвертированный индекс; 'fulltext' или 'inverted' - принудительно
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+# Число документов для IDF кэшируется под поколением модели, но не дольше SEARCH_COUNTS_TIMEOUT секунд
+# (массовые изменения в обход сигналов поколение не поднимают)
+SEARCH_COUNTS_TIMEOUT = int(os.getenv("SEARCH_COUNTS_TIMEOUT", "3600"))
+
+# Учет SQL-запросов по каждому запросу (config/middleware.py). Бюджеты задаются по имени URL
+# с учетом запроса аутентификации; для изменяющих методов - отдельно, 'имя:МЕТОД' (без него
+# берется бюджет имени URL). Превышение пишется в лог как предупреждение.
+QUERY_INSPECTOR_ENABLED = os.getenv("QUERY_INSPECTOR_ENABLED", str(DEBUG)).lower() == "true"
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "10"))
+QUERY_BUDGETS = {
+    # quiz
+    'category-list-create': 2,
+    'category-detail': 2,
+    'category-detail:PATCH': 3,
+    'category-detail:PUT': 3,
+    'category-detail:DELETE': 11,  # Вопросы, ответы и их сводки удаляются каскадом
+    'question-list-create': 3,
+    'question-list-create:POST': 5,  # Вместе с записью в поисковый индекс
+    'question-play-list': 4,
+    'question-bulk-create': 10,  # Вставки делятся на пачки по лимиту параметров бэкенда (2100 в SQL Server)
+    'question-detail': 2,
+    'question-detail:PATCH': 5,  # Вместе с обновлением поискового индекса
+    'question-detail:PUT': 6,
+    'question-detail:DELETE': 11,
+    'answer-list-create': 3,
+    'answer-detail': 2,
+    'answer-detail:PATCH': 3,
+    'answer-detail:PUT': 4,
+    'answer-detail:DELETE': 6,
+    'check_answer': 3,
+    'check_answers': 3,
+    'async-check-answer': 3,
+    'async-check-answers': 3,
+    'async-question-detail': 3,
+    'async-category-list': 2,
+    'quiz-session-start': 5,
+    'quiz-session-detail': 4,
+    'quiz-session-answer': 2,
+    'quiz-session-finish': 5,
+    'quiz-adaptive-next': 5,
+    'quiz-adaptive-answer': 4,
+    'quiz-stats': 2,
+    'quiz-stats-category': 4,
+    # sections
+    'section-list-create': 3,
+    'section-detail': 2,
+    'section-detail:PATCH': 3,
+    'section-detail:PUT': 3,
+    'section-detail:DELETE': 7,
+    'content-list-create': 3,
+    'content-list-create:POST': 5,
+    'content-detail': 2,
+    'content-detail:PATCH': 5,
+    'content-detail:PUT': 6,
+    'content-detail:DELETE': 5,
+    'content-file': 2,
+    'content-upload-create': 3,
+    'content-upload': 7,  # Последняя часть переносит файл в Content и удаляет загрузку
+    # users
+    'user-list': 3,
+    'user-detail': 2,
+    'user-detail:PATCH': 3,
+    'user-detail:PUT': 4,
+    'user-detail:DELETE': 14,  # Каскадом: сеансы, попытки, разделы и их содержимое
+    # search
+    'search': 9,
+}
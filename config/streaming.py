@@ -0,0 +1,69 @@
+#config\streaming.py
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Один JSON-объект на строку. Используется только для потоковой выдачи списков."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Ошибки (403, 400 и т.п.) отдаются одной строкой
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode(self.charset) + b'\n'
+
+
+class NDJSONStreamMixin:
+    """
+    Добавляет к ListAPIView потоковый режим ?format=ndjson (или Accept: application/x-ndjson):
+    queryset обходится через .iterator(chunk_size), строки уходят клиенту по мере сериализации,
+    поэтому память сервера не зависит от размера таблицы. Без этого параметра работает обычная пагинация.
+    """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        if getattr(request.accepted_renderer, 'format', None) != NDJSONRenderer.format:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(self.stream_rows(queryset), content_type=NDJSONRenderer.media_type)
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def stream_rows(self, queryset):
+        serializer = self.get_serializer()
+        for obj in queryset.iterator(chunk_size=self.stream_chunk_size):
+            row = serializer.to_representation(obj)
+            yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def encode_chunks(chunks, size=64 * 1024, encoding='utf-8'):
+    """Склеивает мелкие строковые куски в блоки примерно по size байт, чтобы не отдавать клиенту каждую строку отдельно."""
+    parts = []
+    length = 0
+    for chunk in chunks:
+        data = chunk.encode(encoding)
+        parts.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(parts)
+            parts = []
+            length = 0
+    if parts:
+        yield b''.join(parts)
+
+
+def gzip_chunks(chunks, level=6):
+    """Сжимает поток байтовых блоков в формат gzip по мере поступления, не накапливая его в памяти."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
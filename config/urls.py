@@ -33,4 +33,5 @@ urlpatterns = [
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     path('api/sections/', include('sections.urls')), # Добавляем urls для sections
     path('api/quiz/', include('quiz.urls')), # Добавляем urls для quiz
+    path('api/search/', include('search.urls')),
 ]
\ No newline at end of file
@@ -15,7 +15,7 @@ class UserList(generics.ListCreateAPIView):
     permission_classes = [IsSuperUser]  # Только суперпользователи могут создавать пользователей
 
     def get(self, request, *args, **kwargs):
-        logger.debug(f"Authorization header: {request.META.get('HTTP_AUTHORIZATION')}")
+        logger.debug("Authorization header: %s", request.META.get('HTTP_AUTHORIZATION'))
         return super().get(request, *args, **kwargs)
 
 class UserDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings
+
+if settings.QUIZ_ANSWER_KEY_WARM:
+    from quiz.answer_key import warm
+    warm()
@@ -0,0 +1,263 @@
+#quiz\adaptive.py
+"""
+Адаптивный режим: следующий вопрос категории выбирается рядом с текущей оценкой способности
+пользователя, вопросы, на которые он уже ответил верно, пропускаются.
+
+Индекс категории (CategoryIndex) - массивы трудностей, отсортированные по возрастанию, поэтому
+ближайшие к способности вопросы находятся bisect'ом без запросов к БД. Индекс строится один раз
+на процесс и поколение Question, как ключ ответов. Состояние пользователя в категории - оценка
+способности и битовая карта верно отвеченных вопросов (бит на вопрос категории) - хранится в кэше.
+Ответ принимается только на выданный вопрос (served) и один раз; запросы пользователя в категории
+меняют состояние под блокировкой cache.add, чтобы одновременные ответы не затирали друг друга.
+"""
+import math
+import random
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+
+from config.response_cache import get_generations
+from .models import Question, Attempt
+
+CATEGORY_EMPTY = 'category_empty'
+NO_QUESTIONS_LEFT = 'no_questions_left'
+QUESTION_NOT_IN_CATEGORY = 'question_not_in_category'
+QUESTION_NOT_SERVED = 'question_not_served'
+STATE_LOCKED = 'state_locked'
+
+ERRORS = {
+    CATEGORY_EMPTY: ("В категории нет вопросов", status.HTTP_404_NOT_FOUND),
+    NO_QUESTIONS_LEFT: ("На все вопросы категории уже даны верные ответы", status.HTTP_404_NOT_FOUND),
+    QUESTION_NOT_IN_CATEGORY: ("Вопрос не входит в эту категорию", status.HTTP_400_BAD_REQUEST),
+    QUESTION_NOT_SERVED: ("Ответ принимается только на последний выданный вопрос", status.HTTP_409_CONFLICT),
+    STATE_LOCKED: ("Предыдущий запрос еще обрабатывается", status.HTTP_409_CONFLICT),
+}
+
+# Трудность вопросов без калибровки (calibrate_questions) - по метке, на той же шкале способностей
+LABEL_DIFFICULTY = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+
+# Оценка способности ограничена, чтобы серия одинаковых ответов не уводила ее в бесконечность
+ABILITY_LIMIT = 4.0
+
+# Сколько индексов категорий держать в памяти процесса
+MAX_INDEXES = 256
+
+_random = random.SystemRandom()
+
+
+class AdaptiveError(Exception):
+    def __init__(self, code):
+        super().__init__(ERRORS[code][0])
+        self.code = code
+        self.message, self.status = ERRORS[code]
+
+
+class CategoryIndex:
+    """
+    ids - ID вопросов категории по возрастанию (номер в этом массиве - номер бита в карте пользователя),
+    difficulty и discrimination - параметры вопросов в том же порядке. by_difficulty - трудности
+    по возрастанию, by_rank - номера соответствующих вопросов в ids.
+    """
+
+    def __init__(self, category_id, generation, ids, difficulty, discrimination):
+        self.category_id = category_id
+        self.generation = generation
+        self.ids = ids
+        self.difficulty = difficulty
+        self.discrimination = discrimination
+        order = sorted(range(len(ids)), key=difficulty.__getitem__)
+        self.by_difficulty = array('d', (difficulty[rank] for rank in order))
+        self.by_rank = array('l', order)
+        # Карты пользователей действительны, пока не изменился состав вопросов категории
+        self.version = zlib.crc32(ids.tobytes())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rank(self, question_id):
+        """Номер вопроса в ids или None, если вопрос не из этой категории."""
+        rank = bisect_left(self.ids, question_id)
+        if rank < len(self.ids) and self.ids[rank] == question_id:
+            return rank
+        return None
+
+    @classmethod
+    def load(cls, category_id, generation):
+        ids, difficulty, discrimination = array('q'), array('d'), array('d')
+        rows = (
+            Question.objects.filter(category_id=category_id).order_by('id')
+            .values_list('id', 'difficulty', 'calibrated_difficulty', 'discrimination')
+        )
+        for question_id, label, calibrated, slope in rows.iterator():
+            ids.append(question_id)
+            difficulty.append(calibrated if calibrated is not None else LABEL_DIFFICULTY.get(label, 0.0))
+            discrimination.append(slope or 1.0)
+        return cls(category_id, generation, ids, difficulty, discrimination)
+
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_index(category_id):
+    """Индекс категории процесса; перестраивается, когда меняется поколение Question."""
+    generation, = get_generations([Question])
+    index = _indexes.get(category_id)
+    if index is None or index.generation != generation:
+        with _lock:
+            index = _indexes.get(category_id)
+            if index is None or index.generation != generation:
+                index = CategoryIndex.load(category_id, generation)
+                _indexes[category_id] = index
+            _indexes.move_to_end(category_id)
+            while len(_indexes) > MAX_INDEXES:
+                _indexes.popitem(last=False)
+    if not len(index):
+        raise AdaptiveError(CATEGORY_EMPTY)
+    return index
+
+
+# --- способность и карта отвеченных ---
+
+def state_key(user_id, category_id):
+    return f'quiz:adaptive:{user_id}:{category_id}'
+
+
+def lock_key(user_id, category_id):
+    return f'quiz:adaptive:lock:{user_id}:{category_id}'
+
+
+@contextmanager
+def locked(user, category_id):
+    """Блокировка состояния пользователя в категории на время чтения-изменения-записи."""
+    key = lock_key(user.pk, category_id)
+    if not cache.add(key, 1, timeout=settings.QUIZ_ADAPTIVE_LOCK_TIMEOUT):
+        raise AdaptiveError(STATE_LOCKED)
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+def is_seen(seen, rank):
+    return seen[rank >> 3] & (1 << (rank & 7))
+
+
+def update(state, index, rank, is_correct):
+    """
+    Шаг оценки способности после ответа (онлайн-оценка Лапласа для модели 2PL с априорным N(0, 1)):
+    information накапливает информацию Фишера ответов, поэтому шаг уменьшается с каждым ответом.
+    """
+    difficulty, slope = index.difficulty[rank], index.discrimination[rank]
+    p = 1.0 / (1.0 + math.exp(-slope * (state['ability'] - difficulty)))
+    state['information'] += slope * slope * p * (1.0 - p)
+    ability = state['ability'] + slope * (float(is_correct) - p) / state['information']
+    state['ability'] = max(-ABILITY_LIMIT, min(ABILITY_LIMIT, ability))
+    state['answered'] += 1
+    if is_correct:
+        state['seen'][rank >> 3] |= 1 << (rank & 7)
+
+
+def replay(user, index):
+    """Состояние заново по журналу попыток пользователя в категории (при промахе кэша или смене вопросов)."""
+    state = {'version': index.version, 'ability': 0.0, 'information': 1.0, 'answered': 0, 'last': None,
+             'served': None, 'seen': bytearray((len(index) + 7) // 8)}
+    rows = (
+        Attempt.objects.filter(user_id=user.pk, question__category_id=index.category_id)
+        .order_by('created_at', 'id').values_list('question_id', 'is_correct')
+    )
+    for question_id, is_correct in rows.iterator():
+        rank = index.rank(question_id)
+        if rank is not None:
+            update(state, index, rank, is_correct)
+    return state
+
+
+def get_state(user, index):
+    state = cache.get(state_key(user.pk, index.category_id))
+    if state is None or state['version'] != index.version:
+        state = replay(user, index)
+        save_state(user, index, state)
+    return state
+
+
+def save_state(user, index, state):
+    cache.set(state_key(user.pk, index.category_id), state, timeout=settings.QUIZ_ADAPTIVE_TIMEOUT)
+
+
+# --- выбор вопроса ---
+
+def pick(index, state, exclude=None, window=None):
+    """
+    ID вопроса рядом со способностью: от позиции bisect'а в by_difficulty идем в обе стороны к ближайшим
+    трудностям, пропуская верно отвеченные, и выбираем случайно из window ближайших. Время не зависит от
+    размера категории, пока пользователь не ответил верно на большую ее часть. None - вопросов не осталось.
+    """
+    window = window or settings.QUIZ_ADAPTIVE_WINDOW
+    target, seen = state['ability'], state['seen']
+    by_difficulty, by_rank = index.by_difficulty, index.by_rank
+    right = bisect_left(by_difficulty, target)
+    left = right - 1
+    candidates = []
+    while len(candidates) < window and (left >= 0 or right < len(by_difficulty)):
+        if right >= len(by_difficulty) or (left >= 0 and target - by_difficulty[left] <= by_difficulty[right] - target):
+            rank = by_rank[left]
+            left -= 1
+        else:
+            rank = by_rank[right]
+            right += 1
+        if not is_seen(seen, rank) and index.ids[rank] != exclude:
+            candidates.append(rank)
+    if not candidates:
+        return None
+    return index.ids[_random.choice(candidates)]
+
+
+def next_question(user, category_id):
+    """
+    (ID следующего вопроса, состояние пользователя). Только что отвеченный вопрос не повторяется, если есть
+    другие. Выданный вопрос запоминается в состоянии: пока на него не ответили, он выдается снова.
+    """
+    index = get_index(category_id)
+    with locked(user, category_id):
+        state = get_state(user, index)
+        question_id = state['served']
+        if question_id is not None:
+            rank = index.rank(question_id)
+            if rank is not None and not is_seen(state['seen'], rank):
+                return question_id, state
+        question_id = pick(index, state, exclude=state['last'])
+        if question_id is None:
+            question_id = pick(index, state)
+        if question_id is None:
+            raise AdaptiveError(NO_QUESTIONS_LEFT)
+        state['served'] = question_id
+        save_state(user, index, state)
+    return question_id, state
+
+
+def answer(user, category_id, question_id, result):
+    """
+    Учитывает проверенный ответ (результат check_answers) в оценке способности и карте пользователя.
+    Ответ на невыданный или уже отвеченный вопрос отклоняется и способность не меняет.
+    """
+    index = get_index(category_id)
+    rank = index.rank(question_id)
+    if rank is None:
+        raise AdaptiveError(QUESTION_NOT_IN_CATEGORY)
+    with locked(user, category_id):
+        state = get_state(user, index)
+        if state['served'] != question_id or is_seen(state['seen'], rank):
+            raise AdaptiveError(QUESTION_NOT_SERVED)
+        update(state, index, rank, result['is_correct'])
+        state['last'] = question_id
+        state['served'] = None
+        save_state(user, index, state)
+    return state
@@ -1,7 +1,12 @@
 #quiz\admin.py
 from django.contrib import admin
-from .models import QuestionCategory, Question, Answer
+from .models import QuestionCategory, Question, Answer, QuizSession, Attempt, QuestionStats, AnswerStats, CategoryStats
 
 admin.site.register(QuestionCategory)
 admin.site.register(Question)
 admin.site.register(Answer)
+admin.site.register(QuizSession)
+admin.site.register(Attempt)
+admin.site.register(QuestionStats)
+admin.site.register(AnswerStats)
+admin.site.register(CategoryStats)
@@ -0,0 +1,228 @@
+#quiz\answer_key.py
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from config.response_cache import initial_generation
+from .models import Question, Answer
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'quiz:answer_key:version'
+LOAD_CHUNK_SIZE = 2000
+
+
+class AnswerKey:
+    """
+    Компактный ключ ответов: отсортированный массив ID ответов и параллельные массивы
+    с ID вопроса и признаком правильности, плюс отсортированные ID вопросов с ответами.
+    Тексты вопросов для ответа клиенту в загрузку не входят: они читаются при первом
+    обращении и хранятся в ограниченном LRU (QUIZ_ANSWER_KEY_MAX_TEXTS).
+    """
+
+    def __init__(self, answer_ids, question_ids, correct, version):
+        self.answer_ids = answer_ids
+        self.question_ids = question_ids
+        self.correct = correct
+        self.questions = array('q', sorted(set(question_ids)))
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.question_texts = OrderedDict()
+        self.texts_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.answer_ids)
+
+    def lookup(self, answer_id):
+        """Возвращает (question_id, is_correct) или None, если ответа нет в ключе."""
+        index = bisect_left(self.answer_ids, answer_id)
+        if index < len(self.answer_ids) and self.answer_ids[index] == answer_id:
+            return self.question_ids[index], bool(self.correct[index])
+        return None
+
+    def has_question(self, question_id):
+        """Есть ли у вопроса ответы в ключе (вопросы без ответов проверяются в БД)."""
+        index = bisect_left(self.questions, question_id)
+        return index < len(self.questions) and self.questions[index] == question_id
+
+    def texts(self, question_ids, load=True):
+        """
+        Тексты вопросов {id: текст}. Недостающие читаются одним запросом (load=False - только
+        уже прочитанные, для async-кода); вопроса, удаленного после загрузки ключа, в результате нет.
+        """
+        found, missing = {}, []
+        with self.texts_lock:
+            for question_id in question_ids:
+                text = self.question_texts.get(question_id)
+                if text is None:
+                    missing.append(question_id)
+                else:
+                    self.question_texts.move_to_end(question_id)
+                    found[question_id] = text
+        if missing and load:
+            loaded = dict(Question.objects.filter(id__in=missing).values_list('id', 'text'))
+            limit = getattr(settings, 'QUIZ_ANSWER_KEY_MAX_TEXTS', 10000)
+            with self.texts_lock:
+                self.question_texts.update(loaded)
+                while len(self.question_texts) > limit:
+                    self.question_texts.popitem(last=False)
+            found.update(loaded)
+        return found
+
+    @classmethod
+    def load(cls, version):
+        answer_ids, question_ids, correct = array('q'), array('q'), array('b')
+        rows = Answer.objects.order_by('id').values_list('id', 'question_id', 'is_correct')
+        for answer_id, question_id, is_correct in rows.iterator(chunk_size=LOAD_CHUNK_SIZE):
+            answer_ids.append(answer_id)
+            question_ids.append(question_id)
+            correct.append(is_correct)
+        return cls(answer_ids, question_ids, correct, version)
+
+
+class _State:
+    def __init__(self):
+        self.key = None
+        self.lock = threading.Lock()
+        # Счетчики меняются из потоков запросов одновременно: += без блокировки теряет приращения
+        self.counters_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+
+_state = _State()
+
+
+def is_enabled():
+    return getattr(settings, 'QUIZ_ANSWER_KEY_ENABLED', False)
+
+
+def current_version():
+    """Версия ключа в общем кэше. None, если кэш недоступен."""
+    try:
+        return cache.get_or_set(VERSION_CACHE_KEY, initial_generation, timeout=None)
+    except Exception as e:
+        logger.error("Не удалось прочитать версию ключа ответов: %s", e)
+        return None
+
+
+def bump_version():
+    """Увеличивает версию ключа в общем кэше, чтобы все процессы перечитали ключ."""
+    try:
+        cache.add(VERSION_CACHE_KEY, initial_generation(), timeout=None)
+        cache.incr(VERSION_CACHE_KEY)
+    except Exception as e:
+        logger.error("Не удалось обновить версию ключа ответов: %s", e)
+
+
+def invalidate_local():
+    """Сбрасывает ключ текущего процесса; он будет перечитан при следующем обращении."""
+    _state.key = None
+
+
+def get_answer_key():
+    """
+    Возвращает актуальный ключ ответов процесса, при необходимости перечитывая его из БД.
+    Версия в общем кэше проверяется не чаще раза в QUIZ_ANSWER_KEY_CHECK_INTERVAL секунд.
+    Возвращает None, если ключ выключен или общий кэш недоступен.
+    """
+    if not is_enabled():
+        return None
+
+    key = _state.key
+    interval = getattr(settings, 'QUIZ_ANSWER_KEY_CHECK_INTERVAL', 1.0)
+    if key is not None and time.monotonic() - key.checked_at < interval:
+        return key
+
+    return _checked(key, current_version())
+
+
+def _checked(key, version):
+    """Ключ процесса для версии из общего кэша; перечитывается из БД, если версия сменилась."""
+    if version is None:
+        return None
+    if key is not None and key.version == version:
+        key.checked_at = time.monotonic()
+        return key
+
+    with _state.lock:
+        key = _state.key
+        if key is None or key.version != version:
+            key = AnswerKey.load(version)
+            _state.key = key
+            _state.loads += 1
+            logger.info("Ключ ответов загружен: %s ответов, версия %s", len(key), version)
+    return key
+
+
+async def acurrent_version():
+    """Асинхронный вариант current_version."""
+    try:
+        return await cache.aget_or_set(VERSION_CACHE_KEY, initial_generation, timeout=None)
+    except Exception as e:
+        logger.error("Не удалось прочитать версию ключа ответов: %s", e)
+        return None
+
+
+async def aget_answer_key():
+    """
+    Асинхронный вариант get_answer_key: свежий ключ возвращается без переключения потоков,
+    версия проверяется асинхронным чтением кэша, и только перезагрузка из БД (при смене версии)
+    выполняется через sync_to_async.
+    """
+    if not is_enabled():
+        return None
+    key = _state.key
+    interval = getattr(settings, 'QUIZ_ANSWER_KEY_CHECK_INTERVAL', 1.0)
+    if key is not None and time.monotonic() - key.checked_at < interval:
+        return key
+    version = await acurrent_version()
+    if version is None or (key is not None and key.version == version):
+        return _checked(key, version)
+    return await sync_to_async(_checked)(key, version)
+
+
+def rebuild():
+    """Объявляет новую версию ключа для всех процессов и сразу загружает ее в текущем."""
+    bump_version()
+    invalidate_local()
+    return get_answer_key()
+
+
+def warm():
+    """Загружает ключ при старте процесса; ошибки не мешают запуску."""
+    try:
+        get_answer_key()
+    except Exception as e:
+        logger.error("Не удалось прогреть ключ ответов: %s", e)
+
+
+def record(hits=0, misses=0):
+    with _state.counters_lock:
+        _state.hits += hits
+        _state.misses += misses
+
+
+def stats():
+    key = _state.key
+    with _state.counters_lock:
+        hits, misses = _state.hits, _state.misses
+    return {
+        'enabled': is_enabled(),
+        'loaded': key is not None,
+        'version': key.version if key is not None else None,
+        'answers': len(key) if key is not None else 0,
+        'questions': len(key.questions) if key is not None else 0,
+        'texts': len(key.question_texts) if key is not None else 0,
+        'hits': hits,
+        'misses': misses,
+        'loads': _state.loads,
+    }
@@ -0,0 +1,129 @@
+#quiz\async_views.py
+"""
+Асинхронные представления для прохождения викторины (проверка ответов, вопрос, список категорий).
+Под ASGI-сервером не занимают поток на время ожидания БД и кэша; синхронные представления
+из views.py остаются для WSGI-развертываний. Ответы совпадают с синхронными эндпоинтами.
+"""
+import functools
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+
+from config.response_cache import aget_generations
+from users.authentication import CachedJWTAuthentication
+from . import attempts
+from .checking import acheck_answers, error_status
+from .models import QuestionCategory, Question
+from .serializers import CheckAnswerSerializer, CheckAnswersSerializer, PlayQuestionSerializer
+
+logger = logging.getLogger(__name__)
+
+_authentication = CachedJWTAuthentication()
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def async_api_view(methods):
+    """
+    Аналог @api_view для async-функций: проверяет метод, аутентифицирует по JWT
+    (как DEFAULT_AUTHENTICATION_CLASSES) и требует аутентифицированного пользователя.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return json_response({"detail": f'Метод "{request.method}" не разрешен.'},
+                                     status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            try:
+                auth = await _authentication.aauthenticate(request)
+            except AuthenticationFailed as e:
+                return json_response({"detail": e.detail}, status=status.HTTP_401_UNAUTHORIZED)
+            if auth is None:
+                return json_response({"detail": "Учетные данные не были предоставлены."},
+                                     status=status.HTTP_401_UNAUTHORIZED)
+            request.user, request.auth = auth
+            return await view(request, *args, **kwargs)
+
+        # JWT не использует cookie, поэтому CSRF-проверка не нужна (как в APIView)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def parse_json(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+@async_api_view(['POST'])
+async def check_answer(request):
+    """Асинхронный вариант check_answer."""
+    serializer = CheckAnswerSerializer(data=parse_json(request))
+    if not serializer.is_valid():
+        logger.warning("Неверные входные данные: %s", serializer.errors)
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    question_id = serializer.validated_data['question_id']
+    answer_id = serializer.validated_data['answer_id']
+    result = (await acheck_answers([(question_id, answer_id)]))[0]
+    if 'error' in result:
+        logger.warning("Ошибка проверки ответа ID %s на вопрос ID %s: %s", answer_id, question_id, result['error'])
+        return json_response({"error": result['error']}, status=error_status(result['code']))
+    attempts.record(request.user, [result])
+    return json_response({"question_text": result['question_text'], "is_correct": result['is_correct']})
+
+
+@async_api_view(['POST'])
+async def check_answers_batch(request):
+    """Асинхронный вариант check_answers_batch."""
+    serializer = CheckAnswersSerializer(data=parse_json(request))
+    if not serializer.is_valid():
+        logger.warning("Неверные входные данные: %s", serializer.errors)
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    pairs = [(item['question_id'], item['answer_id']) for item in serializer.validated_data['answers']]
+    results = await acheck_answers(pairs)
+    # Запись в буфер не обращается к БД и не блокирует цикл событий
+    attempts.record(request.user, results)
+    correct = sum(1 for result in results if result.get('is_correct'))
+    return json_response({
+        "results": results,
+        "total": len(results),
+        "correct": correct,
+        "score": round(correct / len(results), 4),
+    })
+
+
+@async_api_view(['GET'])
+async def question_detail(request, pk):
+    """Вопрос для прохождения викторины с категорией и вариантами ответов (без is_correct)."""
+    queryset = Question.objects.select_related('category').prefetch_related('answers')
+    try:
+        question = await queryset.aget(pk=pk)
+    except Question.DoesNotExist:
+        return json_response({"detail": "Не найдено."}, status=status.HTTP_404_NOT_FOUND)
+    return json_response(PlayQuestionSerializer(question).data)
+
+
+@async_api_view(['GET'])
+async def category_list(request):
+    """Список категорий; кэшируется так же, как QuestionCategoryListCreateAPIView."""
+    if not settings.CACHE_ENABLED:
+        return json_response([category async for category in QuestionCategory.objects.values('id', 'name')])
+
+    generation, = await aget_generations((QuestionCategory,))
+    key = f'{settings.CACHE_MIDDLEWARE_KEY_PREFIX}resp:async_category_list:{generation}'
+    data = await cache.aget(key)
+    if data is None:
+        data = [category async for category in QuestionCategory.objects.values('id', 'name')]
+        await cache.aset(key, data, settings.CACHE_MIDDLEWARE_SECONDS)
+    return json_response(data)
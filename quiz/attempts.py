@@ -0,0 +1,208 @@
+#quiz\attempts.py
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import stats
+from .models import Question, Answer, Attempt
+
+logger = logging.getLogger(__name__)
+
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+
+
+# SQLSTATE жертвы взаимоблокировки: SQL Server (ошибка 1205) через ODBC - 40001, PostgreSQL - 40P01
+DEADLOCK_SQLSTATES = {'40001', '40P01'}
+
+
+def is_deadlock(error):
+    """
+    Транзакция выбрана жертвой взаимоблокировки. Проверяется SQLSTATE исходной ошибки драйвера
+    (Django сохраняет ее в __cause__): pyodbc передает его первым аргументом, psycopg - в pgcode/sqlstate.
+    """
+    cause = error.__cause__
+    if cause is None:
+        return False
+    sqlstate = getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)
+    if sqlstate is None and cause.args and isinstance(cause.args[0], str):
+        sqlstate = cause.args[0]
+    return sqlstate in DEADLOCK_SQLSTATES
+
+
+def write_attempts(batch):
+    """
+    Вставляет пачку через bulk_create и добавляет ее в сводную статистику (stats.py) в одной транзакции.
+    Записи о вопросах и ответах, удаленных, пока пачка ждала в буфере, отбрасываются заранее:
+    иначе нарушение внешнего ключа потеряло бы всю пачку. Транзакция, выбранная жертвой
+    взаимоблокировки, откатывается целиком и повторяется до QUIZ_ATTEMPT_DEADLOCK_RETRIES раз.
+    """
+    categories = dict(Question.objects.filter(id__in={a.question_id for a in batch}).values_list('id', 'category_id'))
+    answers = set(Answer.objects.filter(id__in={a.answer_id for a in batch}).values_list('id', flat=True))
+    batch = [a for a in batch if a.question_id in categories and a.answer_id in answers]
+    for retry in range(settings.QUIZ_ATTEMPT_DEADLOCK_RETRIES + 1):
+        try:
+            with transaction.atomic():
+                Attempt.objects.bulk_create(batch, batch_size=settings.QUIZ_ATTEMPT_BATCH_SIZE)
+                stats.merge(batch, categories)
+            return len(batch)
+        except DatabaseError as e:
+            if not is_deadlock(e) or retry == settings.QUIZ_ATTEMPT_DEADLOCK_RETRIES:
+                raise
+            logger.warning("Взаимоблокировка при записи %s попыток, повтор %s: %s", len(batch), retry + 1, e)
+            # После отката bulk_create мог оставить pk у объектов - вставляем заново без них
+            for attempt in batch:
+                attempt.pk = None
+            time.sleep(0.05 * (retry + 1))
+
+
+class AttemptBuffer:
+    """
+    Ограниченный буфер попыток процесса. add() никогда не ждет БД: записи складываются в очередь,
+    фоновый поток вставляет их, когда накопилось batch_size записей или прошло interval секунд.
+    При переполнении (max_size) отбрасываются новые записи (drop_newest) или самые старые (drop_oldest),
+    отброшенные учитываются в stats(). При остановке процесса остаток вставляется в stop().
+    """
+
+    def __init__(self, batch_size, interval, max_size, policy=DROP_NEWEST, writer=write_attempts, background=True):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_size = max_size
+        self.policy = policy
+        self.writer = writer
+        self.background = background
+        self.items = deque()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def add(self, attempts):
+        with self.condition:
+            for attempt in attempts:
+                if len(self.items) >= self.max_size:
+                    self.dropped += 1
+                    if self.policy == DROP_NEWEST:
+                        continue
+                    self.items.popleft()
+                self.items.append(attempt)
+            if len(self.items) >= self.batch_size:
+                self.condition.notify()
+            if self.background and self.thread is None and not self.stopped:
+                self.thread = threading.Thread(target=self.run, name='attempt-buffer', daemon=True)
+                self.thread.start()
+
+    def take(self):
+        batch = list(self.items)
+        self.items.clear()
+        return batch
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.stopped or len(self.items) >= self.batch_size, timeout=self.interval)
+                batch = self.take()
+                stopped = self.stopped
+            if batch:
+                close_old_connections()
+                self.write(batch)
+            if stopped:
+                connection.close()
+                return
+
+    def write(self, batch):
+        started = time.monotonic()
+        try:
+            written = self.writer(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Не удалось записать %s попыток ответов", len(batch))
+            return
+        self.written += written
+        self.failed += len(batch) - written
+        self.flushes += 1
+        logger.debug("Записано попыток: %s за %.1f мс", written, (time.monotonic() - started) * 1000)
+
+    def flush(self):
+        """Записывает накопленное в текущем потоке."""
+        with self.condition:
+            batch = self.take()
+        if batch:
+            self.write(batch)
+
+    def stop(self, timeout=5.0):
+        """Останавливает фоновый поток и записывает остаток (вызывается при завершении процесса)."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self.condition:
+            pending = len(self.items)
+        return {
+            'enabled': settings.QUIZ_ATTEMPT_LOG_ENABLED,
+            'pending': pending,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'flushes': self.flushes,
+        }
+
+
+_buffer = None
+_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _lock:
+            if _buffer is None:
+                _buffer = AttemptBuffer(
+                    batch_size=settings.QUIZ_ATTEMPT_BATCH_SIZE,
+                    interval=settings.QUIZ_ATTEMPT_FLUSH_INTERVAL_MS / 1000,
+                    max_size=settings.QUIZ_ATTEMPT_BUFFER_SIZE,
+                    policy=settings.QUIZ_ATTEMPT_OVERFLOW,
+                )
+                atexit.register(_buffer.stop)
+    return _buffer
+
+
+def shutdown():
+    """Останавливает буфер процесса и дописывает остаток; следующий record() начнет новый буфер."""
+    global _buffer
+    with _lock:
+        buffer, _buffer = _buffer, None
+    if buffer is not None:
+        buffer.stop()
+
+
+def record(user, results):
+    """
+    Ставит в буфер попытки по результатам check_answers; пары с ошибкой (нет вопроса,
+    ответ от другого вопроса) не записываются. Не обращается к БД.
+    """
+    if not settings.QUIZ_ATTEMPT_LOG_ENABLED:
+        return
+    now = timezone.now()
+    attempts = [
+        Attempt(user_id=user.pk, question_id=result['question_id'], answer_id=result['answer_id'],
+                is_correct=result['is_correct'], created_at=now)
+        for result in results
+        if 'is_correct' in result
+    ]
+    if attempts:
+        get_buffer().add(attempts)
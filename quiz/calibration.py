@@ -0,0 +1,273 @@
+#quiz\calibration.py
+"""
+Калибровка трудности вопросов по журналу попыток моделью IRT (1PL - модель Раша, 2PL - с дискриминативностью):
+P(верно) = 1 / (1 + exp(-a_q * (theta_u - b_q))), где theta_u - способность пользователя, b_q - трудность вопроса.
+
+Попытки группируются в БД до строк (пользователь, вопрос, попыток, верных) и потоком пишутся во временный файл,
+после чего каждая итерация читает его пачками через memmap. В памяти держатся только параметры
+(по числу пользователей и вопросов) и одна пачка, поэтому объем журнала не ограничен памятью.
+Все вычисления по пачке векторные: суммы по пользователям и вопросам собираются np.bincount.
+"""
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
+
+from config.response_cache import bump_generation
+from .models import Attempt, Question
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+ROW = np.dtype([('user', np.int32), ('question', np.int32), ('n', np.int32), ('k', np.int32)])
+
+MODELS = ('1pl', '2pl')
+
+# Нормальные априорные распределения (MAP-оценка): не дают параметрам уйти в бесконечность
+# у пользователей и вопросов, где все ответы верные или все неверные
+THETA_SCALE = 1.0
+DIFFICULTY_SCALE = 2.0
+LOG_DISCRIMINATION_SCALE = 0.5
+
+# Наибольший шаг параметра за итерацию
+MAX_STEP = 1.0
+
+
+class Responses:
+    """Сгруппированные ответы во временном файле; users и questions - ID по индексам строк."""
+
+    def __init__(self, path, users, questions):
+        self.path = path
+        self.users = users
+        self.questions = questions
+        self.rows = np.memmap(path, dtype=ROW, mode='r') if os.path.getsize(path) else np.empty(0, dtype=ROW)
+
+    @classmethod
+    def from_arrays(cls, users, questions, user_index, question_index, n, k, directory=None):
+        """Ответы из готовых массивов индексов (для проверки на синтетических данных)."""
+        rows = np.empty(len(user_index), dtype=ROW)
+        rows['user'], rows['question'], rows['n'], rows['k'] = user_index, question_index, n, k
+        fd, path = tempfile.mkstemp(suffix='.responses', dir=directory)
+        with os.fdopen(fd, 'wb') as file:
+            rows.tofile(file)
+        return cls(path, np.asarray(users), np.asarray(questions))
+
+    @classmethod
+    def load(cls, chunk_size=100_000, directory=None):
+        """
+        Читает журнал попыток, сгруппированный по (пользователь, вопрос), пачками по chunk_size строк.
+        ID переводятся в индексы поиском по отсортированным массивам ID, а не словарями.
+        """
+        users = np.fromiter(User.objects.order_by('id').values_list('id', flat=True).iterator(), dtype=np.int64)
+        questions = np.fromiter(Question.objects.order_by('id').values_list('id', flat=True).iterator(), dtype=np.int64)
+        rows = (
+            Attempt.objects.order_by().values_list('user_id', 'question_id')
+            .annotate(n=Count('id'), k=Count('id', filter=Q(is_correct=True)))
+            .iterator(chunk_size=chunk_size)
+        )
+        fd, path = tempfile.mkstemp(suffix='.responses', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                while True:
+                    chunk = np.array([row for _, row in zip(range(chunk_size), rows)], dtype=np.int64).reshape(-1, 4)
+                    if not len(chunk):
+                        break
+                    cls.encode(chunk, users, questions).tofile(file)
+        except BaseException:
+            os.remove(path)
+            raise
+        return cls(path, users, questions)
+
+    @staticmethod
+    def encode(chunk, users, questions):
+        user_index = np.searchsorted(users, chunk[:, 0])
+        question_index = np.searchsorted(questions, chunk[:, 1])
+        # Пользователи и вопросы, созданные или удаленные во время чтения, пропускаются
+        known = (
+            (user_index < len(users)) & (users[np.minimum(user_index, len(users) - 1)] == chunk[:, 0])
+            & (question_index < len(questions)) & (questions[np.minimum(question_index, len(questions) - 1)] == chunk[:, 1])
+        ) if len(users) and len(questions) else np.zeros(len(chunk), dtype=bool)
+        rows = np.empty(int(known.sum()), dtype=ROW)
+        rows['user'], rows['question'] = user_index[known], question_index[known]
+        rows['n'], rows['k'] = chunk[known, 2], chunk[known, 3]
+        return rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def chunks(self, chunk_size):
+        for start in range(0, len(self.rows), chunk_size):
+            yield self.rows[start:start + chunk_size]
+
+    def close(self):
+        self.rows = None
+        os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@dataclass
+class Calibration:
+    question_ids: np.ndarray
+    difficulty: np.ndarray
+    discrimination: np.ndarray
+    attempts: np.ndarray
+    ability: np.ndarray
+    iterations: int
+    converged: bool
+    log_likelihood: float
+
+
+def sigmoid(z):
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+def terms(responses, theta, difficulty, a, chunk_size):
+    """Для каждой пачки: индексы, a_q, z = a_q * (theta_u - b_q), остатки k - n*p и веса n*p*(1-p)."""
+    for chunk in responses.chunks(chunk_size):
+        users, questions = chunk['user'], chunk['question']
+        n, k = chunk['n'].astype(float), chunk['k'].astype(float)
+        a_q = a[questions]
+        z = a_q * (theta[users] - difficulty[questions])
+        p = sigmoid(z)
+        yield users, questions, n, k, a_q, z, k - n * p, n * p * (1.0 - p)
+
+
+def fit(responses, model='2pl', max_iter=100, tol=1e-3, chunk_size=100_000):
+    """
+    MAP-оценка параметров поочередными шагами Ньютона: при фиксированных вопросах способности
+    пользователей независимы друг от друга (шаг по диагонали), при фиксированных способностях независимы
+    вопросы (у 2PL - система 2x2 для трудности и log a на каждый вопрос, решенная векторно).
+    Итерация - два прохода по ответам; останавливается, когда наибольший шаг меньше tol.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Неизвестная модель: {model}")
+    two_pl = model == '2pl'
+    user_count, question_count = len(responses.users), len(responses.questions)
+    theta = np.zeros(user_count)
+    difficulty = np.zeros(question_count)
+    log_a = np.zeros(question_count)
+    attempts = np.zeros(question_count, dtype=np.int64)
+    for chunk in responses.chunks(chunk_size):
+        attempts += np.bincount(chunk['question'], chunk['n'], minlength=question_count).astype(np.int64)
+
+    theta_precision = 1.0 / THETA_SCALE ** 2
+    b_precision = 1.0 / DIFFICULTY_SCALE ** 2
+    log_a_precision = 1.0 / LOG_DISCRIMINATION_SCALE ** 2
+    converged, log_likelihood, iteration = False, 0.0, 0
+    for iteration in range(1, max_iter + 1):
+        a = np.exp(log_a)
+        gradient, information = -theta * theta_precision, np.full(user_count, theta_precision)
+        log_likelihood = 0.0
+        for users, questions, n, k, a_q, z, residual, weight in terms(responses, theta, difficulty, a, chunk_size):
+            log_likelihood += float(np.sum(k * z - n * np.logaddexp(0.0, z)))
+            gradient += np.bincount(users, a_q * residual, minlength=user_count)
+            information += np.bincount(users, a_q * a_q * weight, minlength=user_count)
+        theta_step = np.clip(gradient / information, -MAX_STEP, MAX_STEP)
+        theta += theta_step
+
+        # Производные по b и по log a: dz/db = -a_q, dz/dlog_a = z
+        g_b, i_bb = -difficulty * b_precision, np.full(question_count, b_precision)
+        g_a, i_aa = -log_a * log_a_precision, np.full(question_count, log_a_precision)
+        i_ba = np.zeros(question_count)
+        for users, questions, n, k, a_q, z, residual, weight in terms(responses, theta, difficulty, a, chunk_size):
+            g_b -= np.bincount(questions, a_q * residual, minlength=question_count)
+            i_bb += np.bincount(questions, a_q * a_q * weight, minlength=question_count)
+            if two_pl:
+                g_a += np.bincount(questions, z * residual, minlength=question_count)
+                i_aa += np.bincount(questions, z * z * weight, minlength=question_count)
+                i_ba -= np.bincount(questions, a_q * z * weight, minlength=question_count)
+        if two_pl:
+            determinant = i_bb * i_aa - i_ba * i_ba
+            b_step = np.clip((i_aa * g_b - i_ba * g_a) / determinant, -MAX_STEP, MAX_STEP)
+            a_step = np.clip((i_bb * g_a - i_ba * g_b) / determinant, -MAX_STEP, MAX_STEP)
+            log_a += a_step
+        else:
+            b_step = np.clip(g_b / i_bb, -MAX_STEP, MAX_STEP)
+            a_step = np.zeros(0)
+        difficulty += b_step
+
+        largest = max(float(np.abs(step).max(initial=0.0)) for step in (theta_step, b_step, a_step))
+        logger.debug("Итерация %s: logL=%.1f, наибольший шаг %.5f", iteration, log_likelihood, largest)
+        if largest < tol:
+            converged = True
+            break
+
+    # Шкала выбирается так, чтобы способности пользователей имели среднее 0 и отклонение 1:
+    # правдоподобие от этого не меняется, а трудности разных запусков сравнимы между собой
+    center = float(theta.mean()) if user_count else 0.0
+    spread = float(theta.std()) if user_count > 1 and theta.std() > 0 else 1.0
+    return Calibration(
+        question_ids=responses.questions,
+        difficulty=(difficulty - center) / spread,
+        discrimination=np.exp(log_a) * spread if two_pl else np.ones(question_count),
+        attempts=attempts,
+        ability=(theta - center) / spread,
+        iterations=iteration,
+        converged=converged,
+        log_likelihood=log_likelihood,
+    )
+
+
+def suggest_label(difficulty, easy_below, hard_above):
+    if difficulty < easy_below:
+        return 'easy'
+    if difficulty > hard_above:
+        return 'hard'
+    return 'medium'
+
+
+def suggestions(calibration, min_attempts, easy_below=-0.5, hard_above=0.5):
+    """
+    Вопросы, у которых метка difficulty расходится с откалиброванной трудностью:
+    [(question_id, метка, предлагаемая метка, трудность, попыток), ...] по убыванию расхождения.
+    Учитываются только вопросы с min_attempts попытками и больше.
+    """
+    enough = calibration.attempts >= min_attempts
+    ids = calibration.question_ids[enough]
+    values = dict(zip(ids.tolist(), zip(calibration.difficulty[enough].tolist(), calibration.attempts[enough].tolist())))
+    rank = {'easy': 0, 'medium': 1, 'hard': 2}
+    result = []
+    for question_id, label in Question.objects.filter(id__in=values).values_list('id', 'difficulty').iterator():
+        difficulty, attempts = values[question_id]
+        suggested = suggest_label(difficulty, easy_below, hard_above)
+        if suggested != label:
+            result.append((question_id, label, suggested, difficulty, attempts))
+    result.sort(key=lambda row: (-abs(rank[row[2]] - rank.get(row[1], 1)), -abs(row[3]), row[0]))
+    return result
+
+
+def save(calibration, min_attempts, model='2pl', batch_size=1000):
+    """
+    Записывает трудность и дискриминативность (только для 2PL) вопросам с min_attempts попытками и больше,
+    у остальных параметры сбрасываются. Возвращает число откалиброванных вопросов.
+    """
+    enough = calibration.attempts >= min_attempts
+    values = {
+        question_id: (round(difficulty, 4), round(discrimination, 4) if model == '2pl' else None) if ok else (None, None)
+        for question_id, difficulty, discrimination, ok in zip(
+            calibration.question_ids.tolist(), calibration.difficulty.tolist(),
+            calibration.discrimination.tolist(), enough.tolist(),
+        )
+    }
+    questions = []
+    for question in Question.objects.only('id').iterator(chunk_size=batch_size):
+        question.calibrated_difficulty, question.discrimination = values.get(question.pk, (None, None))
+        questions.append(question)
+        if len(questions) >= batch_size:
+            Question.objects.bulk_update(questions, ['calibrated_difficulty', 'discrimination'])
+            questions = []
+    if questions:
+        Question.objects.bulk_update(questions, ['calibrated_difficulty', 'discrimination'])
+    # bulk_update не отправляет сигналы
+    bump_generation(Question)
+    return int(enough.sum())
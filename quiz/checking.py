@@ -0,0 +1,139 @@
+#quiz\checking.py
+from asgiref.sync import sync_to_async
+from rest_framework import status
+
+from . import answer_key
+from .models import Question, Answer
+
+QUESTION_NOT_FOUND = 'question_not_found'
+ANSWER_NOT_FOUND = 'answer_not_found'
+ANSWER_MISMATCH = 'answer_mismatch'
+
+ERRORS = {
+    QUESTION_NOT_FOUND: ("Вопрос не найден", status.HTTP_404_NOT_FOUND),
+    ANSWER_NOT_FOUND: ("Ответ не найден", status.HTTP_404_NOT_FOUND),
+    ANSWER_MISMATCH: ("Этот ответ не принадлежит данному вопросу.", status.HTTP_400_BAD_REQUEST),
+}
+
+
+def check_answers(pairs):
+    """
+    Проверяет список пар (question_id, answer_id).
+    Возвращает по результату на каждую пару: is_correct и текст вопроса либо код и текст ошибки.
+    Пары, которые нельзя разрешить по ключу ответов в памяти, проверяются в БД.
+    """
+    key = answer_key.get_answer_key()
+    if key is None:
+        return check_answers_in_db(pairs)
+
+    results, pending = _check_with_key(key, pairs, key.texts(_matched_questions(key, pairs)))
+    if pending:
+        for index, result in zip(pending, check_answers_in_db([pairs[index] for index in pending])):
+            results[index] = result
+    return results
+
+
+async def acheck_answers(pairs):
+    """Асинхронный вариант check_answers: ключ ответов в памяти, остальное - через async ORM."""
+    key = await answer_key.aget_answer_key()
+    if key is None:
+        return await acheck_answers_in_db(pairs)
+
+    matched = _matched_questions(key, pairs)
+    texts = key.texts(matched, load=False)
+    if len(texts) < len(matched):
+        texts = await sync_to_async(key.texts)(matched)
+    results, pending = _check_with_key(key, pairs, texts)
+    if pending:
+        for index, result in zip(pending, await acheck_answers_in_db([pairs[index] for index in pending])):
+            results[index] = result
+    return results
+
+
+def check_answers_in_db(pairs):
+    """
+    Проверяет пары одним запросом к Answer.
+    Дополнительный запрос к Question выполняется только если среди пар есть ошибочные.
+    """
+    answers = {row['id']: row for row in _answers_query(pairs)}
+    failed = _failed_questions(pairs, answers)
+    existing = set(Question.objects.filter(id__in=failed).values_list('id', flat=True)) if failed else set()
+    return _build_results(pairs, answers, existing)
+
+
+async def acheck_answers_in_db(pairs):
+    """Асинхронный вариант check_answers_in_db."""
+    answers = {row['id']: row async for row in _answers_query(pairs)}
+    failed = _failed_questions(pairs, answers)
+    existing = set()
+    if failed:
+        existing = {question_id async for question_id in Question.objects.filter(id__in=failed).values_list('id', flat=True)}
+    return _build_results(pairs, answers, existing)
+
+
+def _matched_questions(key, pairs):
+    """ID вопросов, ответ на которые найден в ключе и принадлежит вопросу: только для них нужен текст."""
+    return {question_id for question_id, answer_id in pairs if (key.lookup(answer_id) or (None,))[0] == question_id}
+
+
+def _check_with_key(key, pairs, texts):
+    """
+    Разрешает пары по ключу ответов и текстам вопросов texts; возвращает результаты
+    и индексы пар, требующих проверки в БД.
+    """
+    results = []
+    pending = []
+    for index, (question_id, answer_id) in enumerate(pairs):
+        entry = key.lookup(answer_id)
+        matched = entry is not None and entry[0] == question_id
+        if entry is None or (question_id not in texts if matched else not key.has_question(question_id)):
+            pending.append(index)
+            results.append(None)
+            continue
+        result = {'question_id': question_id, 'answer_id': answer_id}
+        if matched:
+            result.update(question_text=texts[question_id], is_correct=entry[1])
+        else:
+            result.update(code=ANSWER_MISMATCH, error=ERRORS[ANSWER_MISMATCH][0])
+        results.append(result)
+
+    answer_key.record(hits=len(pairs) - len(pending), misses=len(pending))
+    return results, pending
+
+
+def _answers_query(pairs):
+    answer_ids = {answer_id for _, answer_id in pairs}
+    return Answer.objects.filter(id__in=answer_ids).values('id', 'question_id', 'is_correct', 'question__text')
+
+
+def _matches(answers, question_id, answer_id):
+    answer = answers.get(answer_id)
+    return answer is not None and answer['question_id'] == question_id
+
+
+def _failed_questions(pairs, answers):
+    return {question_id for question_id, answer_id in pairs if not _matches(answers, question_id, answer_id)}
+
+
+def _build_results(pairs, answers, existing):
+    results = []
+    for question_id, answer_id in pairs:
+        result = {'question_id': question_id, 'answer_id': answer_id}
+        answer = answers.get(answer_id)
+        if not _matches(answers, question_id, answer_id):
+            if question_id not in existing:
+                code = QUESTION_NOT_FOUND
+            elif answer is None:
+                code = ANSWER_NOT_FOUND
+            else:
+                code = ANSWER_MISMATCH
+            result.update(code=code, error=ERRORS[code][0])
+        else:
+            result.update(question_text=answer['question__text'], is_correct=answer['is_correct'])
+        results.append(result)
+    return results
+
+
+def error_status(code):
+    """HTTP-статус для кода ошибки проверки ответа."""
+    return ERRORS[code][1]
@@ -0,0 +1,73 @@
+#quiz\exporters.py
+import csv
+import io
+import json
+
+from django.db.models import Prefetch
+
+from .importers import CSV_FIELDS
+from .models import Question, Answer
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_records(chunk_size=2000):
+    """
+    Вопросы с категорией и ответами в схеме load_quiz_data. Таблица обходится через
+    .iterator(chunk_size): на каждую пачку вопросов - один запрос с JOIN категорий
+    и один запрос ответов, в памяти одновременно не больше одной пачки.
+    """
+    queryset = (
+        Question.objects
+        .select_related('category')
+        .only('id', 'text', 'difficulty', 'category__name')
+        .prefetch_related(Prefetch('answers', queryset=Answer.objects.only('id', 'question_id', 'text', 'is_correct').order_by('id')))
+        .order_by('id')
+    )
+    for question in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'category': question.category.name,
+            'question': question.text,
+            'difficulty': question.difficulty,
+            'answers': [{'text': answer.text, 'is_correct': answer.is_correct} for answer in question.answers.all()],
+        }
+
+
+def write_json_array(records):
+    """JSON-массив, который читает iter_json_array: по одному объекту на строку."""
+    yield '['
+    separator = '\n'
+    for record in records:
+        yield separator + json.dumps(record, ensure_ascii=False)
+        separator = ',\n'
+    yield '\n]\n'
+
+
+def write_ndjson(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def write_csv(records):
+    """CSV с колонками CSV_FIELDS: одна строка на ответ, вопрос без ответов - строка с пустым ответом."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for record in records:
+        rows = record['answers'] or [{'text': '', 'is_correct': ''}]
+        for answer in rows:
+            writer.writerow((record['category'], record['question'], record['difficulty'], answer['text'], answer['is_correct']))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+WRITERS = {
+    'json': write_json_array,
+    'ndjson': write_ndjson,
+    'csv': write_csv,
+}
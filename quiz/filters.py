@@ -0,0 +1,19 @@
+#quiz\filters.py
+import django_filters
+
+from .models import Question
+
+
+class QuestionFilter(django_filters.FilterSet):
+    """
+    ?category=, ?difficulty=, ?text__startswith=. Категория фильтруется по числовому ID
+    без проверки существования, чтобы фильтр не добавлял запрос к каждой странице.
+    """
+    category = django_filters.NumberFilter(field_name='category_id')
+
+    class Meta:
+        model = Question
+        fields = {
+            'difficulty': ['exact'],
+            'text': ['startswith'],
+        }
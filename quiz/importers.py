@@ -0,0 +1,290 @@
+#quiz\importers.py
+import csv
+import itertools
+import json
+import time
+
+from django.db import transaction
+
+from config.response_cache import bump_generation
+from search import indexing as search_index
+from . import answer_key
+from .models import DIFFICULTY_CHOICES, QuestionCategory, Question, Answer, content_hash
+
+READ_SIZE = 64 * 1024
+CSV_FIELDS = ('category', 'question', 'difficulty', 'answer', 'is_correct')
+ANSWER_MAX_LENGTH = Answer._meta.get_field('text').max_length
+# Сколько ошибок в записях хранить в ImportStats.errors для отчета
+MAX_REPORTED_ERRORS = 100
+
+# Ключи выбора и русские подписи ("Легкий", "Средний", ...) приводятся к ключам Question.difficulty
+DIFFICULTY_MAP = {}
+for _key, _label in DIFFICULTY_CHOICES:
+    DIFFICULTY_MAP[_key] = _key
+    DIFFICULTY_MAP[_label.lower()] = _key
+
+
+def normalize_difficulty(value):
+    """Возвращает ключ сложности для значения из файла или None, если значение неизвестно."""
+    return DIFFICULTY_MAP.get(str(value).strip().lower())
+
+
+def iter_json_array(stream, read_size=READ_SIZE):
+    """
+    Потоково читает JSON-массив объектов, не загружая весь файл в память.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    opened = False
+    exhausted = False
+
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(buffer):
+            if exhausted:
+                if opened:
+                    raise ValueError("Неожиданный конец JSON-массива")
+                return
+            chunk = stream.read(read_size)
+            exhausted = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        if not opened:
+            if buffer[position] != '[':
+                raise ValueError("Ожидался JSON-массив")
+            opened = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise
+            # Объект не поместился в буфер целиком - дочитываем следующий кусок
+            chunk = stream.read(read_size)
+            exhausted = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        yield item
+        position = end
+        if position > read_size:
+            buffer = buffer[position:]
+            position = 0
+
+
+def iter_ndjson(stream):
+    """Читает по одному JSON-объекту на строку."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_csv(stream):
+    """
+    Читает CSV с колонками category, question, difficulty, answer, is_correct.
+    Каждая строка - один ответ; подряд идущие строки одного вопроса собираются в одну запись.
+    Строка с пустым answer означает вопрос без ответов.
+    """
+    reader = csv.DictReader(stream)
+    missing = set(CSV_FIELDS) - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"В CSV нет колонок: {', '.join(sorted(missing))}")
+    group_key = lambda row: (row['category'], row['question'], row['difficulty'])
+    for (category, question, difficulty), rows in itertools.groupby(reader, key=group_key):
+        yield {
+            'category': category,
+            'question': question,
+            'difficulty': difficulty,
+            'answers': [
+                {'text': row['answer'], 'is_correct': str(row['is_correct']).strip().lower() in ('1', 'true', 'yes')}
+                for row in rows if row['answer']
+            ],
+        }
+
+
+READERS = {
+    'json': iter_json_array,
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
+
+
+def detect_format(path):
+    """Определяет формат файла по расширению (.gz не учитывается)."""
+    path = path.removesuffix('.gz')
+    if path.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if path.endswith('.csv'):
+        return 'csv'
+    return 'json'
+
+
+class InvalidRecord(Exception):
+    """Запись файла не прошла проверку: она пропускается, загрузка продолжается."""
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.errors = []  # (номер записи, причина) - первые MAX_REPORTED_ERRORS
+        self.answers = 0
+        self.started = time.monotonic()
+
+    def reject(self, row, reason):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row, reason))
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+
+def insert_questions(records, batch_size=1000):
+    """
+    Вставляет вопросы и их ответы через bulk_create. Запись - словарь с category_id, text,
+    difficulty, hash и answers; хэши в пачке должны быть уникальны. Возвращает созданные
+    вопросы (с первичными ключами) и число ответов. Вопросы сразу попадают в поисковый индекс.
+    """
+    questions = Question.objects.bulk_create([
+        Question(
+            category_id=record['category_id'],
+            text=record['text'],
+            difficulty=record['difficulty'],
+            content_hash=record['hash'],
+        )
+        for record in records
+    ], batch_size=batch_size)
+    if any(question.pk is None for question in questions):
+        # Бэкенд не вернул первичные ключи после bulk_create - дочитываем их по хэшу
+        ids = dict(Question.objects.filter(content_hash__in=[q.content_hash for q in questions])
+                   .values_list('content_hash', 'id'))
+        for question in questions:
+            question.pk = ids[question.content_hash]
+
+    answers = [
+        Answer(question_id=question.pk, text=answer['text'], is_correct=bool(answer.get('is_correct', False)))
+        for question, record in zip(questions, records)
+        for answer in record['answers']
+    ]
+    Answer.objects.bulk_create(answers, batch_size=batch_size)
+    search_index.index_objects('question', questions, fresh=True, batch_size=batch_size)
+    return questions, len(answers)
+
+
+def invalidate_caches():
+    """bulk_create не отправляет сигналы - ключ ответов и кэш ответов сбрасываем явно."""
+    answer_key.invalidate_local()
+    answer_key.bump_version()
+    for model in (QuestionCategory, Question, Answer):
+        bump_generation(model)
+
+
+class QuizImporter:
+    """
+    Пакетная загрузка вопросов: категории кэшируются в памяти, вопросы и ответы
+    вставляются через bulk_create пачками по batch_size, каждая пачка - в своей транзакции.
+    """
+
+    def __init__(self, batch_size=1000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.stats = ImportStats()
+        self.categories = None
+
+    def run(self, items):
+        self.categories = dict(QuestionCategory.objects.values_list('name', 'id'))
+        batch = []
+        for item in items:
+            self.stats.rows += 1
+            try:
+                record = self._prepare(item)
+            except InvalidRecord as e:
+                self.stats.reject(self.stats.rows, str(e))
+                continue
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        if self.stats.created:
+            invalidate_caches()
+        return self.stats
+
+    def _prepare(self, item):
+        """Проверяет запись файла целиком до вставки: ошибка в одном ответе не должна прерывать пачку."""
+        try:
+            category_name = item['category'].strip()
+            text = item['question'].strip()
+            answers = item['answers']
+        except (KeyError, AttributeError, TypeError):
+            raise InvalidRecord("нужны category, question и answers")
+        difficulty = normalize_difficulty(item.get('difficulty', ''))
+        if not category_name or not text:
+            raise InvalidRecord("пустые category или question")
+        if difficulty is None:
+            raise InvalidRecord(f"неизвестная сложность {item.get('difficulty')!r}")
+        return {
+            'category': category_name,
+            'text': text,
+            'difficulty': difficulty,
+            'answers': self._prepare_answers(answers),
+            'hash': content_hash(category_name, text, difficulty),
+        }
+
+    def _prepare_answers(self, answers):
+        if not isinstance(answers, list):
+            raise InvalidRecord("answers должен быть списком")
+        prepared = []
+        for number, answer in enumerate(answers, 1):
+            text = answer.get('text') if isinstance(answer, dict) else None
+            if not isinstance(text, str) or not text.strip():
+                raise InvalidRecord(f"у ответа {number} нет текста")
+            if len(text.strip()) > ANSWER_MAX_LENGTH:
+                raise InvalidRecord(f"ответ {number} длиннее {ANSWER_MAX_LENGTH} символов")
+            prepared.append({'text': text.strip(), 'is_correct': bool(answer.get('is_correct', False))})
+        return prepared
+
+    def _category_id(self, name):
+        category_id = self.categories.get(name)
+        if category_id is None:
+            category_id = QuestionCategory.objects.get_or_create(name=name)[0].pk
+            self.categories[name] = category_id
+        return category_id
+
+    @transaction.atomic
+    def _flush(self, batch):
+        hashes = {record['hash'] for record in batch}
+        seen = set(Question.objects.filter(content_hash__in=hashes).values_list('content_hash', flat=True))
+
+        fresh = []
+        for record in batch:
+            if record['hash'] in seen:
+                self.stats.skipped += 1
+                continue
+            seen.add(record['hash'])
+            fresh.append(record)
+
+        for record in fresh:
+            record['category_id'] = self._category_id(record['category'])
+        questions, answers = insert_questions(fresh, self.batch_size)
+
+        self.stats.created += len(questions)
+        self.stats.answers += answers
+        if self.progress:
+            self.progress(self.stats)
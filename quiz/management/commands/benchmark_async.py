@@ -0,0 +1,90 @@
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from config.benchmarks import summarize
+from quiz.models import Answer
+
+
+class Command(BaseCommand):
+    help = ('Compares sync quiz-play endpoints on a WSGI server with async ones on an ASGI server '
+            'under concurrent load')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Адрес WSGI-сервера (gunicorn) для синхронных эндпоинтов')
+        parser.add_argument('--async-base-url', help='Адрес ASGI-сервера (uvicorn/daphne) для async-эндпоинтов; по умолчанию --base-url')
+        parser.add_argument('--username', help='Пользователь для получения JWT (нужен суперпользователь для questions/<pk>/)')
+        parser.add_argument('--password')
+        parser.add_argument('--token', help='Готовый access-токен вместо --username/--password')
+        parser.add_argument('--requests', type=int, default=1000, help='Количество запросов на эндпоинт')
+        parser.add_argument('--concurrency', type=int, default=50, help='Количество одновременных клиентов')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        self.base_url = options['base_url'].rstrip('/')
+        # Сравнение WSGI и ASGI имеет смысл, только если пути обслуживают разные серверы
+        base_urls = {'sync': self.base_url, 'async': (options['async_base_url'] or self.base_url).rstrip('/')}
+        if base_urls['sync'] == base_urls['async']:
+            self.stderr.write('Оба режима идут на один сервер - укажите --async-base-url, чтобы сравнить WSGI и ASGI')
+        self.timeout = options['timeout']
+        token = options['token'] or self.obtain_token(options['username'], options['password'])
+        self.headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+
+        answer = Answer.objects.select_related('question').order_by('question_id', 'id').first()
+        if answer is None:
+            raise CommandError('Нет вопросов с ответами для теста - загрузите данные (load_quiz_data)')
+        question = answer.question
+        check_body = json.dumps({'question_id': question.pk, 'answer_id': answer.pk}).encode('utf-8')
+
+        scenarios = [
+            ('check_answer', 'POST', '/api/quiz/check_answer/', '/api/quiz/async/check_answer/', check_body),
+            ('question', 'GET', f'/api/quiz/questions/{question.pk}/', f'/api/quiz/async/questions/{question.pk}/', None),
+            ('categories', 'GET', '/api/quiz/categories/', '/api/quiz/async/categories/', None),
+        ]
+
+        self.stdout.write(f"{'endpoint':<14}{'mode':<7}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for name, method, sync_path, async_path, body in scenarios:
+            for mode, path in (('sync', sync_path), ('async', async_path)):
+                result = self.run_load(method, base_urls[mode] + path, body, options['requests'], options['concurrency'])
+                self.stdout.write(
+                    f"{name:<14}{mode:<7}{result['rps']:>9.1f}{result['p50_ms']:>9.1f}"
+                    f"{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}{result['errors']:>8}"
+                )
+
+    def obtain_token(self, username, password):
+        if not username or not password:
+            raise CommandError('Укажите --token или --username и --password')
+        body = json.dumps({'username': username, 'password': password}).encode('utf-8')
+        request = urllib.request.Request(f'{self.base_url}/api/token/', data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())['access']
+        except urllib.error.URLError as e:
+            raise CommandError(f'Не удалось получить токен: {e}')
+
+    def request_once(self, method, url, body):
+        request = urllib.request.Request(url, data=body, method=method, headers=self.headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                ok = response.status < 400
+        except (urllib.error.URLError, OSError):
+            ok = False
+        return time.perf_counter() - started, ok
+
+    def run_load(self, method, url, body, total, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _: self.request_once(method, url, body), range(total)))
+        elapsed = time.perf_counter() - started
+
+        return {
+            **summarize([duration for duration, _ in results], elapsed),
+            'errors': sum(1 for _, ok in results if not ok),
+        }
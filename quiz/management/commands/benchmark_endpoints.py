@@ -0,0 +1,274 @@
+import itertools
+import json
+import platform
+import shutil
+import tempfile
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from config.benchmarks import compare, measure
+from quiz import adaptive, attempts, sessions
+from quiz.models import QuestionCategory, Question, Answer
+from sections import uploads
+from sections.models import Section, Content
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks quiz, sections and users endpoints on generated datasets of several sizes '
+            'in a throwaway test database and writes latency percentiles, query counts and peak memory as JSON')
+
+    # Размер отдаваемого файла и части загрузки; загрузка вдвое больше части и не завершается
+    FILE_SIZE = 2 * 1024 * 1024
+    CHUNK_SIZE = 1024 * 1024
+    SESSION_SIZE = 10
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000',
+                            help='Размеры наборов данных через запятую (число вопросов; остальные таблицы масштабируются от него)')
+        parser.add_argument('--requests', type=int, default=30, help='Количество замеряемых запросов на эндпоинт')
+        parser.add_argument('--output', help='Файл для результатов в JSON (по умолчанию - stdout)')
+        parser.add_argument('--baseline', help='JSON предыдущего прогона для сравнения')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Допустимый рост p95 и памяти относительно baseline')
+        parser.add_argument('--no-cache', action='store_true', help='Отключить кэш ответов (CACHE_ENABLED=False)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes должен быть списком чисел через запятую')
+        if not sizes or min(sizes) < 1 or options['requests'] < 1:
+            raise CommandError('Размеры и --requests должны быть положительными')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+
+        # Файлы содержимого и части загрузок пишутся во временные каталоги и отдаются самим Django
+        media_root, upload_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        overrides = {'QUERY_INSPECTOR_ENABLED': False, 'MEDIA_ROOT': media_root,
+                     'CONTENT_UPLOAD_DIR': upload_dir, 'SENDFILE_BACKEND': ''}
+        if options['no_cache']:
+            overrides['CACHE_ENABLED'] = False
+
+        # Данные генерируются в отдельной тестовой базе, рабочая база не затрагивается
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(**overrides):
+                results = {str(size): self.run_size(size, options) for size in sizes}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+        report = {
+            'meta': {
+                'sizes': sizes,
+                'requests': options['requests'],
+                'cache': not options['no_cache'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'results': results,
+        }
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(text)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(text)
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Регрессии относительно baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def run_size(self, size, options):
+        call_command('flush', interactive=False, verbosity=0)
+        call_command(
+            'generate_data', seed=options['seed'], verbosity=0,
+            users=max(10, size // 10), categories=max(5, size // 200), questions=size,
+            sections=max(10, size // 5), contents=size * 2,
+        )
+        fixtures = self.fixtures()
+        results = {}
+        for name, user, method, url, data, *extra in self.endpoints(fixtures):
+            # Настоящий JWT, а не force_authenticate: замер включает аутентификацию, и ее понимают async-представления
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+            results[name] = measure(client, method, url, data, options['requests'], **(extra[0] if extra else {}))
+            # Попытки дописываются до следующего эндпоинта: фоновая запись журнала не попадает в чужой замер
+            attempts.shutdown()
+            if self.verbosity >= 2:
+                self.stderr.write(f"[{size}] {name}: {results[name]}")
+        return results
+
+    def fixtures(self):
+        """Пользователи и объекты, к которым обращаются замеряемые запросы."""
+        admin = User.objects.create_superuser('benchmark_admin', 'benchmark@example.com', 'benchmark')
+        # Владелец с наибольшим числом разделов - худший случай для списков разделов и содержимого
+        owner = User.objects.annotate(size=Count('sections')).order_by('-size').first()
+        section = Section.objects.filter(owner=owner).annotate(size=Count('contents')).order_by('-size').first()
+        question = Question.objects.order_by('id').first()
+        answers = list(Answer.objects.filter(question__in=Question.objects.order_by('id')[:20])
+                       .values_list('question_id', 'id'))
+        content = Content.objects.filter(section=section).order_by('id').first()
+        # Сеансы и адаптивный режим - в самой большой категории, чтобы вопросов хватило на все замеры
+        play_category = QuestionCategory.objects.annotate(size=Count('questions')).order_by('-size').first()
+        attachment = Content.objects.create(section=section, title='benchmark file')
+        attachment.file.save('benchmark.bin', ContentFile(b'x' * self.FILE_SIZE))
+        return {
+            'admin': admin,
+            'owner': owner,
+            'member': User.objects.create_user('benchmark_member', 'member@example.com', 'benchmark'),
+            'section': section,
+            'content': content,
+            'attachment': attachment,
+            'upload': uploads.start(content, 'benchmark.bin', self.FILE_SIZE),
+            'category': QuestionCategory.objects.order_by('id').first(),
+            'play_category': play_category,
+            'session_id': sessions.start(owner, play_category.pk, self.SESSION_SIZE)[0],
+            'search_term': content.title.split()[0],
+            'question': question,
+            'answer': Answer.objects.filter(question=question).order_by('id').first(),
+            'answers': answers,
+            'pages': max(1, Question.objects.count() // 5),
+        }
+
+    def endpoints(self, f):
+        """
+        (имя, пользователь, метод, url, данные[, параметры клиента]) для каждого эндпоинта. DELETE
+        не замеряется: повторить его на одном объекте нельзя. Для неповторяемых запросов (ответ
+        в сеансе, завершение сеанса, часть загрузки) url и данные - функции, готовящие новый объект.
+        """
+        admin, owner, member = f['admin'], f['owner'], f['member']
+        counter = itertools.count()
+        check = {'question_id': f['answer'].question_id, 'answer_id': f['answer'].pk}
+        batch = {'answers': [{'question_id': q, 'answer_id': a} for q, a in f['answers']]}
+        middle_page = max(1, f['pages'] // 2)
+        category_id, play_category_id = f['category'].pk, f['play_category'].pk
+        password = 'Benchmark-password-123'
+        pending = {}
+
+        def answer_for(question_id):
+            answer_id = Answer.objects.filter(question_id=question_id).order_by('id').values_list('id', flat=True).first()
+            return {'question_id': question_id, 'answer_id': answer_id}
+
+        def session_answer_url():
+            session_id, state = sessions.start(owner, play_category_id, 1)
+            pending['session'] = answer_for(state['questions'][0])
+            return reverse('quiz-session-answer', args=[session_id])
+
+        def session_finish_url():
+            session_id, _ = sessions.start(owner, play_category_id, self.SESSION_SIZE)
+            return reverse('quiz-session-finish', args=[session_id])
+
+        def adaptive_answer():
+            question_id, _ = adaptive.next_question(owner, play_category_id)
+            return answer_for(question_id)
+
+        def upload_url():
+            upload = uploads.start(f['content'], 'benchmark.bin', self.FILE_SIZE)
+            return reverse('content-upload', args=[upload.pk])
+
+        chunk = {'content_type': 'application/offset+octet-stream', 'HTTP_UPLOAD_OFFSET': '0'}
+        return [
+            # quiz
+            ('categories GET', owner, 'get', reverse('category-list-create'), None),
+            ('categories POST', admin, 'post', reverse('category-list-create'), {'name': 'benchmark'}),
+            ('category GET', admin, 'get', reverse('category-detail', args=[category_id]), None),
+            ('category PATCH', admin, 'patch', reverse('category-detail', args=[category_id]), {'name': 'benchmark'}),
+            ('category PUT', admin, 'put', reverse('category-detail', args=[category_id]), {'name': 'benchmark'}),
+            ('questions GET', owner, 'get', reverse('question-list-create'), None),
+            ('questions GET middle page', owner, 'get', reverse('question-list-create'), {'page': middle_page}),
+            ('questions GET cursor', owner, 'get', reverse('question-list-create'), {'cursor': ''}),
+            ('questions POST', admin, 'post', reverse('question-list-create'),
+             {'category_id': category_id, 'text': 'benchmark', 'difficulty': 'easy'}),
+            ('questions bulk POST', admin, 'post', reverse('question-bulk-create'), lambda: {'questions': [
+                {'category': category_id, 'text': f'benchmark {next(counter)}', 'difficulty': 'easy',
+                 'answers': [{'text': 'yes', 'is_correct': True}, {'text': 'no'}]}
+                for _ in range(100)
+            ]}),
+            ('questions play GET', owner, 'get', reverse('question-play-list'), None),
+            ('question GET', admin, 'get', reverse('question-detail', args=[f['question'].pk]), None),
+            ('question PATCH', admin, 'patch', reverse('question-detail', args=[f['question'].pk]),
+             {'text': 'benchmark question'}),
+            ('question PUT', admin, 'put', reverse('question-detail', args=[f['question'].pk]),
+             {'category_id': f['question'].category_id, 'text': 'benchmark question', 'difficulty': 'hard'}),
+            ('answers GET', owner, 'get', reverse('answer-list-create'), None),
+            ('answers POST', admin, 'post', reverse('answer-list-create'),
+             {'question': f['question'].pk, 'text': 'benchmark', 'is_correct': False}),
+            ('answer GET', admin, 'get', reverse('answer-detail', args=[f['answer'].pk]), None),
+            ('answer PATCH', admin, 'patch', reverse('answer-detail', args=[f['answer'].pk]), {'text': 'benchmark'}),
+            ('answer PUT', admin, 'put', reverse('answer-detail', args=[f['answer'].pk]),
+             {'question': f['answer'].question_id, 'text': 'benchmark', 'is_correct': f['answer'].is_correct}),
+            ('check_answer POST', owner, 'post', reverse('check_answer'), check),
+            ('check_answers POST', owner, 'post', reverse('check_answers'), batch),
+            ('answer_key stats GET', admin, 'get', reverse('answer-key-stats'), None),
+            ('async check_answer POST', owner, 'post', reverse('async-check-answer'), check),
+            ('async check_answers POST', owner, 'post', reverse('async-check-answers'), batch),
+            ('async question GET', owner, 'get', reverse('async-question-detail', args=[f['question'].pk]), None),
+            ('async categories GET', owner, 'get', reverse('async-category-list'), None),
+            ('export json GET', admin, 'get', reverse('quiz-export'), {'file_format': 'json'}),
+            ('export ndjson gzip GET', admin, 'get', reverse('quiz-export'), {'file_format': 'ndjson', 'gzip': '1'}),
+            ('export csv GET', admin, 'get', reverse('quiz-export'), {'file_format': 'csv'}),
+            ('session start POST', owner, 'post', reverse('quiz-session-start'),
+             {'category': play_category_id, 'count': self.SESSION_SIZE}),
+            ('session GET', owner, 'get', reverse('quiz-session-detail', args=[f['session_id']]), None),
+            ('session answer POST', owner, 'post', session_answer_url, lambda: pending['session']),
+            ('session finish POST', owner, 'post', session_finish_url, None),
+            ('adaptive next GET', owner, 'get', reverse('quiz-adaptive-next', args=[play_category_id]), None),
+            ('adaptive answer POST', owner, 'post', reverse('quiz-adaptive-answer', args=[play_category_id]),
+             adaptive_answer),
+            ('quiz stats GET', admin, 'get', reverse('quiz-stats'), None),
+            ('quiz category stats GET', admin, 'get', reverse('quiz-stats-category', args=[play_category_id]), None),
+            ('attempt log stats GET', admin, 'get', reverse('attempt-log-stats'), None),
+            # sections
+            ('sections GET', owner, 'get', reverse('section-list-create'), None),
+            ('sections POST', owner, 'post', reverse('section-list-create'), {'title': 'benchmark'}),
+            ('section GET', owner, 'get', reverse('section-detail', args=[f['section'].pk]), None),
+            ('section PATCH', owner, 'patch', reverse('section-detail', args=[f['section'].pk]), {'title': 'benchmark'}),
+            ('section PUT', owner, 'put', reverse('section-detail', args=[f['section'].pk]), {'title': 'benchmark'}),
+            ('contents GET', owner, 'get', reverse('content-list-create'), None),
+            ('contents GET superuser', admin, 'get', reverse('content-list-create'), None),
+            ('contents POST', owner, 'post', reverse('content-list-create'),
+             {'section': f['section'].pk, 'title': 'benchmark', 'text': 'benchmark'}),
+            ('content GET', owner, 'get', reverse('content-detail', args=[f['content'].pk]), None),
+            ('content PATCH', owner, 'patch', reverse('content-detail', args=[f['content'].pk]), {'title': 'benchmark'}),
+            ('content PUT', owner, 'put', reverse('content-detail', args=[f['content'].pk]),
+             {'section': f['section'].pk, 'title': 'benchmark', 'text': 'benchmark'}),
+            ('content file GET', owner, 'get', reverse('content-file', args=[f['attachment'].pk]), None),
+            ('content upload POST', owner, 'post', reverse('content-upload-create', args=[f['content'].pk]),
+             {'filename': 'benchmark.bin', 'size': self.FILE_SIZE}),
+            ('content upload GET', owner, 'get', reverse('content-upload', args=[f['upload'].pk]), None),
+            ('content upload PUT', owner, 'put', upload_url, b'x' * self.CHUNK_SIZE, chunk),
+            ('search GET', owner, 'get', reverse('search'), {'q': f['search_term']}),
+            # users
+            ('users GET', admin, 'get', reverse('user-list'), None),
+            ('users POST', admin, 'post', reverse('user-list'),
+             lambda: {'username': f'benchmark_{next(counter)}', 'password': 'benchmark-password',
+                      'password2': 'benchmark-password', 'email': 'benchmark@example.com'}),
+            ('user GET', owner, 'get', reverse('user-detail', args=[owner.pk]), None),
+            ('user PATCH', admin, 'patch', reverse('user-detail', args=[member.pk]), {'first_name': 'benchmark'}),
+            ('user PUT', admin, 'put', reverse('user-detail', args=[member.pk]),
+             {'username': member.username, 'email': member.email, 'password': password, 'password2': password}),
+        ]
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz import calibration
+
+
+class Command(BaseCommand):
+    help = 'Fits an IRT model to the attempt log, stores calibrated question difficulty and suggests label changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=calibration.MODELS, default='2pl')
+        parser.add_argument('--chunk-size', type=int, default=100_000, help='Строк ответов в одной пачке')
+        parser.add_argument('--max-iter', type=int, default=100)
+        parser.add_argument('--tol', type=float, default=1e-3, help='Остановка, когда наибольший шаг параметра меньше')
+        parser.add_argument('--min-attempts', type=int, default=30,
+                            help='Вопросы с меньшим числом попыток не калибруются')
+        parser.add_argument('--easy-below', type=float, default=-0.5, help='Трудность, ниже которой вопрос легкий')
+        parser.add_argument('--hard-above', type=float, default=0.5, help='Трудность, выше которой вопрос сложный')
+        parser.add_argument('--limit', type=int, default=50, help='Сколько предложений по меткам вывести')
+        parser.add_argument('--dry-run', action='store_true', help='Не записывать результат в вопросы')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным')
+        if options['easy_below'] > options['hard_above']:
+            raise CommandError('--easy-below должен быть не больше --hard-above')
+
+        started = time.monotonic()
+        with calibration.Responses.load(chunk_size=options['chunk_size']) as responses:
+            pairs = len(responses)
+            if not pairs:
+                raise CommandError('Журнал попыток пуст')
+            result = calibration.fit(responses, model=options['model'], max_iter=options['max_iter'],
+                                     tol=options['tol'], chunk_size=options['chunk_size'])
+        self.stdout.write(
+            f'{options["model"].upper()}: {pairs} user/question pairs, {result.iterations} iterations, '
+            f'log-likelihood {result.log_likelihood:.1f}, {time.monotonic() - started:.1f} s'
+        )
+        if not result.converged:
+            self.stderr.write(self.style.WARNING('Калибровка не сошлась за --max-iter итераций'))
+
+        suggestions = calibration.suggestions(result, options['min_attempts'], options['easy_below'], options['hard_above'])
+        for question_id, label, suggested, difficulty, attempts in suggestions[:options['limit']]:
+            self.stdout.write(f'Question {question_id}: {label} -> {suggested} (difficulty {difficulty:+.2f}, {attempts} attempts)')
+        if len(suggestions) > options['limit']:
+            self.stdout.write(f'... {len(suggestions) - options["limit"]} more')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Dry run: {len(suggestions)} label suggestions, nothing saved'))
+            return
+        calibrated = calibration.save(result, options['min_attempts'], model=options['model'])
+        self.stdout.write(self.style.SUCCESS(f'Calibrated {calibrated} questions, {len(suggestions)} label suggestions'))
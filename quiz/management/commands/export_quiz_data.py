@@ -0,0 +1,56 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.exporters import WRITERS, iter_records
+from quiz.importers import detect_format
+
+
+class Command(BaseCommand):
+    help = 'Exports quiz categories, questions and answers to JSON, NDJSON or CSV in the load_quiz_data schema'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='Путь к файлу (по умолчанию - stdout); .gz включает сжатие')
+        parser.add_argument('--format', choices=sorted(WRITERS), help='Формат файла (по умолчанию - по расширению)')
+        parser.add_argument('--gzip', action='store_true', help='Сжимать в gzip (для файлов с расширением .gz включено всегда)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Количество вопросов, читаемых из базы за раз')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('json' if path == '-' else detect_format(path))
+        compress = options['gzip'] or path.endswith('.gz')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным')
+
+        started = time.monotonic()
+        counter = self.count(iter_records(options['chunk_size']))
+        chunks = WRITERS[file_format](counter)
+        if path == '-':
+            if compress:
+                with gzip.open(sys.stdout.buffer, 'wt', encoding='utf-8', newline='') as f:
+                    f.writelines(chunks)
+            else:
+                self.stdout.ending = ''
+                for chunk in chunks:
+                    self.stdout.write(chunk)
+            return
+
+        opener = gzip.open if compress else open
+        try:
+            with opener(path, 'wt', encoding='utf-8', newline='') as f:
+                f.writelines(chunks)
+        except OSError as e:
+            raise CommandError(f'Не удалось записать {path}: {e}')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {self.exported} questions to {path} ({self.exported / max(elapsed, 1e-9):.0f} questions/sec)'
+        ))
+
+    def count(self, records):
+        self.exported = 0
+        for record in records:
+            self.exported += 1
+            yield record
@@ -0,0 +1,180 @@
+import itertools
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from quiz.importers import content_hash, invalidate_caches
+from quiz.models import DIFFICULTY_CHOICES, QuestionCategory, Question, Answer
+from search import indexing as search_index
+from sections.models import Section, Content
+
+User = get_user_model()
+
+WORDS = (
+    'город река море гора лес поле страна столица история наука планета звезда число '
+    'книга автор язык музыка картина война год век закон природа животное растение '
+    'химия физика элемент формула открытие остров океан материк культура спорт'
+).split()
+
+DIFFICULTY_WEIGHTS = {'easy': 5, 'medium': 3, 'hard': 2}
+
+
+def zipf_cum_weights(count, skew):
+    """Накопленные веса распределения Ципфа: первые элементы выбираются намного чаще остальных."""
+    return list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+class Command(BaseCommand):
+    help = 'Generates synthetic users, quiz questions, sections and contents for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--questions', type=int, default=10000)
+        parser.add_argument('--answers-per-question', type=int, default=4)
+        parser.add_argument('--sections', type=int, default=2000)
+        parser.add_argument('--contents', type=int, default=50000)
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Показатель распределения Ципфа для владельцев, разделов и категорий (0 - равномерно)')
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора для воспроизводимости')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество строк в одной вставке')
+        parser.add_argument('--password', default='synthetic', help='Пароль всех созданных пользователей')
+        parser.add_argument('--prefix', default='synthetic', help='Префикс имен пользователей, категорий и разделов')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.random = random.Random(options['seed'])
+        self.skew = options['skew']
+        if self.batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        if options['answers_per_question'] < 1:
+            raise CommandError('--answers-per-question должен быть положительным')
+        if options['sections'] and not (options['users'] or self.synthetic_users().exists()):
+            raise CommandError('Для разделов нужны пользователи (--users)')
+        if options['questions'] and not (options['categories'] or QuestionCategory.objects.exists()):
+            raise CommandError('Для вопросов нужны категории (--categories)')
+
+        started = time.monotonic()
+        user_ids = self.generate_users(options['users'], options['password'])
+        category_ids = self.generate_categories(options['categories'])
+        question_ids = self.generate_questions(options['questions'], category_ids)
+        self.generate_answers(question_ids, options['answers_per_question'])
+        section_ids = self.generate_sections(options['sections'], user_ids)
+        content_ids = self.generate_contents(options['contents'], section_ids)
+
+        if question_ids or category_ids:
+            invalidate_caches()
+        # bulk_create не отправляет сигналы - поисковый индекс пополняем сами
+        search_index.index_ids('question', question_ids, fresh=True, chunk_size=self.batch_size)
+        search_index.index_ids('content', content_ids, fresh=True, chunk_size=self.batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f'Synthetic data generated in {time.monotonic() - started:.1f}s'))
+
+    # --- вставка ---
+
+    def insert(self, model, objects):
+        """Вставляет объекты пачками по batch_size и возвращает первичные ключи созданных строк по порядку."""
+        last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        total = 0
+        started = time.monotonic()
+        for batch in self.batches(objects):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+            total += len(batch)
+            if self.verbosity >= 2:
+                rate = total / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(f'{model._meta.model_name}: {total} rows ({rate:.0f} rows/sec)')
+        if self.verbosity >= 1:
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+        # Ключи дочитываются одним запросом: не все бэкенды возвращают их из bulk_create
+        return list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True))
+
+    def batches(self, objects):
+        iterator = iter(objects)
+        while batch := list(itertools.islice(iterator, self.batch_size)):
+            yield batch
+
+    def skewed(self, ids, count):
+        """count выборок из ids с перекосом: немногие популярные элементы получают большую часть строк."""
+        if not ids or not count:
+            return []
+        ids = list(ids)
+        self.random.shuffle(ids)
+        return self.random.choices(ids, cum_weights=zipf_cum_weights(len(ids), self.skew), k=count)
+
+    def sentence(self, low, high):
+        return ' '.join(self.random.choices(WORDS, k=self.random.randint(low, high))).capitalize()
+
+    # --- генераторы моделей ---
+
+    def synthetic_users(self):
+        return User.objects.filter(username__startswith=f'{self.prefix}_')
+
+    def generate_users(self, count, password):
+        """
+        ID созданных пользователей. Без --users разделы достаются пользователям прошлых запусков
+        с тем же префиксом, но не настоящим учетным записям.
+        """
+        offset = self.synthetic_users().count()
+        hashed = make_password(password)  # Хэш один на всех: PBKDF2 на каждого пользователя занял бы минуты
+        created = self.insert(User, (
+            User(username=f'{self.prefix}_{offset + i}', email=f'{self.prefix}_{offset + i}@example.com',
+                 password=hashed, first_name=self.random.choice(WORDS).capitalize())
+            for i in range(count)
+        ))
+        return created or list(self.synthetic_users().values_list('pk', flat=True))
+
+    def generate_categories(self, count):
+        offset = QuestionCategory.objects.filter(name__startswith=self.prefix).count()
+        created = self.insert(QuestionCategory, (
+            QuestionCategory(name=f'{self.prefix} {self.random.choice(WORDS)} {offset + i}') for i in range(count)
+        ))
+        return created or list(QuestionCategory.objects.values_list('pk', flat=True))
+
+    def generate_questions(self, count, category_ids):
+        names = dict(QuestionCategory.objects.values_list('pk', 'name'))
+        difficulties = [key for key, _ in DIFFICULTY_CHOICES]
+        weights = [DIFFICULTY_WEIGHTS[key] for key in difficulties]
+
+        def questions():
+            for i, category_id in enumerate(self.skewed(category_ids, count)):
+                text = f'{self.sentence(4, 12)} ({i})?'
+                difficulty = self.random.choices(difficulties, weights)[0]
+                yield Question(category_id=category_id, text=text, difficulty=difficulty,
+                               content_hash=content_hash(names[category_id], text, difficulty))
+
+        return self.insert(Question, questions())
+
+    def generate_answers(self, question_ids, per_question):
+        def answers():
+            for question_id in question_ids:
+                correct = self.random.randrange(per_question)
+                for i in range(per_question):
+                    yield Answer(question_id=question_id, text=self.sentence(1, 4), is_correct=i == correct)
+
+        return self.insert(Answer, answers())
+
+    def generate_sections(self, count, user_ids):
+        offset = Section.objects.filter(title__startswith=self.prefix).count()
+        return self.insert(Section, (
+            Section(owner_id=owner_id, title=f'{self.prefix} {self.sentence(1, 3)} {offset + i}',
+                    description=self.sentence(0, 20))
+            for i, owner_id in enumerate(self.skewed(user_ids, count))
+        ))
+
+    def generate_contents(self, count, section_ids):
+        if not section_ids:
+            section_ids = list(Section.objects.values_list('pk', flat=True))
+        return self.insert(Content, (
+            # Длина текста тоже с перекосом: большинство записей короткие, немногие - длинные
+            Content(section_id=section_id, title=self.sentence(1, 5),
+                    text=self.sentence(5, 5 + min(int(self.random.paretovariate(1.5) * 20), 2000)))
+            for section_id in self.skewed(section_ids, count)
+        ))
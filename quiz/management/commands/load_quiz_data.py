@@ -1,26 +1,42 @@
-import json
-from django.core.management.base import BaseCommand
+import gzip
 
-from quiz.models import QuestionCategory, Question, Answer
+from django.core.management.base import BaseCommand, CommandError
 
-class Command(BaseCommand):
-    help = 'Loads quiz data from JSON file'
-
-    def handle(self, *args, **options):
-        with open('quiz_data.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
+from quiz.importers import QuizImporter, READERS, detect_format
 
-        for item in data:
-            category_name = item['category']
-            question_text = item['question']
-            answers_data = item['answers']
-            difficulty = item['difficulty']
 
-            category, _ = QuestionCategory.objects.get_or_create(name=category_name)
-
-            question = Question.objects.create(category=category, text=question_text, difficulty=difficulty)
+class Command(BaseCommand):
+    help = 'Loads quiz data from JSON, NDJSON or CSV file'
 
-            for answer_data in answers_data:
-                Answer.objects.create(question=question, **answer_data)
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='quiz_data.json', help='Путь к файлу с вопросами (.gz распаковывается на лету)')
+        parser.add_argument('--format', choices=sorted(READERS), help='Формат файла (по умолчанию - по расширению)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество вопросов в одной транзакции')
 
-        self.stdout.write(self.style.SUCCESS('Successfully loaded quiz data'))
\ No newline at end of file
+    def handle(self, *args, **options):
+        path = options['path']
+        self.verbosity = options['verbosity']
+        file_format = options['format'] or detect_format(path)
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+
+        importer = QuizImporter(batch_size=options['batch_size'], progress=self.report_progress)
+        try:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8-sig', newline='') as f:
+                stats = importer.run(READERS[file_format](f))
+        except FileNotFoundError:
+            raise CommandError(f'Файл не найден: {path}')
+        except (ValueError, gzip.BadGzipFile, EOFError) as e:
+            raise CommandError(f'Ошибка разбора {path}: {e}')
+
+        for row, reason in stats.errors:
+            self.stderr.write(f'Запись {row} пропущена: {reason}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully loaded quiz data: {stats.created} created, {stats.skipped} skipped, '
+            f'{stats.invalid} invalid, {stats.answers} answers ({stats.rate:.0f} rows/sec)'
+        ))
+
+    def report_progress(self, stats):
+        if self.verbosity >= 2:
+            self.stdout.write(f'{stats.rows} rows processed ({stats.rate:.0f} rows/sec)')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz import answer_key
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the in-memory answer key in all worker processes'
+
+    def handle(self, *args, **options):
+        if not answer_key.is_enabled():
+            raise CommandError('Ключ ответов выключен (QUIZ_ANSWER_KEY_ENABLED)')
+
+        key = answer_key.rebuild()
+        if key is None:
+            raise CommandError('Общий кэш недоступен, версия ключа не обновлена')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Answer key rebuilt: version {key.version}, {len(key)} answers, {len(key.questions)} questions'
+        ))
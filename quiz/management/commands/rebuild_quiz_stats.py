@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz import stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds question, answer and category statistics from the attempt log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Только сравнить сводки с пересчетом по журналу, ничего не меняя')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Размер пачки при вставке сводок')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            differences = stats.compare(stats.compute(), stats.current())
+            for model, rows in differences.items():
+                for pk, expected, actual in rows[:20]:
+                    self.stdout.write(f'{model.__name__} {pk}: expected {expected}, stored {actual}')
+                if len(rows) > 20:
+                    self.stdout.write(f'{model.__name__}: ... {len(rows) - 20} more')
+            if differences:
+                # Попытки, записанные во время проверки, тоже дают расхождения - повторите проверку
+                raise CommandError(f'Сводки расходятся с журналом попыток: {sum(map(len, differences.values()))} строк')
+            self.stdout.write(self.style.SUCCESS('Statistics match the attempt log'))
+            return
+
+        counts = stats.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Statistics rebuilt: ' + ', '.join(f'{model.__name__} {count}' for model, count in counts.items())
+        ))
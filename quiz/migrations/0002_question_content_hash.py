@@ -0,0 +1,18 @@
+# Generated by Django 4.2.12 on 2026-10-18 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=40),
+        ),
+    ]
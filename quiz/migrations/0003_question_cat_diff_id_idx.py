@@ -0,0 +1,17 @@
+# Generated by Django 4.2.12 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_question_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['category', 'difficulty', 'id'], name='question_cat_diff_id_idx'),
+        ),
+    ]
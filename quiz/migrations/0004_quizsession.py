@@ -0,0 +1,35 @@
+# Generated by Django 4.2.12 on 2026-10-18 17:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0003_question_cat_diff_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizSession',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('total', models.PositiveSmallIntegerField()),
+                ('correct', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('results', models.JSONField(default=list)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sessions', to='quiz.questioncategory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Сеанс викторины',
+                'verbose_name_plural': 'Сеансы викторины',
+                'indexes': [models.Index(fields=['user', 'finished_at'], name='quiz_session_user_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.12 on 2026-10-18 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='calibrated_difficulty',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='discrimination',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Хэш для вопросов, загруженных до появления content_hash: без него повторный запуск
+# load_quiz_data вставил бы весь банк заново. Вопросы обходятся пачками по id.
+
+from django.db import migrations
+
+from quiz.models import content_hash
+
+BATCH_SIZE = 1000
+
+
+def backfill(apps, schema_editor):
+    Question = apps.get_model('quiz', 'Question')
+    questions = (
+        Question.objects.using(schema_editor.connection.alias)
+        .filter(content_hash='').select_related('category')
+        .only('id', 'text', 'difficulty', 'category__name').order_by('id')
+    )
+    last_id = 0
+    while True:
+        batch = list(questions.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        for question in batch:
+            question.content_hash = content_hash(question.category.name, question.text, question.difficulty)
+        Question.objects.using(schema_editor.connection.alias).bulk_update(batch, ['content_hash'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0007_question_calibration'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop, elidable=True),
+    ]
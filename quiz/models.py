@@ -1,6 +1,25 @@
 #quiz\models.py
+import hashlib
+import json
+
+from django.conf import settings
 from django.db import models
-from django.test import TestCase
+
+
+DIFFICULTY_CHOICES = [
+    ('easy', 'Легкий'),
+    ('medium', 'Средний'),
+    ('hard', 'Сложный'),
+]
+
+def content_hash(category_name, text, difficulty):
+    """Хэш вопроса, по которому повторная загрузка пропускает уже существующие записи."""
+    payload = json.dumps([category_name.strip(), text.strip(), difficulty], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+# Поля Question, от которых зависит content_hash (в update_fields категория может быть названа обоими именами)
+HASH_FIELDS = {'category', 'category_id', 'text', 'difficulty'}
 
 
 class QuestionCategory(models.Model):
@@ -16,18 +35,54 @@ class QuestionCategory(models.Model):
 class Question(models.Model):
     category = models.ForeignKey(QuestionCategory, on_delete=models.CASCADE, related_name='questions')
     text = models.TextField()
-    difficulty = models.CharField(max_length=20, choices=[
-        ('easy', 'Легкий'),
-        ('medium', 'Средний'),
-        ('hard', 'Сложный'),
-    ])
+    difficulty = models.CharField(max_length=20, choices=DIFFICULTY_CHOICES)
+    # Хэш содержимого, по которому load_quiz_data пропускает уже загруженные вопросы
+    content_hash = models.CharField(max_length=40, blank=True, default='', db_index=True, editable=False)
+    # Параметры модели IRT по журналу попыток (calibrate_questions): трудность на шкале способностей
+    # пользователей (0 - средний пользователь отвечает верно в половине случаев) и дискриминативность
+    calibrated_difficulty = models.FloatField(null=True, blank=True, editable=False)
+    discrimination = models.FloatField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._hashed = instance.hash_source()
+        # Категория, с которой вопрос загружен: по ней signals.move_question_stats видит перенос без запроса
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
+
+    def hash_source(self):
+        """Поля, от которых зависит content_hash, или None, если какое-то из них не загружено."""
+        if self.get_deferred_fields() & {'category_id', 'text', 'difficulty'}:
+            return None
+        return self.category_id, self.text, self.difficulty
+
+    def save(self, *args, **kwargs):
+        # Вопросы из API и админки получают хэш так же, как загруженные load_quiz_data.
+        # Хэш (и имя категории для него) пересчитывается, только если изменились текст,
+        # сложность или категория: сохранения остальных полей не читают категорию
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or HASH_FIELDS & set(update_fields):
+            source = self.hash_source()
+            if source is None or not self.content_hash or source != getattr(self, '_hashed', None):
+                # Категория из сериализатора или формы уже загружена, запрос идет только для голого category_id
+                self.content_hash = content_hash(self.category.name, self.text, self.difficulty)
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'content_hash'}
+        super().save(*args, **kwargs)
+        self._hashed = self.hash_source()
+        self._loaded_category_id = self.category_id
+
     class Meta:
         verbose_name = "Вопрос"
         verbose_name_plural = "Вопросы"
+        indexes = [
+            # Фильтр по категории и сложности со страницами по id - поиск по индексу без сортировки
+            models.Index(fields=['category', 'difficulty', 'id'], name='question_cat_diff_id_idx'),
+        ]
 
 class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answers')
@@ -40,3 +95,91 @@ class Answer(models.Model):
     class Meta:
         verbose_name = "Ответ"
         verbose_name_plural = "Ответы"
+
+class QuizSession(models.Model):
+    """
+    Завершенный сеанс прохождения викторины. Пока сеанс идет, его состояние хранится
+    в кэше (quiz/sessions.py) и записывается в БД один раз - при завершении.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='quiz_sessions')
+    category = models.ForeignKey(QuestionCategory, on_delete=models.SET_NULL, null=True, related_name='sessions')
+    total = models.PositiveSmallIntegerField()
+    correct = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    # [[question_id, answer_id или null, is_correct], ...] в порядке выдачи вопросов
+    results = models.JSONField(default=list)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.correct}/{self.total}'
+
+    class Meta:
+        verbose_name = "Сеанс викторины"
+        verbose_name_plural = "Сеансы викторины"
+        indexes = [
+            models.Index(fields=['user', 'finished_at'], name='quiz_session_user_idx'),
+        ]
+
+class Attempt(models.Model):
+    """
+    Ответ пользователя при проверке ответов. Записи копятся в буфере процесса и вставляются
+    пачками (quiz/attempts.py), поэтому created_at - время ответа, а не вставки.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='attempts')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='attempts')
+    answer = models.ForeignKey(Answer, on_delete=models.CASCADE, related_name='attempts')
+    is_correct = models.BooleanField()
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.question_id}: {self.is_correct}'
+
+    class Meta:
+        verbose_name = "Попытка ответа"
+        verbose_name_plural = "Попытки ответов"
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='attempt_user_created_idx'),
+        ]
+
+class QuestionStats(models.Model):
+    """
+    Сводка попыток по вопросу. Обновляется приращениями F() при записи каждой пачки попыток
+    (quiz/stats.py), поэтому чтение не требует GROUP BY по журналу; rebuild_quiz_stats пересчитывает с нуля.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.question_id}: {self.correct}/{self.attempts}'
+
+    class Meta:
+        verbose_name = "Статистика вопроса"
+        verbose_name_plural = "Статистика вопросов"
+
+class AnswerStats(models.Model):
+    """Сколько раз выбран вариант ответа - распределение ответов по вопросу."""
+    answer = models.OneToOneField(Answer, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    picks = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.answer_id}: {self.picks}'
+
+    class Meta:
+        verbose_name = "Статистика ответа"
+        verbose_name_plural = "Статистика ответов"
+
+class CategoryStats(models.Model):
+    """Сводка попыток по категории - сумма сводок ее вопросов."""
+    category = models.OneToOneField(QuestionCategory, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.category_id}: {self.correct}/{self.attempts}'
+
+    class Meta:
+        verbose_name = "Статистика категории"
+        verbose_name_plural = "Статистика категорий"
@@ -1,7 +1,12 @@
 #quiz\paginators.py
-from rest_framework.pagination import PageNumberPagination
+from config.pagination import CursorOptionalPagination
 
-class QuizResultsSetPagination(PageNumberPagination):
+class QuizResultsSetPagination(CursorOptionalPagination):
     page_size = 5 # 5 вопросов на странице
     page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+class AnswerResultsSetPagination(CursorOptionalPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
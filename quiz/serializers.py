@@ -1,6 +1,9 @@
 # quiz\serializers.py
+from django.conf import settings
 from rest_framework import serializers
-from .models import QuestionCategory, Question, Answer
+from .importers import content_hash
+from .models import DIFFICULTY_CHOICES, QuestionCategory, Question, Answer, QuizSession
+from .stats import correct_rate
 
 class QuestionCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,9 +13,12 @@ class QuestionCategorySerializer(serializers.ModelSerializer):
 
 class QuestionSerializer(serializers.ModelSerializer):
     category = QuestionCategorySerializer(read_only=True) # Сериализуем категорию
+    category_id = serializers.PrimaryKeyRelatedField(
+        source='category', queryset=QuestionCategory.objects.all(), write_only=True, help_text="ID категории"
+    )
     class Meta:
         model = Question
-        fields = '__all__'
+        exclude = ('content_hash',)
         read_only_fields = ('id',)  # ID только для чтения
 
 class AnswerSerializer(serializers.ModelSerializer):
@@ -21,6 +27,135 @@ class AnswerSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('id',)  # ID только для чтения
 
+class PlayAnswerSerializer(serializers.ModelSerializer):
+    """Вариант ответа для прохождения викторины - без признака правильности."""
+    class Meta:
+        model = Answer
+        fields = ('id', 'text')
+        read_only_fields = fields
+
+class PlayQuestionSerializer(serializers.ModelSerializer):
+    """Вопрос для прохождения викторины вместе с категорией и вариантами ответов."""
+    category = QuestionCategorySerializer(read_only=True)
+    answers = PlayAnswerSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ('id', 'text', 'difficulty', 'category', 'answers')
+        read_only_fields = fields
+
 class CheckAnswerSerializer(serializers.Serializer):
     question_id = serializers.IntegerField(help_text="ID вопроса")
-    answer_id = serializers.IntegerField(help_text="ID ответа")
\ No newline at end of file
+    answer_id = serializers.IntegerField(help_text="ID ответа")
+
+class CheckAnswersSerializer(serializers.Serializer):
+    answers = CheckAnswerSerializer(many=True, allow_empty=False, max_length=200, help_text="Список пар вопрос-ответ")
+
+class QuizSessionStartSerializer(serializers.Serializer):
+    category = serializers.PrimaryKeyRelatedField(queryset=QuestionCategory.objects.all(), help_text="ID категории")
+    count = serializers.IntegerField(min_value=1, default=10, help_text="Количество вопросов")
+    difficulty = serializers.DictField(
+        child=serializers.FloatField(min_value=0), required=False,
+        help_text='Доли сложностей, например {"easy": 0.5, "medium": 0.3, "hard": 0.2}',
+    )
+
+    def validate_count(self, value):
+        if value > settings.QUIZ_SESSION_MAX_QUESTIONS:
+            raise serializers.ValidationError(f"Не больше {settings.QUIZ_SESSION_MAX_QUESTIONS} вопросов.")
+        return value
+
+    def validate_difficulty(self, value):
+        unknown = set(value) - {key for key, _ in DIFFICULTY_CHOICES}
+        if unknown:
+            raise serializers.ValidationError(f"Неизвестная сложность: {', '.join(sorted(unknown))}.")
+        if not any(value.values()):
+            raise serializers.ValidationError("Хотя бы одна доля должна быть больше нуля.")
+        return value
+
+class QuizSessionResultSerializer(serializers.ModelSerializer):
+    results = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QuizSession
+        fields = ('id', 'category', 'total', 'correct', 'score', 'started_at', 'finished_at', 'results')
+        read_only_fields = fields
+
+    def get_results(self, session):
+        return [
+            {'question_id': question_id, 'answer_id': answer_id, 'is_correct': is_correct}
+            for question_id, answer_id, is_correct in session.results
+        ]
+
+class AnswerStatsSerializer(serializers.ModelSerializer):
+    picks = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Answer
+        fields = ('id', 'text', 'is_correct', 'picks')
+        read_only_fields = fields
+
+class QuestionStatsSerializer(serializers.ModelSerializer):
+    """Сводка по вопросу; счетчики аннотированы из QuestionStats и AnswerStats (см. QuestionStatsListAPIView)."""
+    attempts = serializers.IntegerField(source='attempt_count', read_only=True)
+    correct = serializers.IntegerField(source='correct_count', read_only=True)
+    correct_rate = serializers.SerializerMethodField()
+    answers = AnswerStatsSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ('id', 'text', 'difficulty', 'attempts', 'correct', 'correct_rate', 'answers')
+        read_only_fields = fields
+
+    def get_correct_rate(self, question):
+        return correct_rate(question.attempt_count, question.correct_count)
+
+class BulkAnswerSerializer(serializers.Serializer):
+    text = serializers.CharField(max_length=200)
+    is_correct = serializers.BooleanField(default=False)
+
+class BulkQuestionSerializer(serializers.Serializer):
+    category = serializers.IntegerField(help_text="ID категории")
+    text = serializers.CharField()
+    difficulty = serializers.ChoiceField(choices=DIFFICULTY_CHOICES)
+    answers = BulkAnswerSerializer(many=True, allow_empty=False, max_length=20)
+
+    def validate_answers(self, answers):
+        if not any(answer['is_correct'] for answer in answers):
+            raise serializers.ValidationError("Нужен хотя бы один правильный ответ.")
+        return answers
+
+class QuestionBulkCreateSerializer(serializers.Serializer):
+    """
+    Список вопросов с ответами для массового создания. Категории и дубликаты проверяются
+    для всего списка сразу (два запроса), ошибки возвращаются по позиции вопроса.
+    """
+    questions = BulkQuestionSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def validate_questions(self, questions):
+        categories = dict(
+            QuestionCategory.objects.filter(pk__in={question['category'] for question in questions}).values_list('id', 'name')
+        )
+        for question in questions:
+            name = categories.get(question['category'])
+            if name is not None:
+                question['hash'] = content_hash(name, question['text'], question['difficulty'])
+        existing = set(
+            Question.objects.filter(content_hash__in=[question['hash'] for question in questions if 'hash' in question])
+            .values_list('content_hash', flat=True)
+        )
+
+        errors = []
+        seen = set()
+        for question in questions:
+            if 'hash' not in question:
+                errors.append({'category': [f"Категория {question['category']} не найдена."]})
+            elif question['hash'] in existing:
+                errors.append({'text': ["Такой вопрос в этой категории уже есть."]})
+            elif question['hash'] in seen:
+                errors.append({'text': ["Вопрос повторяется в запросе."]})
+            else:
+                errors.append({})
+            seen.add(question.get('hash'))
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return questions
@@ -0,0 +1,214 @@
+#quiz\sessions.py
+import random
+import time
+import uuid
+from array import array
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from rest_framework import status
+
+from config.response_cache import get_generations
+from . import attempts
+from .checking import check_answers
+from .models import DIFFICULTY_CHOICES, Question, Answer, QuizSession
+
+SESSION_NOT_FOUND = 'session_not_found'
+SESSION_FINISHED = 'session_finished'
+NOT_ENOUGH_QUESTIONS = 'not_enough_questions'
+QUESTION_NOT_IN_SESSION = 'question_not_in_session'
+ALREADY_ANSWERED = 'already_answered'
+
+ERRORS = {
+    SESSION_NOT_FOUND: ("Сеанс не найден или истек", status.HTTP_404_NOT_FOUND),
+    SESSION_FINISHED: ("Сеанс уже завершен", status.HTTP_409_CONFLICT),
+    NOT_ENOUGH_QUESTIONS: ("Недостаточно вопросов для такого сеанса", status.HTTP_400_BAD_REQUEST),
+    QUESTION_NOT_IN_SESSION: ("Вопрос не входит в этот сеанс", status.HTTP_400_BAD_REQUEST),
+    ALREADY_ANSWERED: ("На этот вопрос уже дан ответ", status.HTTP_409_CONFLICT),
+}
+
+DIFFICULTIES = [key for key, _ in DIFFICULTY_CHOICES]
+
+_random = random.SystemRandom()
+
+
+class SessionError(Exception):
+    def __init__(self, code):
+        super().__init__(ERRORS[code][0])
+        self.code = code
+        self.message, self.status = ERRORS[code]
+
+
+def session_key(session_id):
+    return f'quiz:session:{session_id}'
+
+
+def answer_key(session_id, question_id):
+    return f'quiz:session:{session_id}:{question_id}'
+
+
+# --- выборка вопросов ---
+
+def question_ids(category_id, difficulties):
+    """
+    ID вопросов категории по сложностям из кэша. Списки берутся одним обращением к кэшу,
+    все недостающие - одним запросом к БД по индексу (category, difficulty, id). Поколение
+    Question входит в ключ, поэтому изменения вопросов сразу дают новые списки.
+    """
+    generation, = get_generations([Question])
+    keys = {difficulty: f'quiz:ids:{category_id}:{difficulty}:{generation}' for difficulty in difficulties}
+    cached = cache.get_many(list(keys.values()))
+    result = {difficulty: cached[key] for difficulty, key in keys.items() if key in cached}
+    missing = [difficulty for difficulty in keys if difficulty not in result]
+    if missing:
+        loaded = {difficulty: array('q') for difficulty in missing}
+        rows = (
+            Question.objects.filter(category_id=category_id, difficulty__in=missing)
+            .order_by('difficulty', 'id').values_list('difficulty', 'id')
+        )
+        for difficulty, question_id in rows.iterator():
+            loaded[difficulty].append(question_id)
+        result.update(loaded)
+        cache.set_many({keys[difficulty]: ids for difficulty, ids in loaded.items()},
+                       timeout=settings.QUIZ_SESSION_IDS_TIMEOUT)
+    return result
+
+
+def allocate(count, weights, available):
+    """
+    Делит count вопросов между сложностями пропорционально весам (метод наибольшего остатка).
+    Если какой-то сложности не хватает вопросов, остаток достается другим сложностям с ненулевым весом.
+    """
+    weights = {difficulty: weight for difficulty, weight in weights.items() if weight > 0}
+    total_weight = sum(weights.values())
+    shares = {difficulty: count * weight / total_weight for difficulty, weight in weights.items()}
+    counts = {difficulty: min(int(share), available[difficulty]) for difficulty, share in shares.items()}
+    order = sorted(weights, key=lambda difficulty: (shares[difficulty] - int(shares[difficulty]), weights[difficulty]),
+                   reverse=True)
+    added = True
+    while added and sum(counts.values()) < count:
+        added = False
+        for difficulty in order:
+            if counts[difficulty] < available[difficulty] and sum(counts.values()) < count:
+                counts[difficulty] += 1
+                added = True
+    return counts
+
+
+def draw(category_id, count, weights=None):
+    """
+    Случайно выбирает count ID вопросов категории. weights - доли сложностей; без них вопросы
+    выбираются равновероятно из всех сложностей. Выборка идет по спискам ID в памяти, без
+    сортировки всей таблицы в случайном порядке.
+    """
+    weights = weights or {}
+    pools = question_ids(category_id, list(weights) or DIFFICULTIES)
+    if not weights:
+        pool = [question_id for ids in pools.values() for question_id in ids]
+        if len(pool) < count:
+            raise SessionError(NOT_ENOUGH_QUESTIONS)
+        return _random.sample(pool, count)
+
+    available = {difficulty: len(ids) for difficulty, ids in pools.items()}
+    counts = allocate(count, weights, available)
+    if sum(counts.values()) < count:
+        raise SessionError(NOT_ENOUGH_QUESTIONS)
+    drawn = [question_id for difficulty, amount in counts.items() for question_id in _random.sample(pools[difficulty], amount)]
+    _random.shuffle(drawn)
+    return drawn
+
+
+def load_questions(ids):
+    """Вопросы с категориями и вариантами ответов в порядке ids."""
+    questions = Question.objects.filter(id__in=ids).select_related('category').prefetch_related(
+        Prefetch('answers', queryset=Answer.objects.only('id', 'text', 'question_id').order_by('id'))
+    )
+    by_id = {question.pk: question for question in questions}
+    return [by_id[question_id] for question_id in ids if question_id in by_id]
+
+
+# --- состояние сеанса ---
+
+def start(user, category_id, count, weights=None):
+    """
+    Начинает сеанс: выбирает вопросы и сохраняет в кэше только их ID. Ответы хранятся
+    отдельными ключами, поэтому одновременные ответы на разные вопросы не затирают друг друга.
+    """
+    state = {
+        'user': user.pk,
+        'category': category_id,
+        'questions': array('q', draw(category_id, count, weights)),
+        'started': time.time(),
+    }
+    session_id = uuid.uuid4()
+    cache.set(session_key(session_id), state, timeout=settings.QUIZ_SESSION_TIMEOUT)
+    return session_id, state
+
+
+def get_state(session_id, user):
+    state = cache.get(session_key(session_id))
+    if state is None or state['user'] != user.pk:
+        if QuizSession.objects.filter(pk=session_id, user=user).exists():
+            raise SessionError(SESSION_FINISHED)
+        raise SessionError(SESSION_NOT_FOUND)
+    return state
+
+
+def get_answers(session_id, state):
+    """Выбранные ответы по ID вопроса (без неотвеченных) одним обращением к кэшу."""
+    keys = {answer_key(session_id, question_id): question_id for question_id in state['questions']}
+    return {keys[key]: answer_id for key, answer_id in cache.get_many(list(keys)).items()}
+
+
+def answer(session_id, user, question_id, answer_id):
+    """
+    Сохраняет ответ на вопрос сеанса. Ответ проверяется на принадлежность вопросу, но правильность
+    не раскрывается до завершения. Первый ответ окончательный (cache.add атомарен).
+    """
+    state = get_state(session_id, user)
+    if question_id not in state['questions']:
+        raise SessionError(QUESTION_NOT_IN_SESSION)
+    result, = check_answers([(question_id, answer_id)])
+    if 'code' in result:
+        return result
+    if not cache.add(answer_key(session_id, question_id), answer_id, timeout=settings.QUIZ_SESSION_TIMEOUT):
+        raise SessionError(ALREADY_ANSWERED)
+    attempts.record(user, [result])
+    return result
+
+
+def finish(session_id, user):
+    """
+    Завершает сеанс: проверяет ответы по ключу ответов, записывает итог в QuizSession
+    и удаляет состояние из кэша. Возвращает сохраненный сеанс.
+    """
+    state = get_state(session_id, user)
+    answers = get_answers(session_id, state)
+    pairs = list(answers.items())
+    correct = {result['question_id']: result.get('is_correct', False) for result in check_answers(pairs)}
+    results = [
+        [question_id, answers.get(question_id), correct.get(question_id, False)]
+        for question_id in state['questions']
+    ]
+    total = len(results)
+    correct_count = sum(1 for *_, is_correct in results if is_correct)
+    try:
+        with transaction.atomic():
+            session = QuizSession.objects.create(
+                id=session_id,
+                user_id=user.pk,
+                category_id=state['category'],
+                total=total,
+                correct=correct_count,
+                score=round(correct_count / total, 4) if total else 0.0,
+                results=results,
+                started_at=datetime.fromtimestamp(state['started'], tz=timezone.utc),
+            )
+    except IntegrityError:
+        # Одновременное завершение тем же клиентом: сеанс уже записан
+        raise SessionError(SESSION_FINISHED)
+    cache.delete_many([session_key(session_id), *(answer_key(session_id, question_id) for question_id in state['questions'])])
+    return session
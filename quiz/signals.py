@@ -0,0 +1,70 @@
+#quiz\signals.py
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from config.response_cache import bump_generation
+from . import answer_key, stats
+from .models import QuestionCategory, Question, Answer, Attempt
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_answer_key(sender, **kwargs):
+    """
+    Ключ текущего процесса сбрасывается сразу, остальные процессы перечитывают его
+    после фиксации транзакции по новой версии в общем кэше.
+    """
+    answer_key.invalidate_local()
+    transaction.on_commit(answer_key.bump_version)
+
+
+@receiver(post_save, sender=QuestionCategory)
+@receiver(post_delete, sender=QuestionCategory)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def invalidate_cached_responses(sender, **kwargs):
+    """Закэшированные ответы с данными этой модели становятся недействительными."""
+    bump_generation(sender)
+
+
+def deleted_directly(origin, model):
+    """Удаление началось с объекта (или queryset'а) этой модели, а не пришло каскадом."""
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+@receiver(pre_delete, sender=Question)
+def forget_question_attempts(sender, instance, origin=None, **kwargs):
+    """Попытки удаляются каскадом вместе с вопросом - вычитаем их из сводки категории."""
+    # При удалении категории ее сводка удаляется вместе с ней
+    if not deleted_directly(origin, QuestionCategory):
+        stats.forget(Attempt.objects.filter(question=instance))
+
+
+@receiver(pre_delete, sender=Answer)
+def forget_answer_attempts(sender, instance, origin=None, **kwargs):
+    # При удалении вопроса попытки уже вычтены по всему вопросу
+    if deleted_directly(origin, Answer):
+        stats.forget(Attempt.objects.filter(answer=instance))
+
+
+@receiver(pre_save, sender=Question)
+def move_question_stats(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Перенос вопроса в другую категорию переносит его попытки между сводками категорий."""
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not {'category', 'category_id'} & set(update_fields):
+        return
+    # Загруженный из БД вопрос помнит свою категорию; запрос нужен только для созданного вручную с pk
+    previous = getattr(instance, '_loaded_category_id', None)
+    if previous is None:
+        previous = Question.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+    if previous is not None and previous != instance.category_id:
+        stats.move_question(instance.pk, previous, instance.category_id)
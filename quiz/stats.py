@@ -0,0 +1,162 @@
+#quiz\stats.py
+"""
+Сводная статистика попыток: QuestionStats, AnswerStats и CategoryStats. Сводки не считаются
+GROUP BY по журналу при чтении, а обновляются приращениями F() вместе со вставкой каждой пачки
+попыток (attempts.write_attempts), в той же транзакции. Удаление вопросов и ответов вычитает
+их попытки из сводок (signals.py); изменения в обход сигналов исправляет rebuild_quiz_stats.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Attempt, QuestionStats, AnswerStats, CategoryStats
+
+COUNTERS = (
+    (QuestionStats, ('attempts', 'correct')),
+    (CategoryStats, ('attempts', 'correct')),
+    (AnswerStats, ('picks',)),
+)
+
+
+def tally(rows):
+    """
+    Сводит строки (question_id, category_id, answer_id, is_correct, count) в приращения
+    {модель: {pk: (значения...)}} в порядке COUNTERS.
+    """
+    questions = defaultdict(lambda: [0, 0])
+    categories = defaultdict(lambda: [0, 0])
+    answers = defaultdict(lambda: [0])
+    for question_id, category_id, answer_id, is_correct, count in rows:
+        correct = count if is_correct else 0
+        for counter in (questions[question_id], categories[category_id]):
+            counter[0] += count
+            counter[1] += correct
+        answers[answer_id][0] += count
+    return {
+        QuestionStats: {pk: tuple(values) for pk, values in questions.items()},
+        CategoryStats: {pk: tuple(values) for pk, values in categories.items()},
+        AnswerStats: {pk: tuple(values) for pk, values in answers.items()},
+    }
+
+
+def lock_rows(model, pks, create=True):
+    """
+    Блокирует строки сводки одним SELECT ... FOR UPDATE в порядке pk и создает недостающие с нулями.
+    Все пачки берут блокировки по возрастанию pk до любых UPDATE, поэтому ждут друг друга,
+    а не блокируют взаимно.
+    """
+    existing = set(model.objects.select_for_update().filter(pk__in=pks).order_by('pk').values_list('pk', flat=True))
+    missing = sorted(pk for pk in pks if pk not in existing)
+    if not missing or not create:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create([model(pk=pk) for pk in missing])
+    except IntegrityError:
+        # Часть строк одновременно создал другой процесс
+        for pk in missing:
+            model.objects.get_or_create(pk=pk)
+
+
+def increment(model, fields, deltas, create=True):
+    """
+    Прибавляет приращения одним UPDATE на каждый различный набор значений: в пачке у большинства
+    вопросов одно-два приращения, поэтому запросов намного меньше, чем строк. pk разных групп
+    перемежаются, поэтому порядок блокировок задают не UPDATE, а lock_rows перед ними
+    (оставшиеся взаимоблокировки повторяет write_attempts).
+    """
+    if not deltas:
+        return
+    groups = defaultdict(list)
+    for pk in sorted(deltas):
+        groups[deltas[pk]].append(pk)
+    with transaction.atomic(savepoint=False):
+        lock_rows(model, list(deltas), create=create)
+        for values, pks in groups.items():
+            model.objects.filter(pk__in=pks).update(**{field: F(field) + value for field, value in zip(fields, values)})
+
+
+def apply(totals, sign=1):
+    for model, fields in COUNTERS:
+        deltas = {pk: tuple(sign * value for value in values) for pk, values in totals[model].items()}
+        increment(model, fields, deltas, create=sign > 0)
+
+
+def merge(batch, categories):
+    """Добавляет пачку попыток в сводки. categories - {question_id: category_id}."""
+    apply(tally(
+        (attempt.question_id, categories[attempt.question_id], attempt.answer_id, attempt.is_correct, 1)
+        for attempt in batch
+    ))
+
+
+def grouped(attempts):
+    """Попытки queryset'а, сгруппированные в БД до строк для tally()."""
+    return (
+        attempts.order_by()
+        .values_list('question_id', 'question__category_id', 'answer_id', 'is_correct')
+        .annotate(count=Count('id'))
+        .iterator()
+    )
+
+
+def forget(attempts):
+    """Вычитает попытки queryset'а из сводок (перед удалением вопроса или ответа)."""
+    apply(tally(grouped(attempts)), sign=-1)
+
+
+def move_question(question_id, old_category_id, new_category_id):
+    """Переносит попытки вопроса из сводки старой категории в сводку новой."""
+    values = QuestionStats.objects.filter(pk=question_id).values_list('attempts', 'correct').first()
+    if values and any(values):
+        # Одним вызовом: обе строки блокируются в порядке pk, как в пачках попыток
+        deltas = {old_category_id: tuple(-value for value in values), new_category_id: values}
+        increment(CategoryStats, ('attempts', 'correct'), deltas)
+
+
+def compute():
+    """Сводки, посчитанные заново по всему журналу попыток."""
+    return tally(grouped(Attempt.objects.all()))
+
+
+def current():
+    """Сводки в том виде, в каком они сейчас хранятся."""
+    return {
+        model: {pk: tuple(values) for pk, *values in model.objects.values_list('pk', *fields).iterator()}
+        for model, fields in COUNTERS
+    }
+
+
+def compare(expected, actual):
+    """Расхождения {модель: [(pk, ожидается, хранится), ...]}; нулевые и отсутствующие строки равны."""
+    differences = {}
+    for model, fields in COUNTERS:
+        zero = (0,) * len(fields)
+        rows = []
+        for pk in sorted(expected[model].keys() | actual[model].keys()):
+            want, have = expected[model].get(pk, zero), actual[model].get(pk, zero)
+            if want != have:
+                rows.append((pk, want, have))
+        if rows:
+            differences[model] = rows
+    return differences
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Заменяет сводки пересчитанными по журналу. Возвращает число строк по моделям."""
+    totals = compute()
+    counts = {}
+    for model, fields in COUNTERS:
+        model.objects.all().delete()
+        model.objects.bulk_create(
+            [model(pk=pk, **dict(zip(fields, values))) for pk, values in totals[model].items()],
+            batch_size=batch_size,
+        )
+        counts[model] = len(totals[model])
+    return counts
+
+
+def correct_rate(attempts, correct):
+    return round(correct / attempts, 4) if attempts else None
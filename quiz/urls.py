@@ -1,21 +1,55 @@
 #quiz\urls.py
 from django.urls import path
+from . import async_views
 from .views import (
     QuestionCategoryListCreateAPIView,
     QuestionCategoryRetrieveUpdateDestroyAPIView,
     QuestionListCreateAPIView,
     QuestionRetrieveUpdateDestroyAPIView,
+    QuestionPlayListAPIView,
     AnswerListCreateAPIView,
     AnswerRetrieveUpdateDestroyAPIView,
     check_answer,
+    check_answers_batch,
+    bulk_create_questions,
+    answer_key_stats,
+    export_quiz,
+    attempt_log_stats,
+    quiz_stats,
+    QuestionStatsListAPIView,
+    start_quiz_session,
+    quiz_session_detail,
+    answer_quiz_session,
+    finish_quiz_session,
+    adaptive_next_question,
+    adaptive_answer,
 )
 
 urlpatterns = [
     path('categories/', QuestionCategoryListCreateAPIView.as_view(), name='category-list-create'),
     path('categories/<int:pk>/', QuestionCategoryRetrieveUpdateDestroyAPIView.as_view(), name='category-detail'),
     path('questions/', QuestionListCreateAPIView.as_view(), name='question-list-create'),
+    path('questions/play/', QuestionPlayListAPIView.as_view(), name='question-play-list'),
+    path('questions/bulk/', bulk_create_questions, name='question-bulk-create'),
     path('questions/<int:pk>/', QuestionRetrieveUpdateDestroyAPIView.as_view(), name='question-detail'),
     path('answers/', AnswerListCreateAPIView.as_view(), name='answer-list-create'),
     path('answers/<int:pk>/', AnswerRetrieveUpdateDestroyAPIView.as_view(), name='answer-detail'),
     path('check_answer/', check_answer, name='check_answer'),  # URL для проверки ответа
+    path('check_answers/', check_answers_batch, name='check_answers'),  # URL для проверки всей викторины
+    path('answer_key/stats/', answer_key_stats, name='answer-key-stats'),
+    path('attempts/stats/', attempt_log_stats, name='attempt-log-stats'),
+    path('stats/', quiz_stats, name='quiz-stats'),
+    path('stats/categories/<int:pk>/', QuestionStatsListAPIView.as_view(), name='quiz-stats-category'),
+    path('export/', export_quiz, name='quiz-export'),
+    path('sessions/', start_quiz_session, name='quiz-session-start'),
+    path('sessions/<uuid:session_id>/', quiz_session_detail, name='quiz-session-detail'),
+    path('sessions/<uuid:session_id>/answers/', answer_quiz_session, name='quiz-session-answer'),
+    path('sessions/<uuid:session_id>/finish/', finish_quiz_session, name='quiz-session-finish'),
+    path('adaptive/<int:category_id>/next/', adaptive_next_question, name='quiz-adaptive-next'),
+    path('adaptive/<int:category_id>/answers/', adaptive_answer, name='quiz-adaptive-answer'),
+    # Асинхронные варианты эндпоинтов прохождения викторины для ASGI-развертываний
+    path('async/check_answer/', async_views.check_answer, name='async-check-answer'),
+    path('async/check_answers/', async_views.check_answers_batch, name='async-check-answers'),
+    path('async/questions/<int:pk>/', async_views.question_detail, name='async-question-detail'),
+    path('async/categories/', async_views.category_list, name='async-category-list'),
 ]
\ No newline at end of file
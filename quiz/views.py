@@ -1,12 +1,34 @@
 # quiz\views.py
 import logging
+from django.db import transaction
+from django.db.models import F, Prefetch, Value
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 
-from .models import QuestionCategory, Question, Answer
-from .serializers import QuestionCategorySerializer, QuestionSerializer, AnswerSerializer, CheckAnswerSerializer
-from .paginators import QuizResultsSetPagination
+from .models import QuestionCategory, Question, Answer, QuizSession
+from .serializers import (
+    QuestionCategorySerializer,
+    QuestionSerializer,
+    AnswerSerializer,
+    CheckAnswerSerializer,
+    CheckAnswersSerializer,
+    PlayQuestionSerializer,
+    QuestionBulkCreateSerializer,
+    QuizSessionStartSerializer,
+    QuizSessionResultSerializer,
+    QuestionStatsSerializer,
+)
+from .checking import check_answers, error_status
+from .exporters import CONTENT_TYPES, WRITERS, iter_records
+from .filters import QuestionFilter
+from .importers import insert_questions, invalidate_caches
+from . import adaptive, answer_key, attempts, sessions, stats
+from .paginators import QuizResultsSetPagination, AnswerResultsSetPagination
+from config.streaming import NDJSONStreamMixin, encode_chunks, gzip_chunks
+from config.response_cache import CachedResponseMixin
 from users.permissions import IsSuperUser  # Импортируйте IsSuperUser
 
 logger = logging.getLogger(__name__)
@@ -21,48 +43,292 @@ def check_answer(request):
         question_id = serializer.validated_data['question_id']
         answer_id = serializer.validated_data['answer_id']
 
-        logger.debug(f"Проверяем ответ на вопрос ID: {question_id}, ответ ID: {answer_id}")
-
-        try:
-            question = Question.objects.get(id=question_id)
-            answer = Answer.objects.get(id=answer_id)
-
-            if answer.question != question:
-                logger.warning(f"Ответ ID {answer_id} не принадлежит вопросу ID {question_id}")
-                return Response(
-                    {"error": "Этот ответ не принадлежит данному вопросу."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # Дополнительная проверка: убедитесь, что ответ связан с вопросом (для надежности)
-            if answer.question_id != question_id:
-                logger.error(f"Несоответствие вопроса и ответа. Answer.question_id: {answer.question_id}, question_id: {question_id}")
-                return Response(
-                    {"error": "Несоответствие вопроса и ответа."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            return Response(
-                {
-                    "question_text": question.text,
-                    "is_correct": answer.is_correct,
-                },
-                status=status.HTTP_200_OK,
-            )
-
-        except Question.DoesNotExist:
-            logger.warning(f"Вопрос с ID {question_id} не найден.")
-            return Response({"error": "Вопрос не найден"}, status=status.HTTP_404_NOT_FOUND)
-        except Answer.DoesNotExist:
-            logger.warning(f"Ответ с ID {answer_id} не найден.")
-            return Response({"error": "Ответ не найден"}, status=status.HTTP_404_NOT_FOUND)
+        logger.debug("Проверяем ответ на вопрос ID: %s, ответ ID: %s", question_id, answer_id)
+
+        result = check_answers([(question_id, answer_id)])[0]
+        if 'error' in result:
+            logger.warning("Ошибка проверки ответа ID %s на вопрос ID %s: %s", answer_id, question_id, result['error'])
+            return Response({"error": result['error']}, status=error_status(result['code']))
+        attempts.record(request.user, [result])
+
+        return Response(
+            {
+                "question_text": result['question_text'],
+                "is_correct": result['is_correct'],
+            },
+            status=status.HTTP_200_OK,
+        )
 
     else:
-        logger.warning(f"Неверные входные данные: {serializer.errors}")
+        logger.warning("Неверные входные данные: %s", serializer.errors)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def check_answers_batch(request):
+    """
+    Проверяет ответы на всю викторину за один запрос.
+    Возвращает результат по каждой паре (с ошибкой для неизвестных или несовпадающих ID) и общий счет.
+    """
+
+    serializer = CheckAnswersSerializer(data=request.data)
+    if not serializer.is_valid():
+        logger.warning("Неверные входные данные: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    pairs = [(item['question_id'], item['answer_id']) for item in serializer.validated_data['answers']]
+    results = check_answers(pairs)
+    attempts.record(request.user, results)
+    correct = sum(1 for result in results if result.get('is_correct'))
+
+    return Response(
+        {
+            "results": results,
+            "total": len(results),
+            "correct": correct,
+            "score": round(correct / len(results), 4),
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsSuperUser])
+def bulk_create_questions(request):
+    """
+    Создает список вопросов с ответами за один запрос: все вопросы проверяются заранее,
+    затем вставляются через bulk_create в одной транзакции. Возвращает ID созданных вопросов.
+    """
+    serializer = QuestionBulkCreateSerializer(data=request.data)
+    if not serializer.is_valid():
+        logger.warning("Неверные входные данные для массового создания вопросов: %s", serializer.errors)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    records = [
+        {
+            'category_id': question['category'],
+            'text': question['text'],
+            'difficulty': question['difficulty'],
+            'hash': question['hash'],
+            'answers': question['answers'],
+        }
+        for question in serializer.validated_data['questions']
+    ]
+    with transaction.atomic():
+        questions, answers = insert_questions(records)
+        transaction.on_commit(invalidate_caches)
+
+    logger.info("Создано вопросов: %s, ответов: %s", len(questions), answers)
+    return Response(
+        {
+            "ids": [question.pk for question in questions],
+            "created": len(questions),
+            "answers": answers,
+        },
+        status=status.HTTP_201_CREATED,
+    )
+
 
-class QuestionCategoryListCreateAPIView(generics.ListCreateAPIView):
+def session_error(error):
+    return Response({"error": error.message}, status=error.status)
+
+
+def session_payload(session_id, state, answered, request):
+    """Состояние идущего сеанса: вопросы без признака правильности и число ответов."""
+    questions = sessions.load_questions(list(state['questions']))
+    return {
+        "id": session_id,
+        "category": state['category'],
+        "total": len(state['questions']),
+        "answered": answered,
+        "questions": PlayQuestionSerializer(questions, many=True, context={'request': request}).data,
+    }
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def start_quiz_session(request):
+    """
+    Начинает сеанс викторины: {"category", "count", "difficulty": {доли}} -> случайные вопросы.
+    Состояние сеанса хранится в кэше QUIZ_SESSION_TIMEOUT секунд.
+    """
+    serializer = QuizSessionStartSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    try:
+        session_id, state = sessions.start(request.user, data['category'].pk, data['count'], data.get('difficulty'))
+    except sessions.SessionError as e:
+        return session_error(e)
+    return Response(session_payload(session_id, state, 0, request), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def quiz_session_detail(request, session_id):
+    """Идущий сеанс - вопросы и число ответов; завершенный - итог с результатами по вопросам."""
+    try:
+        state = sessions.get_state(session_id, request.user)
+    except sessions.SessionError as e:
+        if e.code != sessions.SESSION_FINISHED:
+            return session_error(e)
+        session = QuizSession.objects.get(pk=session_id)
+        return Response(QuizSessionResultSerializer(session).data, status=status.HTTP_200_OK)
+    answered = len(sessions.get_answers(session_id, state))
+    return Response(session_payload(session_id, state, answered, request), status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def answer_quiz_session(request, session_id):
+    """Ответ на вопрос сеанса. Правильность сообщается только при завершении сеанса."""
+    serializer = CheckAnswerSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    question_id, answer_id = serializer.validated_data['question_id'], serializer.validated_data['answer_id']
+    try:
+        result = sessions.answer(session_id, request.user, question_id, answer_id)
+    except sessions.SessionError as e:
+        return session_error(e)
+    if 'code' in result:
+        return Response({"error": result['error']}, status=error_status(result['code']))
+    return Response({"question_id": question_id, "answer_id": answer_id}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def finish_quiz_session(request, session_id):
+    """Завершает сеанс: неотвеченные вопросы считаются неверными, итог сохраняется в БД."""
+    try:
+        session = sessions.finish(session_id, request.user)
+    except sessions.SessionError as e:
+        return session_error(e)
+    return Response(QuizSessionResultSerializer(session).data, status=status.HTTP_200_OK)
+
+
+def adaptive_payload(question_id, state, request):
+    """Оценка способности и следующий вопрос (None, если верно отвечены все вопросы категории)."""
+    question = sessions.load_questions([question_id])[0] if question_id is not None else None
+    return {
+        "ability": round(state['ability'], 3),
+        "answered": state['answered'],
+        "question": PlayQuestionSerializer(question, context={'request': request}).data if question else None,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def adaptive_next_question(request, category_id):
+    """Адаптивный режим: следующий вопрос категории рядом с текущей оценкой способности пользователя."""
+    try:
+        question_id, state = adaptive.next_question(request.user, category_id)
+    except adaptive.AdaptiveError as e:
+        return session_error(e)
+    return Response(adaptive_payload(question_id, state, request), status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def adaptive_answer(request, category_id):
+    """Ответ в адаптивном режиме: правильность, новая оценка способности и следующий вопрос."""
+    serializer = CheckAnswerSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    question_id, answer_id = serializer.validated_data['question_id'], serializer.validated_data['answer_id']
+    result, = check_answers([(question_id, answer_id)])
+    if 'code' in result:
+        return Response({"error": result['error']}, status=error_status(result['code']))
+    try:
+        state = adaptive.answer(request.user, category_id, question_id, result)
+    except adaptive.AdaptiveError as e:
+        return session_error(e)
+    attempts.record(request.user, [result])
+    try:
+        next_id, state = adaptive.next_question(request.user, category_id)
+    except adaptive.AdaptiveError:
+        next_id = None
+    return Response({"is_correct": result['is_correct'], **adaptive_payload(next_id, state, request)}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsSuperUser])
+def answer_key_stats(request):
+    """Состояние ключа ответов текущего процесса: версия, размер, попадания и промахи."""
+    return Response(answer_key.stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsSuperUser])
+def attempt_log_stats(request):
+    """Состояние буфера попыток текущего процесса: ожидают записи, записано, отброшено."""
+    return Response(attempts.get_buffer().stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsSuperUser])
+def quiz_stats(request):
+    """
+    Сводка попыток по всем категориям одним запросом к CategoryStats, без GROUP BY по журналу.
+    Попытки из буферов процессов, еще не записанные в БД, в сводку не входят.
+    """
+    rows = QuestionCategory.objects.order_by('id').values('id', 'name', 'stats__attempts', 'stats__correct')
+    data = []
+    for row in rows:
+        attempts_count, correct = row['stats__attempts'] or 0, row['stats__correct'] or 0
+        data.append({
+            "id": row['id'],
+            "name": row['name'],
+            "attempts": attempts_count,
+            "correct": correct,
+            "correct_rate": stats.correct_rate(attempts_count, correct),
+        })
+    return Response(data, status=status.HTTP_200_OK)
+
+
+class QuestionStatsListAPIView(generics.ListAPIView):
+    """Сводка по вопросам категории с распределением выбранных ответов. Только суперпользователь."""
+    serializer_class = QuestionStatsSerializer
+    pagination_class = QuizResultsSetPagination
+    permission_classes = [permissions.IsAuthenticated, IsSuperUser]
+
+    def get_queryset(self):
+        answers = Answer.objects.annotate(picks=Coalesce(F('stats__picks'), Value(0))).order_by('id')
+        return (
+            Question.objects.filter(category_id=self.kwargs['pk'])
+            .annotate(attempt_count=Coalesce(F('stats__attempts'), Value(0)),
+                      correct_count=Coalesce(F('stats__correct'), Value(0)))
+            .prefetch_related(Prefetch('answers', queryset=answers))
+            .order_by('id')
+        )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsSuperUser])
+def export_quiz(request):
+    """
+    Выгрузка всего банка вопросов в схеме load_quiz_data: ?file_format=json|ndjson|csv, ?gzip=1.
+    Ответ формируется потоком, память сервера не зависит от размера банка.
+    """
+    file_format = request.query_params.get('file_format', 'json')
+    if file_format not in WRITERS:
+        return Response({"error": f"Неизвестный формат: {file_format}"}, status=status.HTTP_400_BAD_REQUEST)
+    compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    chunks = encode_chunks(WRITERS[file_format](iter_records()))
+    filename = f'quiz_data.{file_format}'
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+    response = StreamingHttpResponse(
+        chunks, content_type='application/gzip' if compress else f'{CONTENT_TYPES[file_format]}; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class QuestionCategoryListCreateAPIView(CachedResponseMixin, generics.ListCreateAPIView):
     """
     Создание и просмотр списка категорий вопросов.
     Только суперпользователи могут создавать категории, аутентифицированные пользователи могут просматривать.
@@ -70,6 +336,7 @@ class QuestionCategoryListCreateAPIView(generics.ListCreateAPIView):
     queryset = QuestionCategory.objects.all()
     serializer_class = QuestionCategorySerializer
     permission_classes = [permissions.IsAuthenticated, IsSuperUser]  # Только суперпользователи могут создавать
+    cache_models = (QuestionCategory,)
     #  Переопределяем get-метод, чтобы пускать аутентифицированных пользователей
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -77,31 +344,53 @@ class QuestionCategoryListCreateAPIView(generics.ListCreateAPIView):
         return [permissions.IsAuthenticated(), IsSuperUser()]  # Для остальных методов нужен IsSuperUser
 
 
-class QuestionCategoryRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class QuestionCategoryRetrieveUpdateDestroyAPIView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     """Получение, обновление и удаление конкретной категории вопросов. Требуется аутентификация."""
     queryset = QuestionCategory.objects.all()
     serializer_class = QuestionCategorySerializer
+    cache_models = (QuestionCategory,)
     permission_classes = [permissions.IsAuthenticated, IsSuperUser] # Только суперпользователь может менять/удалять
 
 
-class QuestionListCreateAPIView(generics.ListCreateAPIView):
-    """Создание и просмотр списка вопросов. Требуется аутентификация."""
-    queryset = Question.objects.all()
+class QuestionListCreateAPIView(CachedResponseMixin, generics.ListCreateAPIView):
+    """Создание и просмотр списка вопросов с фильтрами по категории, сложности и началу текста. Требуется аутентификация."""
+    queryset = Question.objects.select_related('category').order_by('id')
     serializer_class = QuestionSerializer
+    cache_models = (Question, QuestionCategory)
     pagination_class = QuizResultsSetPagination  # Подключаем QuizResultsSetPagination
+    filterset_class = QuestionFilter
     permission_classes = [permissions.IsAuthenticated] # Только аутентифицированный пользователь
 
-class QuestionRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+
+class QuestionPlayListAPIView(CachedResponseMixin, generics.ListAPIView):
+    """
+    Список вопросов для прохождения викторины: категория и варианты ответов (без is_correct)
+    встроены в вопрос. Страница загружается фиксированным числом запросов независимо от размера.
+    """
+    queryset = Question.objects.select_related('category').prefetch_related('answers').order_by('id')
+    serializer_class = PlayQuestionSerializer
+    cache_models = (Question, QuestionCategory, Answer)
+    pagination_class = QuizResultsSetPagination
+    filterset_class = QuestionFilter
+    permission_classes = [permissions.IsAuthenticated]
+
+
+class QuestionRetrieveUpdateDestroyAPIView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     """Получение, обновление и удаление конкретного вопроса. Требуется аутентификация."""
-    queryset = Question.objects.all()
+    queryset = Question.objects.select_related('category')
     serializer_class = QuestionSerializer
+    cache_models = (Question, QuestionCategory)
     permission_classes = [permissions.IsAuthenticated, IsSuperUser] # Только суперпользователь может менять/удалять
 
 
-class AnswerListCreateAPIView(generics.ListCreateAPIView):
-    """Создание и просмотр списка ответов. Требуется аутентификация."""
-    queryset = Answer.objects.all()
+class AnswerListCreateAPIView(NDJSONStreamMixin, generics.ListCreateAPIView):
+    """
+    Создание и просмотр списка ответов. Требуется аутентификация.
+    Список разбит на страницы; ?format=ndjson отдает всю таблицу потоком.
+    """
+    queryset = Answer.objects.order_by('id')
     serializer_class = AnswerSerializer
+    pagination_class = AnswerResultsSetPagination
     permission_classes = [permissions.IsAuthenticated]  # Только аутентифицированный пользователь
 
 
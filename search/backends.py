@@ -0,0 +1,183 @@
+#search\backends.py
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Q, Sum, When
+
+from config.response_cache import get_generations
+from sections.models import Section, Content
+from .indexing import SOURCES, fulltext_available
+from .models import SearchEntry
+from .tokenizer import query_words, tokenize
+
+
+def document_count(kinds):
+    """
+    Число документов указанных видов для IDF. Счетчики кэшируются под поколениями моделей
+    (Question и Content поднимают их при сохранении и удалении), поэтому поиск не выполняет
+    COUNT(*) по таблицам на каждый запрос.
+    """
+    models = [SOURCES[kind][0] for kind in kinds]
+    keys = {
+        kind: f'search:count:{kind}:{generation}'
+        for kind, generation in zip(kinds, get_generations(models))
+    }
+    counts = cache.get_many(list(keys.values()))
+    missing = {key: SOURCES[kind][0].objects.count() for kind, key in keys.items() if key not in counts}
+    if missing:
+        cache.set_many(missing, timeout=settings.SEARCH_COUNTS_TIMEOUT)
+        counts.update(missing)
+    return sum(counts[key] for key in keys.values())
+
+
+class InvertedIndexBackend:
+    """
+    Поиск по встроенному инвертированному индексу. Объекты ранжируются по числу
+    совпавших термов запроса, затем по сумме весов термов, умноженных на IDF.
+    """
+
+    def __init__(self, text, kinds, user):
+        self.terms = list(dict.fromkeys(tokenize(text)))[:10]
+        self.kinds = kinds
+        self.user = user
+
+    def scope(self):
+        """Вопросы видны всем, содержимое - владельцу раздела или суперпользователю, как в ContentListCreateAPIView."""
+        condition = Q(pk__in=[])
+        if 'question' in self.kinds:
+            condition |= Q(kind='question')
+        if 'content' in self.kinds:
+            if self.user.is_superuser:
+                condition |= Q(kind='content')
+            else:
+                owned = Content.objects.filter(section__owner=self.user).values('id')
+                condition |= Q(kind='content', object_id__in=owned)
+        return condition
+
+    def ranked(self):
+        entries = SearchEntry.objects.filter(term__in=self.terms, kind__in=self.kinds)
+        frequencies = dict(entries.values('term').annotate(count=Count('id')).values_list('term', 'count'))
+        total = document_count(self.kinds)
+        score = Sum(
+            Case(
+                *[When(term=term, then=F('weight') * math.log(1 + total / count)) for term, count in frequencies.items()],
+                default=0.0,
+                output_field=FloatField(),
+            )
+        )
+        return (
+            entries.filter(self.scope())
+            .values('kind', 'object_id')
+            .annotate(matched=Count('id'), score=score)
+            .order_by('-matched', '-score', 'kind', 'object_id')
+        )
+
+    def count(self):
+        if not self.terms:
+            return 0
+        return self.ranked().count()
+
+    def page(self, start, stop):
+        if not self.terms:
+            return []
+        return [(row['kind'], row['object_id'], row['score']) for row in self.ranked()[start:stop]]
+
+
+class FullTextBackend:
+    """
+    Поиск через полнотекстовые индексы SQL Server (CONTAINSTABLE) со словоформами
+    русского языка; ранг берется из RANK полнотекстового индекса.
+    """
+
+    def __init__(self, text, kinds, user):
+        self.words = query_words(text)
+        self.kinds = kinds
+        self.user = user
+
+    def union(self):
+        quote = connection.ops.quote_name
+        condition = ' OR '.join(f'FORMSOF(INFLECTIONAL, "{word}")' for word in self.words)
+        parts, params = [], []
+        if 'question' in self.kinds:
+            model, fields = SOURCES['question']
+            parts.append(
+                f"SELECT 'question' AS kind, ft.[KEY] AS object_id, ft.[RANK] AS score "
+                f"FROM CONTAINSTABLE({quote(model._meta.db_table)}, ({', '.join(map(quote, fields))}), %s) AS ft"
+            )
+            params.append(condition)
+        if 'content' in self.kinds:
+            model, fields = SOURCES['content']
+            sql = (
+                f"SELECT 'content' AS kind, ft.[KEY] AS object_id, ft.[RANK] AS score "
+                f"FROM CONTAINSTABLE({quote(model._meta.db_table)}, ({', '.join(map(quote, fields))}), %s) AS ft"
+            )
+            params.append(condition)
+            if not self.user.is_superuser:
+                sql += (
+                    f" JOIN {quote(model._meta.db_table)} c ON c.id = ft.[KEY]"
+                    f" JOIN {quote(Section._meta.db_table)} s ON s.id = c.section_id WHERE s.owner_id = %s"
+                )
+                params.append(self.user.pk)
+            parts.append(sql)
+        return ' UNION ALL '.join(parts), params
+
+    def count(self):
+        if not self.words:
+            return 0
+        sql, params = self.union()
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM ({sql}) AS hits", params)
+            return cursor.fetchone()[0]
+
+    def page(self, start, stop):
+        if not self.words:
+            return []
+        sql, params = self.union()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT kind, object_id, score FROM ({sql}) AS hits "
+                f"ORDER BY score DESC, kind, object_id OFFSET %s ROWS FETCH NEXT %s ROWS ONLY",
+                [*params, start, stop - start],
+            )
+            return cursor.fetchall()
+
+
+def get_backend(text, kinds, user):
+    backend = FullTextBackend if fulltext_available() else InvertedIndexBackend
+    return backend(text, kinds, user)
+
+
+class SearchResults:
+    """
+    Ленивый результат поиска для пагинатора: count() считает совпадения отдельным
+    запросом, срез возвращает страницу попаданий с загруженными объектами.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('SearchResults поддерживает только срезы')
+        rows = self.backend.page(index.start or 0, index.stop)
+        objects = {}
+        for kind in {kind for kind, _, _ in rows}:
+            model = SOURCES[kind][0]
+            queryset = model.objects.select_related('category') if kind == 'question' else model.objects
+            objects[kind] = queryset.in_bulk([object_id for row_kind, object_id, _ in rows if row_kind == kind])
+        return [
+            {'type': kind, 'id': object_id, 'score': round(float(score), 4), 'object': objects[kind][object_id]}
+            for kind, object_id, score in rows
+            if object_id in objects[kind]
+        ]
@@ -0,0 +1,117 @@
+#search\indexing.py
+import math
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet
+
+from quiz.models import Question
+from sections.models import Content
+from .models import SearchEntry
+from .tokenizer import tokenize
+
+# Индексируемые поля и их веса: совпадение в заголовке важнее совпадения в тексте
+SOURCES = {
+    'question': (Question, {'text': 1.0}),
+    'content': (Content, {'title': 3.0, 'text': 1.0}),
+}
+KINDS = {model: kind for kind, (model, _) in SOURCES.items()}
+
+_fulltext = {}
+
+
+def fulltext_available():
+    """
+    Можно ли искать через полнотекстовый индекс SQL Server. SEARCH_BACKEND = 'auto'
+    проверяет один раз на процесс, что служба установлена и индекс построен миграцией.
+    """
+    backend = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if backend != 'auto':
+        return backend == 'fulltext'
+    if connection.vendor != 'microsoft':
+        return False
+    if connection.alias not in _fulltext:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT FULLTEXTSERVICEPROPERTY('IsFullTextInstalled'), "
+                "OBJECTPROPERTY(OBJECT_ID(%s), 'TableHasActiveFulltextIndex')",
+                [Question._meta.db_table],
+            )
+            installed, active = cursor.fetchone()
+        _fulltext[connection.alias] = bool(installed) and bool(active)
+    return _fulltext[connection.alias]
+
+
+def uses_inverted_index():
+    """Встроенный индекс ведется только там, где нет полнотекстового поиска SQL Server."""
+    return not fulltext_available()
+
+
+def entries_for(kind, obj):
+    """Записи индекса для объекта: вес терма - (1 + log tf), умноженный на вес поля."""
+    weights = Counter()
+    for field, field_weight in SOURCES[kind][1].items():
+        for term, count in Counter(tokenize(getattr(obj, field))).items():
+            weights[term] += (1 + math.log(count)) * field_weight
+    return [
+        SearchEntry(term=term, kind=kind, object_id=obj.pk, weight=round(weight, 4))
+        for term, weight in weights.items()
+    ]
+
+
+def index_objects(kind, objects, fresh=False, batch_size=1000):
+    """
+    Индексирует объекты одного вида. Старые записи объектов удаляются, если объекты
+    не только что созданы (fresh), новые вставляются одной пачкой.
+    """
+    if not uses_inverted_index():
+        return
+    objects = list(objects)
+    if not objects:
+        return
+    if not fresh:
+        SearchEntry.objects.filter(kind=kind, object_id__in=[obj.pk for obj in objects]).delete()
+    SearchEntry.objects.bulk_create(
+        [entry for obj in objects for entry in entries_for(kind, obj)], batch_size=batch_size,
+    )
+
+
+def remove_objects(kind, ids):
+    """Удаляет записи объектов из индекса; ids - список или queryset ID (подзапрос, без чтения)."""
+    if uses_inverted_index():
+        SearchEntry.objects.filter(kind=kind, object_id__in=ids if isinstance(ids, QuerySet) else list(ids)).delete()
+
+
+def index_ids(kind, ids, fresh=False, chunk_size=1000):
+    """Индексирует объекты по списку ID (после bulk_create, который не отправляет сигналы)."""
+    if not uses_inverted_index():
+        return
+    model, fields = SOURCES[kind]
+    ids = list(ids)
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        index_objects(kind, model.objects.filter(pk__in=chunk).only('id', *fields), fresh=fresh)
+
+
+def rebuild(kinds=None, chunk_size=1000, progress=None):
+    """Перестраивает индекс заново, обходя таблицы через .iterator(). Возвращает число объектов по видам."""
+    totals = {}
+    if not uses_inverted_index():
+        return totals
+    for kind in kinds or SOURCES:
+        model, fields = SOURCES[kind]
+        SearchEntry.objects.filter(kind=kind).delete()
+        totals[kind] = 0
+        batch = []
+        for obj in model.objects.only('id', *fields).order_by('id').iterator(chunk_size=chunk_size):
+            batch.append(obj)
+            if len(batch) >= chunk_size:
+                index_objects(kind, batch, fresh=True)
+                totals[kind] += len(batch)
+                batch = []
+                if progress:
+                    progress(kind, totals[kind])
+        index_objects(kind, batch, fresh=True)
+        totals[kind] += len(batch)
+    return totals
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search import indexing
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search index for questions and section content'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=sorted(indexing.SOURCES), help='Перестроить индекс только для одного вида')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Количество объектов в одной пачке')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным')
+        if not indexing.uses_inverted_index():
+            self.stdout.write('SQL Server full-text index is used, it is maintained by the server')
+            return
+
+        self.verbosity = options['verbosity']
+        kinds = [options['type']] if options['type'] else None
+        totals = indexing.rebuild(kinds, chunk_size=options['chunk_size'], progress=self.report_progress)
+        self.stdout.write(self.style.SUCCESS(
+            'Search index rebuilt: ' + ', '.join(f'{count} {kind}' for kind, count in totals.items())
+        ))
+
+    def report_progress(self, kind, count):
+        if self.verbosity >= 2:
+            self.stdout.write(f'{kind}: {count} indexed')
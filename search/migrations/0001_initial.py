@@ -0,0 +1,33 @@
+# Generated by Django 4.2.12 on 2026-10-18 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('question', 'Вопрос'), ('content', 'Содержимое')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('weight', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'Запись поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+                'indexes': [models.Index(fields=['kind', 'object_id'], name='search_entry_object_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('term', 'kind', 'object_id'), name='search_entry_term_object_uniq'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Полнотекстовые индексы SQL Server для поиска. На других СУБД и без установленной
+# службы полнотекстового поиска миграция ничего не делает - поиск идет по SearchEntry.
+
+from django.db import migrations
+
+CATALOG = 'search_catalog'
+LANGUAGE = 1049  # русский
+TABLES = {
+    'quiz_question': ['text'],
+    'sections_content': ['title', 'text'],
+}
+
+
+def fulltext_installed(schema_editor):
+    if schema_editor.connection.vendor != 'microsoft':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT FULLTEXTSERVICEPROPERTY('IsFullTextInstalled')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_indexes(apps, schema_editor):
+    if not fulltext_installed(schema_editor):
+        return
+    quote = schema_editor.connection.ops.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sys.fulltext_catalogs WHERE name = %s", [CATALOG])
+        if cursor.fetchone() is None:
+            cursor.execute(f"CREATE FULLTEXT CATALOG {quote(CATALOG)}")
+        for table, columns in TABLES.items():
+            cursor.execute(
+                "SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID(%s) AND is_primary_key = 1", [table]
+            )
+            key_index = cursor.fetchone()[0]
+            cursor.execute(
+                f"CREATE FULLTEXT INDEX ON {quote(table)} "
+                f"({', '.join(f'{quote(column)} LANGUAGE {LANGUAGE}' for column in columns)}) "
+                f"KEY INDEX {quote(key_index)} ON {quote(CATALOG)} WITH CHANGE_TRACKING AUTO"
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    if not fulltext_installed(schema_editor):
+        return
+    quote = schema_editor.connection.ops.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute("SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID(%s)", [table])
+            if cursor.fetchone() is not None:
+                cursor.execute(f"DROP FULLTEXT INDEX ON {quote(table)}")
+        cursor.execute("SELECT 1 FROM sys.fulltext_catalogs WHERE name = %s", [CATALOG])
+        if cursor.fetchone() is not None:
+            cursor.execute(f"DROP FULLTEXT CATALOG {quote(CATALOG)}")
+
+
+class Migration(migrations.Migration):
+    # CREATE FULLTEXT CATALOG/INDEX нельзя выполнять внутри пользовательской транзакции
+    atomic = False
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('quiz', '0003_question_cat_diff_id_idx'),
+        ('sections', '0002_content_section_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
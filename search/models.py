@@ -0,0 +1,32 @@
+#search\models.py
+from django.db import models
+
+
+KIND_CHOICES = [
+    ('question', 'Вопрос'),
+    ('content', 'Содержимое'),
+]
+
+class SearchEntry(models.Model):
+    """
+    Запись инвертированного индекса: терм, объект (вид и ID) и вес терма в объекте.
+    Используется, когда полнотекстовый поиск SQL Server недоступен.
+    """
+    term = models.CharField(max_length=64)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    weight = models.FloatField()
+
+    def __str__(self):
+        return f'{self.term} -> {self.kind} {self.object_id}'
+
+    class Meta:
+        verbose_name = "Запись поискового индекса"
+        verbose_name_plural = "Поисковый индекс"
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'kind', 'object_id'], name='search_entry_term_object_uniq'),
+        ]
+        indexes = [
+            # Переиндексация объекта удаляет его записи по (kind, object_id)
+            models.Index(fields=['kind', 'object_id'], name='search_entry_object_idx'),
+        ]
@@ -0,0 +1,7 @@
+#search\paginators.py
+from rest_framework.pagination import PageNumberPagination
+
+class SearchResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
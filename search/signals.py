@@ -0,0 +1,58 @@
+#search\signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from config.response_cache import bump_generation
+from quiz.models import QuestionCategory, Question
+from quiz.signals import deleted_directly
+from sections.models import Section, Content
+from .indexing import KINDS, SOURCES, index_objects, remove_objects
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=Content)
+def index_saved(sender, instance, update_fields=None, **kwargs):
+    kind = KINDS[sender]
+    # Сохранение только неиндексируемых полей (например, файла после загрузки) индекс не меняет
+    if update_fields is not None and not set(update_fields) & set(SOURCES[kind][1]):
+        return
+    index_objects(kind, [instance])
+
+
+@receiver(post_delete, sender=Question)
+@receiver(post_delete, sender=Content)
+def remove_deleted(sender, instance, origin=None, **kwargs):
+    # Каскадные удаления снимаются с индекса одним запросом в remove_cascaded, а не по запросу на объект
+    if origin is None or deleted_directly(origin, sender):
+        remove_objects(KINDS[sender], [instance.pk])
+
+
+# Владелец индексируемых объектов: при его удалении объекты удаляются каскадом
+CASCADES = {
+    QuestionCategory: ('question', 'category'),
+    Section: ('content', 'section'),
+    User: ('content', 'section__owner'),
+}
+
+
+@receiver(pre_delete, sender=QuestionCategory)
+@receiver(pre_delete, sender=Section)
+@receiver(pre_delete, sender=User)
+def remove_cascaded(sender, instance, origin=None, **kwargs):
+    """Записи объектов, удаляемых каскадом вместе с instance, - одним DELETE с подзапросом."""
+    # Разделы удаляются каскадом вместе с пользователем - их содержимое уже снято по владельцу
+    if origin is not None and not deleted_directly(origin, sender):
+        return
+    kind, lookup = CASCADES[sender]
+    model = SOURCES[kind][0]
+    remove_objects(kind, model.objects.filter(**{lookup: instance}).values('id'))
+
+
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+def invalidate_content_counts(sender, **kwargs):
+    """Счетчик документов поиска (document_count) зависит от поколения Content, как у Question в quiz.signals."""
+    bump_generation(sender)
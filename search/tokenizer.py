@@ -0,0 +1,66 @@
+#search\tokenizer.py
+import re
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-я]')
+VOWELS_RE = re.compile(r'[аеиоуыэюя]')
+MAX_TERM_LENGTH = 64
+
+STOP_WORDS = frozenset('''
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне
+было вот от меня еще нет о из ему теперь когда даже ну ли если уже или ни быть был него до вас
+нибудь опять уж вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их
+чем была сам чтоб без будто чего раз тоже себе под будет ж тогда кто этот того потому этого
+совсем ним здесь этом почти мой тем чтобы нее сейчас были куда зачем всех никогда можно при
+об хоть после над больше тот через эти нас про всего них разве эту моя свою этой перед
+the a an of and or to in on is are was for with by at
+'''.split())
+
+# Окончания русских слов (прилагательные, причастия, глаголы, существительные), от длинных к коротким
+ENDINGS = tuple(sorted(set('''
+ившись ывшись вшись ивши ывши вши ив ыв в
+ими ыми его ого ему ому ее ие ые ое ей ий ый ой ем им ым ом их ых ую юю ая яя ою ею
+ейте уйте ите или ыли ило ыло ено ует уют ить ыть ишь ила ыла ена ете йте ешь нно ил ыл ен ят ит ыт ены
+ла на ли ло но ет ют ны ть
+иями ями ами иях ией ием иям ях ах ям ам ом ем ев ов ие ье еи ии ию ью ия ья
+а е и й о у ы ь ю я
+'''.split()), key=len, reverse=True))
+
+
+def stem(word):
+    """
+    Упрощенный стеммер для русского: отрезает самое длинное подходящее окончание
+    в области после первой гласной (RV), чтобы "рыба", "рыбы" и "рыбой" давали один терм.
+    Слова не на кириллице возвращаются без изменений.
+    """
+    if not CYRILLIC_RE.search(word):
+        return word
+    match = VOWELS_RE.search(word)
+    if match is None:
+        return word
+    rv = match.end()
+    if word.endswith(('ся', 'сь')) and len(word) - 2 >= rv:
+        word = word[:-2]
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= max(rv, 2):
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    """Термы текста в порядке появления: нижний регистр, ё -> е, без стоп-слов, со стеммингом."""
+    terms = []
+    for word in WORD_RE.findall((text or '').lower().replace('ё', 'е')):
+        if word in STOP_WORDS or (len(word) < 2 and not word.isdigit()):
+            continue
+        terms.append(stem(word)[:MAX_TERM_LENGTH])
+    return terms
+
+
+def query_words(text, limit=10):
+    """Уникальные слова поискового запроса (без стемминга) в порядке появления, не больше limit."""
+    words = []
+    for word in WORD_RE.findall((text or '').lower().replace('ё', 'е')):
+        if word not in STOP_WORDS and word not in words:
+            words.append(word)
+    return words[:limit]
@@ -0,0 +1,42 @@
+#search\views.py
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from quiz.serializers import QuestionSerializer
+from sections.serializers import ContentSerializer
+from .backends import SearchResults, get_backend
+from .indexing import SOURCES
+from .paginators import SearchResultsSetPagination
+
+SERIALIZERS = {
+    'question': QuestionSerializer,
+    'content': ContentSerializer,
+}
+
+
+class SearchAPIView(APIView):
+    """
+    Поиск по тексту вопросов и по заголовку и тексту содержимого разделов.
+    ?q= - строка запроса (обязательна), ?type=question|content - ограничить вид результатов.
+    Содержимое чужих разделов видно только суперпользователю.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SearchResultsSetPagination
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"error": "Параметр q обязателен"}, status=status.HTTP_400_BAD_REQUEST)
+        kind = request.query_params.get('type')
+        if kind and kind not in SOURCES:
+            return Response(
+                {"error": f"Неизвестный type, допустимо: {', '.join(SOURCES)}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        kinds = [kind] if kind else list(SOURCES)
+
+        paginator = self.pagination_class()
+        hits = paginator.paginate_queryset(SearchResults(get_backend(text, kinds, request.user)), request, view=self)
+        for hit in hits:
+            hit['object'] = SERIALIZERS[hit['type']](hit['object'], context={'request': request}).data
+        return paginator.get_paginated_response(hits)
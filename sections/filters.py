@@ -0,0 +1,15 @@
+#sections\filters.py
+import django_filters
+
+from .models import Content
+
+
+class ContentFilter(django_filters.FilterSet):
+    """?section=, ?created_at__gte=, ?created_at__lt=. Раздел фильтруется по числовому ID без лишнего запроса."""
+    section = django_filters.NumberFilter(field_name='section_id')
+
+    class Meta:
+        model = Content
+        fields = {
+            'created_at': ['gte', 'lt'],
+        }
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sections import uploads
+
+
+class Command(BaseCommand):
+    help = 'Deletes chunked uploads that have not received data for a while'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, help='Возраст последней части в часах (по умолчанию CONTENT_UPLOAD_EXPIRE_HOURS)')
+
+    def handle(self, *args, **options):
+        if options['hours'] is not None and options['hours'] < 1:
+            raise CommandError('--hours должен быть положительным')
+        max_age = timedelta(hours=options['hours']) if options['hours'] else None
+        count = uploads.cleanup(max_age)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} expired uploads'))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.12 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sections', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['section', 'created_at'], name='content_section_created_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.12 on 2026-10-18 17:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sections', '0002_content_section_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='sections.content')),
+            ],
+            options={
+                'verbose_name': 'Загрузка файла',
+                'verbose_name_plural': 'Загрузки файлов',
+            },
+        ),
+    ]
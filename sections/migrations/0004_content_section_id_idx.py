@@ -0,0 +1,27 @@
+# Generated by Django 4.2.12 on 2026-10-18 18:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sections', '0003_contentupload'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='content',
+            name='content_section_created_idx',
+        ),
+        migrations.AlterField(
+            model_name='content',
+            name='section',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='contents', to='sections.section'),
+        ),
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['section', 'id'], name='content_section_id_idx'),
+        ),
+    ]
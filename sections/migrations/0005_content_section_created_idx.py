@@ -0,0 +1,17 @@
+# Generated by Django 4.2.12 on 2026-10-18 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sections', '0004_content_section_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['section', 'created_at'], name='content_section_created_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 #sections\models.py
+import uuid
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -19,7 +21,8 @@ class Section(models.Model):
 
 
 class Content(models.Model):
-    section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='contents')
+    # Отдельный индекс внешнего ключа не нужен: его заменяет content_section_id_idx
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='contents', db_index=False)
     title = models.CharField(max_length=200)
     text = models.TextField(blank=True)
     file = models.FileField(upload_to='content_files/', blank=True, null=True) # Или ImageField
@@ -31,3 +34,31 @@ class Content(models.Model):
     class Meta:
         verbose_name = "Содержимое"
         verbose_name_plural = "Содержимое"
+        indexes = [
+            # Список содержимого раздела сортируется по id (и курсорная навигация идет по id)
+            models.Index(fields=['section', 'id'], name='content_section_id_idx'),
+            # Фильтры ContentFilter по дате (created_at__gte/lt) и подсчет строк для пагинации по ним
+            models.Index(fields=['section', 'created_at'], name='content_section_created_idx'),
+        ]
+
+
+class ContentUpload(models.Model):
+    """
+    Незавершенная загрузка файла содержимого частями. Принятые байты лежат во временном
+    файле (sections/uploads.py), offset - сколько байт уже принято; после последней части
+    файл переносится в Content.file, а запись удаляется.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    content = models.ForeignKey(Content, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'
+
+    class Meta:
+        verbose_name = "Загрузка файла"
+        verbose_name_plural = "Загрузки файлов"
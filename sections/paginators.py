@@ -1,7 +1,7 @@
 #sections\paginators.py
-from rest_framework.pagination import PageNumberPagination
+from config.pagination import CursorOptionalPagination
 
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(CursorOptionalPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
\ No newline at end of file
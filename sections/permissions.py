@@ -6,9 +6,14 @@ class IsOwner(permissions.BasePermission):
     Разрешает доступ только владельцу объекта ИЛИ суперпользователю.
     """
     def has_object_permission(self, request, view, obj):
-        return request.user.is_superuser or obj.owner == request.user
+        return request.user.is_superuser or obj.owner_id == request.user.pk
 
 class IsSectionOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        # Разрешаем суперпользователю или владельцу раздела
-        return request.user.is_superuser or obj.section.owner == request.user
\ No newline at end of file
+        # Разрешаем суперпользователю или владельцу раздела (раздел подгружается через select_related)
+        return request.user.is_superuser or obj.section.owner_id == request.user.pk
+
+class IsUploadOwner(permissions.BasePermission):
+    def has_object_permission(self, request, view, obj):
+        # Загрузкой управляет владелец раздела ее содержимого или суперпользователь
+        return request.user.is_superuser or obj.content.section.owner_id == request.user.pk
@@ -1,6 +1,7 @@
 #sections\serializers.py
 from rest_framework import serializers
-from .models import Section, Content
+from django.conf import settings
+from .models import Section, Content, ContentUpload
 
 class SectionSerializer(serializers.ModelSerializer):
     owner = serializers.ReadOnlyField(source='owner.username') # Отображаем имя владельца
@@ -13,4 +14,26 @@ class SectionSerializer(serializers.ModelSerializer):
 class ContentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Content
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class ContentUploadSerializer(serializers.ModelSerializer):
+    size = serializers.IntegerField(min_value=1, help_text="Размер файла в байтах")
+
+    class Meta:
+        model = ContentUpload
+        fields = ('id', 'content', 'filename', 'size', 'offset', 'created_at')
+        read_only_fields = ('id', 'content', 'offset', 'created_at')
+
+    def validate_filename(self, value):
+        value = value.replace('\\', '/').rsplit('/', 1)[-1].strip()
+        if not value or value in ('.', '..'):
+            raise serializers.ValidationError("Некорректное имя файла.")
+        return value
+
+    def validate_size(self, value):
+        if value > settings.CONTENT_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Файл больше допустимого размера ({settings.CONTENT_UPLOAD_MAX_SIZE} байт)."
+            )
+        return value
@@ -0,0 +1,124 @@
+#sections\uploads.py
+import logging
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ContentUpload
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+
+
+class AssembledFile(File):
+    """
+    Собранный из частей файл. FileSystemStorage переносит файлы с temporary_file_path()
+    через file_move_safe (переименование на том же диске) вместо копирования содержимого.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def part_path(upload):
+    return os.path.join(settings.CONTENT_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def start(content, filename, size):
+    """Создает загрузку и пустой временный файл для ее частей."""
+    os.makedirs(settings.CONTENT_UPLOAD_DIR, exist_ok=True)
+    upload = ContentUpload.objects.create(content=content, filename=filename, size=size)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def receive(stream, length):
+    """
+    Читает до length байт части из stream во временный файл в CONTENT_UPLOAD_DIR блоками по BLOCK_SIZE,
+    не обращаясь к БД. Если клиент оборвал передачу, возвращается полученное - следующая часть продолжит
+    с него. Возвращает (файл, число байт); файл удаляется при закрытии.
+    """
+    os.makedirs(settings.CONTENT_UPLOAD_DIR, exist_ok=True)
+    chunk = tempfile.TemporaryFile(dir=settings.CONTENT_UPLOAD_DIR)
+    received = 0
+    try:
+        while received < length:
+            block = stream.read(min(BLOCK_SIZE, length - received))
+            if not block:
+                break
+            chunk.write(block)
+            received += len(block)
+    except OSError:
+        # UnreadablePostError (обрыв соединения) - подкласс OSError
+        logger.warning("Часть загрузки прервана после %s байт", received)
+    chunk.seek(0)
+    return chunk, received
+
+
+def write_chunk(upload, chunk, length):
+    """
+    Дописывает принятую часть (length байт из receive()) во временный файл загрузки с upload.offset.
+    Смещение сверяется и сдвигается одним UPDATE: строка остается заблокированной до конца транзакции,
+    поэтому вызывается внутри transaction.atomic(). Возвращает False, если другая часть уже сдвинула смещение.
+    """
+    claimed = ContentUpload.objects.filter(pk=upload.pk, offset=upload.offset).update(
+        offset=F('offset') + length, updated_at=timezone.now(),
+    )
+    if not claimed:
+        return False
+    with open(part_path(upload), 'r+b') as f:
+        f.seek(upload.offset)
+        shutil.copyfileobj(chunk, f, BLOCK_SIZE)
+    upload.offset += length
+    return True
+
+
+def finish(upload):
+    """
+    Переносит собранный файл в Content.file и удаляет загрузку. Предыдущий файл содержимого
+    удаляется из хранилища после фиксации транзакции.
+    """
+    content = upload.content
+    previous = content.file.name if content.file else None
+    path = part_path(upload)
+    with open(path, 'r+b') as f:
+        # Хвост от прерванной части за пределами size отрезаем
+        f.truncate(upload.size)
+    with open(path, 'rb') as f:
+        content.file.save(upload.filename, AssembledFile(f, name=path), save=False)
+    content.save(update_fields=['file'])
+    if os.path.exists(path):
+        os.remove(path)
+    upload.delete()
+    if previous and previous != content.file.name:
+        storage = content.file.storage
+        transaction.on_commit(lambda: storage.delete(previous))
+    return content
+
+
+def discard(upload):
+    """Отменяет загрузку и удаляет временный файл."""
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def cleanup(max_age=None):
+    """Удаляет загрузки, не получавшие частей дольше max_age (по умолчанию CONTENT_UPLOAD_EXPIRE_HOURS)."""
+    max_age = max_age or timedelta(hours=settings.CONTENT_UPLOAD_EXPIRE_HOURS)
+    expired = ContentUpload.objects.filter(updated_at__lt=timezone.now() - max_age)
+    count = 0
+    for upload in expired.iterator():
+        discard(upload)
+        count += 1
+    return count
@@ -1,11 +1,15 @@
 #sections\usrl.py
 from django.urls import path
 from .views import SectionListCreateAPIView, SectionRetrieveUpdateDestroyAPIView, \
-                   ContentListCreateAPIView, ContentRetrieveUpdateDestroyAPIView
+                   ContentListCreateAPIView, ContentRetrieveUpdateDestroyAPIView, \
+                   ContentFileDownloadAPIView, ContentUploadCreateAPIView, ContentUploadAPIView
 
 urlpatterns = [
     path('sections/', SectionListCreateAPIView.as_view(), name='section-list-create'),
     path('sections/<int:pk>/', SectionRetrieveUpdateDestroyAPIView.as_view(), name='section-detail'),
     path('contents/', ContentListCreateAPIView.as_view(), name='content-list-create'),
     path('contents/<int:pk>/', ContentRetrieveUpdateDestroyAPIView.as_view(), name='content-detail'),
+    path('contents/<int:pk>/file/', ContentFileDownloadAPIView.as_view(), name='content-file'),
+    path('contents/<int:pk>/uploads/', ContentUploadCreateAPIView.as_view(), name='content-upload-create'),
+    path('uploads/<uuid:pk>/', ContentUploadAPIView.as_view(), name='content-upload'),
 ]
\ No newline at end of file
@@ -1,11 +1,18 @@
 #sections\views.py
 # sections\views.py
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import render
-from rest_framework import generics, permissions
-from .models import Section, Content
-from .serializers import SectionSerializer, ContentSerializer
-from .permissions import IsOwner, IsSectionOwner
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from config.downloads import serve_file
+from . import uploads
+from .models import Section, Content, ContentUpload
+from .serializers import SectionSerializer, ContentSerializer, ContentUploadSerializer
+from .permissions import IsOwner, IsSectionOwner, IsUploadOwner
 from .paginators import StandardResultsSetPagination
+from .filters import ContentFilter
 from django.core.exceptions import PermissionDenied
 from django.db.models import Q  # Import Q for more complex queries
 
@@ -23,11 +30,11 @@ class SectionListCreateAPIView(generics.ListCreateAPIView):
         """
         Возвращает только разделы, принадлежащие текущему пользователю.
         """
-        return Section.objects.filter(owner=self.request.user)
+        return Section.objects.filter(owner=self.request.user).select_related('owner')
 
 
 class SectionRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Section.objects.all()
+    queryset = Section.objects.select_related('owner')
     serializer_class = SectionSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
 
@@ -36,6 +43,7 @@ class ContentListCreateAPIView(generics.ListCreateAPIView):
     serializer_class = ContentSerializer
     permission_classes = [permissions.IsAuthenticated, IsSectionOwner]
     pagination_class = StandardResultsSetPagination
+    filterset_class = ContentFilter
 
     def get_queryset(self):
         """
@@ -43,20 +51,127 @@ class ContentListCreateAPIView(generics.ListCreateAPIView):
         или если пользователь - суперпользователь.
         """
         if self.request.user.is_superuser:
-            return Content.objects.all()
+            return Content.objects.order_by('id')
         else:
-            return Content.objects.filter(section__owner=self.request.user)
+            return Content.objects.filter(section__owner=self.request.user).order_by('id')
 
 
     def perform_create(self, serializer):
         # Проверяем, что пользователь имеет право создавать контент в этом разделе
         section = serializer.validated_data['section']
-        if section.owner != self.request.user and not self.request.user.is_superuser:
+        if section.owner_id != self.request.user.pk and not self.request.user.is_superuser:
             raise PermissionDenied("Вы не можете добавлять контент в чужой раздел")
         serializer.save()
 
 
 class ContentRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Content.objects.all()
+    queryset = Content.objects.select_related('section')
     serializer_class = ContentSerializer
     permission_classes = [permissions.IsAuthenticated, IsSectionOwner]
+
+
+class ContentFileDownloadAPIView(generics.GenericAPIView):
+    """
+    Скачивание файла содержимого с поддержкой Range, If-Range и условных запросов
+    (ETag / Last-Modified). При SENDFILE_BACKEND файл отдает веб-сервер.
+    """
+    queryset = Content.objects.select_related('section')
+    permission_classes = [permissions.IsAuthenticated, IsSectionOwner]
+
+    def get(self, request, *args, **kwargs):
+        content = self.get_object()
+        if not content.file:
+            raise Http404("У содержимого нет файла")
+        try:
+            return serve_file(request, content.file, as_attachment='download' in request.query_params)
+        except FileNotFoundError:
+            raise Http404("Файл не найден в хранилище")
+
+
+class ContentUploadCreateAPIView(generics.GenericAPIView):
+    """
+    Начинает загрузку файла содержимого частями: POST {"filename", "size"} возвращает id загрузки.
+    Части отправляются в ContentUploadAPIView, после последней файл становится Content.file.
+    """
+    queryset = Content.objects.select_related('section')
+    serializer_class = ContentUploadSerializer
+    permission_classes = [permissions.IsAuthenticated, IsSectionOwner]
+
+    def post(self, request, *args, **kwargs):
+        content = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = uploads.start(content, serializer.validated_data['filename'], serializer.validated_data['size'])
+        data = {**self.get_serializer(upload).data, 'chunk_size': settings.CONTENT_UPLOAD_CHUNK_SIZE}
+        return Response(data, status=status.HTTP_201_CREATED, headers=upload_headers(upload))
+
+
+class ContentUploadAPIView(generics.GenericAPIView):
+    """
+    Состояние и части загрузки.
+    GET/HEAD - сколько байт принято (offset, заголовок Upload-Offset), с него клиент продолжает после обрыва.
+    PUT - тело запроса дописывается в файл; Upload-Offset должен совпадать с принятым числом байт.
+    DELETE - отмена загрузки.
+    """
+    queryset = ContentUpload.objects.select_related('content__section')
+    serializer_class = ContentUploadSerializer
+    permission_classes = [permissions.IsAuthenticated, IsUploadOwner]
+
+    def get(self, request, *args, **kwargs):
+        upload = self.get_object()
+        return Response(self.get_serializer(upload).data, headers=upload_headers(upload))
+
+    def put(self, request, *args, **kwargs):
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response({"error": "Нужны заголовки Upload-Offset и Content-Length"}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.CONTENT_UPLOAD_CHUNK_SIZE:
+            return Response(
+                {"error": f"Часть больше {settings.CONTENT_UPLOAD_CHUNK_SIZE} байт"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        upload = self.get_object()
+        if offset != upload.offset:
+            return offset_conflict(upload)
+        if offset + length > upload.size:
+            return Response({"error": "Часть выходит за размер файла"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Тело части читается до транзакции: медленный клиент не держит блокировку строки загрузки
+        chunk, received = uploads.receive(request.stream, length)
+        with chunk, transaction.atomic():
+            # Блокировка строки берется только на сверку смещения и дозапись: из двух частей с одним смещением
+            # вторая получит 409
+            if not uploads.write_chunk(upload, chunk, received):
+                upload.offset = ContentUpload.objects.filter(pk=upload.pk).values_list('offset', flat=True).first()
+                if upload.offset is None:
+                    raise Http404
+                return offset_conflict(upload)
+            if received < length:
+                return Response(
+                    {"error": "Часть получена не полностью", "offset": upload.offset},
+                    status=status.HTTP_400_BAD_REQUEST, headers=upload_headers(upload),
+                )
+            data = {**self.get_serializer(upload).data, 'complete': upload.offset == upload.size}
+            headers = upload_headers(upload)
+            if data['complete']:
+                content = uploads.finish(upload)
+                data['file'] = ContentSerializer(content, context=self.get_serializer_context()).data['file']
+        return Response(data, headers=headers)
+
+    def delete(self, request, *args, **kwargs):
+        uploads.discard(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def upload_headers(upload):
+    return {'Upload-Offset': str(upload.offset), 'Upload-Length': str(upload.size)}
+
+
+def offset_conflict(upload):
+    return Response(
+        {"error": "Смещение не совпадает с принятым числом байт", "offset": upload.offset},
+        status=status.HTTP_409_CONFLICT, headers=upload_headers(upload),
+    )
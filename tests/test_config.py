@@ -2,6 +2,23 @@
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from unittest import skipUnless
+
+from config.benchmarks import compare, measure, summarize
+from config.cache_backends import TwoTierCache
+from config.log_handlers import DeferredQueueHandler, SQLSampleFilter, parse_levels
+from sections.models import Section
+import logging
+import pickle
+import queue
+import sys
+from unittest import mock
+from rest_framework.test import APIClient
+
+try:
+    from fakeredis import FakeConnection
+except ImportError:
+    FakeConnection = None
 
 User = get_user_model()
 
@@ -30,4 +47,182 @@ class ConfigTests(TestCase):
         response = self.client.post(url, data)  # Используем POST-запрос
         self.assertEqual(response.status_code, 200)
         # Проверяем, что в ответе есть access token
-        self.assertIn('access', response.data)
\ No newline at end of file
+        self.assertIn('access', response.data)
+
+
+@skipUnless(FakeConnection, "Для тестов двухуровневого кэша нужен fakeredis")
+class TwoTierCacheTests(TestCase):
+    def make_cache(self, location='redis://fake-redis:6379/0', **options):
+        params = {
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                'CONNECTION_POOL_KWARGS': {'connection_class': FakeConnection},
+                'LOCAL_PREFIXES': ('resp:',),
+                **options,
+            },
+        }
+        cache = TwoTierCache(location, params)
+        self.addCleanup(cache.remote.clear)
+        return cache
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Повторное чтение ключа из LOCAL_PREFIXES берется из LRU процесса, даже если в Redis значение пропало."""
+        cache = self.make_cache()
+        cache.set('resp:key', {'a': 1})
+        cache.remote.delete('resp:key')
+        self.assertEqual(cache.get('resp:key'), {'a': 1})
+        self.assertEqual(cache.get_many(['resp:key']), {'resp:key': {'a': 1}})
+
+    def test_local_tier_is_bounded(self):
+        """LRU процесса не растет больше LOCAL_MAX_ENTRIES."""
+        cache = self.make_cache(LOCAL_MAX_ENTRIES=2)
+        for i in range(5):
+            cache.set(f'resp:key{i}', i)
+        self.assertEqual(len(cache.local.data), 2)
+        self.assertEqual(cache.get('resp:key0'), 0)  # Из Redis
+
+    def test_mutable_keys_skip_local_tier(self):
+        """Ключи вне LOCAL_PREFIXES не попадают в LRU: изменения одного процесса сразу видны другому."""
+        first = self.make_cache()
+        second = self.make_cache()
+        first.set('counter', 1)
+        self.assertEqual(second.get('counter'), 1)
+        first.incr('counter')
+        self.assertEqual(second.get('counter'), 2)
+
+        second.set('state', {'answers': [1]})
+        self.assertEqual(first.get('state'), {'answers': [1]})
+        self.assertIsNone(first.get('added'))
+        second.add('added', 1)
+        self.assertEqual(first.get('added'), 1)
+        first.get_many(['a', 'b'])
+        second.set_many({'a': 1, 'b': 2})
+        self.assertEqual(first.get_many(['a', 'b']), {'a': 1, 'b': 2})
+        self.assertEqual(len(first.local.data), 0)
+
+    def test_writes_do_not_touch_other_processes(self):
+        """Запись не сбрасывает LRU других процессов и не делает лишних обращений к Redis."""
+        first = self.make_cache()
+        second = self.make_cache()
+        first.set('resp:a', 1)
+        self.assertEqual(second.get('resp:a'), 1)
+        with mock.patch.object(first.remote, 'incr') as incr, mock.patch.object(first.remote, 'add') as add:
+            first.set('state', 1)
+            first.set_many({'resp:b': 2})
+        incr.assert_not_called()
+        add.assert_not_called()
+        self.assertIn(second.make_and_validate_key('resp:a'), second.local.data)
+
+    def test_keys_changed_during_outage_are_dropped_on_recovery(self):
+        """Ключи, измененные delete и incr без Redis, удаляются в Redis после его восстановления."""
+        cache = self.make_cache()
+        cache.set('gen:question', 1)
+        with self.assertLogs('config.cache_backends', level='ERROR'):
+            cache._mark_down(ConnectionError("down"))
+        cache.fallback.set('gen:question', 1, timeout=None)
+        cache.incr('gen:question')
+        self.assertEqual(cache.remote.get('gen:question'), 1)
+        cache._down_until = 0.0
+        self.assertIsNone(cache.get('gen:question'))
+        self.assertFalse(cache._pending)
+
+    def test_fallback_when_redis_down(self):
+        """Если Redis не отвечает, кэш работает в памяти процесса."""
+        params = {'OPTIONS': {'SOCKET_CONNECT_TIMEOUT': 0.2, 'SOCKET_TIMEOUT': 0.2}}
+        cache = TwoTierCache('redis://127.0.0.1:1/0', params)
+        with self.assertLogs('config.cache_backends', level='ERROR'):
+            cache.set('key', 'value')
+        self.assertFalse(cache.healthy)
+        self.assertEqual(cache.get('key'), 'value')
+        cache.delete('key')
+        self.assertIsNone(cache.get('key'))
+
+
+class LoggingTests(TestCase):
+    def make_record(self, duration=None):
+        record = logging.LogRecord('django.db.backends', logging.DEBUG, __file__, 0, '(%.3f) %s', (0.0, 'SELECT 1'), None)
+        if duration is not None:
+            record.duration = duration
+        return record
+
+    def test_handlers_are_queued(self):
+        """Обработчики корневого логгера вынесены за DeferredQueueHandler."""
+        handlers = logging.getLogger().handlers
+        self.assertTrue(handlers)
+        self.assertTrue(all(isinstance(handler, DeferredQueueHandler) for handler in handlers))
+
+    def test_queue_handler_does_not_format(self):
+        """В очередь попадает неотформатированная запись; трассировка заменена текстом и запись сериализуется."""
+        records = queue.SimpleQueue()
+        handler = DeferredQueueHandler(records)
+        with mock.patch.object(handler, 'format', side_effect=AssertionError("format в потоке запроса")):
+            handler.handle(self.make_record())
+            try:
+                raise ValueError("сбой")
+            except ValueError:
+                record = logging.LogRecord('quiz', logging.ERROR, __file__, 0, 'Ошибка %s', ('x',), sys.exc_info())
+            handler.handle(record)
+        sql, error = records.get_nowait(), records.get_nowait()
+        self.assertEqual((sql.msg, sql.args), ('(%.3f) %s', (0.0, 'SELECT 1')))
+        self.assertIsNone(error.exc_info)
+        self.assertIn('ValueError: сбой', error.exc_text)
+        self.assertIn('ValueError: сбой', logging.Formatter().format(pickle.loads(pickle.dumps(error))))
+
+    def test_sql_sample_filter(self):
+        """Медленные запросы проходят всегда, остальные - с долей sample_rate."""
+        sql_filter = SQLSampleFilter(sample_rate=0, slow_ms=100)
+        self.assertTrue(sql_filter.filter(self.make_record(duration=0.2)))
+        self.assertFalse(sql_filter.filter(self.make_record(duration=0.01)))
+        self.assertTrue(sql_filter.filter(self.make_record()))  # Не SQL-запись
+        self.assertTrue(SQLSampleFilter(sample_rate=1).filter(self.make_record(duration=0.01)))
+
+    def test_parse_levels(self):
+        self.assertEqual(parse_levels('quiz=debug, django.request=WARNING,broken'), {'quiz': 'DEBUG', 'django.request': 'WARNING'})
+        self.assertEqual(parse_levels(None), {})
+
+
+class BenchmarkTests(TestCase):
+    def test_summarize_percentiles(self):
+        summary = summarize([i / 1000 for i in range(1, 101)], elapsed=2.0)
+        self.assertEqual(summary['requests'], 100)
+        self.assertEqual(summary['rps'], 50.0)
+        self.assertEqual((summary['p50_ms'], summary['p95_ms'], summary['p99_ms']), (50.0, 95.0, 99.0))
+
+    def test_measure_counts_queries(self):
+        user = User.objects.create_user(username="bench", password="password123", email="bench@example.com")
+        client = APIClient()
+        client.force_authenticate(user)
+        result = measure(client, 'get', reverse('section-list-create'), requests=3)
+        self.assertEqual(result['status'], 200)
+        self.assertEqual(result['requests'], 3)
+        self.assertGreater(result['peak_memory_kb'], 0)
+        self.assertGreaterEqual(result['queries'], 1)
+
+    def test_measure_prepares_each_request_outside_counts(self):
+        user = User.objects.create_user(username="bench", password="password123", email="bench@example.com")
+        client = APIClient()
+        client.force_authenticate(user)
+        fixed = measure(client, 'get', reverse('section-detail', args=[Section.objects.create(title='s', owner=user).pk]),
+                        requests=1)
+        urls = []
+
+        def fresh_section():
+            urls.append(reverse('section-detail', args=[Section.objects.create(title='s', owner=user).pk]))
+            return urls[-1]
+
+        result = measure(client, 'get', fresh_section, requests=3)
+        self.assertEqual(result['status'], 200)
+        self.assertEqual(len(set(urls)), 6)
+        # Создание раздела перед запросом не входит в число запросов эндпоинта
+        self.assertEqual(result['queries'], fixed['queries'])
+
+    def test_compare_reports_regressions(self):
+        base = {'status': 200, 'queries': 2, 'peak_memory_kb': 100.0, 'p95_ms': 10.0}
+        baseline = {'1000': {'list': base}}
+        noise = {'1000': {'list': {**base, 'p95_ms': 10.9}}}
+        self.assertEqual(compare(noise, baseline), [])
+        worse = {'1000': {'list': {**base, 'queries': 3, 'p95_ms': 20.0}, 'new': base}}
+        regressions = compare(worse, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(item.startswith('list [1000]') for item in regressions))
@@ -0,0 +1,223 @@
+#test_query_budget.py
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from quiz.models import QuestionCategory, Question, Answer
+from sections.models import Section, Content
+from tests.utils import assert_within_query_budget, create_user
+
+User = get_user_model()
+
+
+# Снимок пользователя не кэшируется: запрос аутентификации JWT учитывается в каждом измерении
+@override_settings(CACHE_ENABLED=False, QUIZ_ANSWER_KEY_ENABLED=False, USER_SNAPSHOT_TIMEOUT=0)
+class QueryBudgetTests(APITestCase):
+    """Каждый эндпоинт quiz, sections и users укладывается в свой бюджет SQL-запросов при любом объеме данных."""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username="admin_test", password="password123", email="admin@example.com")
+        self.member_user = create_user(username="member_test", password="password123", email="member@example.com")
+        for i in range(15):
+            create_user(username=f"user_{i}", password="password123", email=f"user_{i}@example.com")
+        call_command('load_quiz_data', stdout=io.StringIO())
+        self.question = Question.objects.first()
+        self.answer = self.question.answers.first()
+        self.section = Section.objects.create(title="Section", owner=self.member_user)
+        for i in range(15):
+            Content.objects.create(section=self.section, title=f"Content {i}")
+            Section.objects.create(title=f"Section {i}", owner=self.member_user)
+        self.content = self.section.contents.first()
+
+    def authenticate(self, user):
+        """Настоящий Bearer-токен, а не force_authenticate: запрос пользователя при проверке JWT тоже входит в бюджет."""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def test_quiz_endpoints(self):
+        self.authenticate(self.admin_user)
+        assert_within_query_budget(self, 'category-list-create')
+        assert_within_query_budget(self, 'category-detail', args=[self.question.category_id])
+        assert_within_query_budget(self, 'question-list-create')
+        assert_within_query_budget(self, 'question-play-list')
+        assert_within_query_budget(self, 'question-detail', args=[self.question.pk])
+        assert_within_query_budget(self, 'answer-list-create')
+        assert_within_query_budget(self, 'answer-detail', args=[self.answer.pk])
+        assert_within_query_budget(self, 'check_answer', method='post',
+                                   data={'question_id': self.question.pk, 'answer_id': self.answer.pk})
+        pairs = [{'question_id': a.question_id, 'answer_id': a.pk} for a in Answer.objects.all()]
+        assert_within_query_budget(self, 'check_answers', method='post', data={'answers': pairs})
+        questions = [
+            {'category': self.question.category_id, 'text': f'Новый вопрос {i}', 'difficulty': 'easy',
+             'answers': [{'text': 'Да', 'is_correct': True}, {'text': 'Нет'}]}
+            for i in range(100)
+        ]
+        assert_within_query_budget(self, 'question-bulk-create', method='post', data={'questions': questions})
+
+    def test_quiz_write_endpoints(self):
+        """Изменяющие методы проверяются по своим бюджетам ('имя:МЕТОД')."""
+        self.authenticate(self.admin_user)
+        category_id = self.question.category_id
+        assert_within_query_budget(self, 'category-list-create', method='post', data={'name': 'Рыбы'})
+        assert_within_query_budget(self, 'category-detail', args=[category_id], method='patch', data={'name': 'Звери'})
+        assert_within_query_budget(self, 'category-detail', args=[category_id], method='put', data={'name': 'Звери'})
+        assert_within_query_budget(self, 'question-list-create', method='post',
+                                   data={'category_id': category_id, 'text': 'Новый вопрос', 'difficulty': 'easy'})
+        assert_within_query_budget(self, 'question-detail', args=[self.question.pk], method='patch', data={'text': 'Текст'})
+        assert_within_query_budget(self, 'question-detail', args=[self.question.pk], method='put',
+                                   data={'category_id': category_id, 'text': 'Текст', 'difficulty': 'hard'})
+        assert_within_query_budget(self, 'answer-list-create', method='post',
+                                   data={'question': self.question.pk, 'text': 'Ответ', 'is_correct': False})
+        assert_within_query_budget(self, 'answer-detail', args=[self.answer.pk], method='patch', data={'text': 'Ответ'})
+        assert_within_query_budget(self, 'answer-detail', args=[self.answer.pk], method='put',
+                                   data={'question': self.question.pk, 'text': 'Ответ', 'is_correct': True})
+        assert_within_query_budget(self, 'answer-detail', args=[self.answer.pk], method='delete')
+        assert_within_query_budget(self, 'question-detail', args=[self.question.pk], method='delete')
+        assert_within_query_budget(self, 'category-detail', args=[category_id], method='delete')
+
+    def test_async_quiz_endpoints(self):
+        self.authenticate(self.member_user)
+        assert_within_query_budget(self, 'async-check-answer', method='post',
+                                   data={'question_id': self.question.pk, 'answer_id': self.answer.pk})
+        pairs = [{'question_id': a.question_id, 'answer_id': a.pk} for a in Answer.objects.all()]
+        assert_within_query_budget(self, 'async-check-answers', method='post', data={'answers': pairs})
+        assert_within_query_budget(self, 'async-question-detail', args=[self.question.pk])
+        assert_within_query_budget(self, 'async-category-list')
+
+    def test_quiz_session_endpoints(self):
+        self.authenticate(self.member_user)
+        # Первый старт - с холодным кэшем списков ID: все сложности читаются из БД
+        cache.clear()
+        response = assert_within_query_budget(self, 'quiz-session-start', method='post',
+                                              data={'category': self.question.category_id, 'count': 1})
+        session_id, question = response.data['id'], response.data['questions'][0]
+        assert_within_query_budget(self, 'quiz-session-detail', args=[session_id])
+        assert_within_query_budget(self, 'quiz-session-answer', args=[session_id], method='post',
+                                   data={'question_id': question['id'], 'answer_id': question['answers'][0]['id']})
+        assert_within_query_budget(self, 'quiz-session-finish', args=[session_id], method='post')
+        assert_within_query_budget(self, 'quiz-session-start', method='post',
+                                   data={'category': self.question.category_id, 'count': 1})
+
+    def test_quiz_adaptive_endpoints(self):
+        self.authenticate(self.member_user)
+        category_id = self.question.category_id
+        response = assert_within_query_budget(self, 'quiz-adaptive-next', args=[category_id])
+        question = response.data['question']
+        assert_within_query_budget(self, 'quiz-adaptive-answer', args=[category_id], method='post',
+                                   data={'question_id': question['id'], 'answer_id': question['answers'][0]['id']})
+
+    def test_quiz_stats_endpoints(self):
+        self.authenticate(self.admin_user)
+        assert_within_query_budget(self, 'quiz-stats')
+        assert_within_query_budget(self, 'quiz-stats-category', args=[self.question.category_id])
+
+    def test_sections_endpoints(self):
+        self.authenticate(self.member_user)
+        assert_within_query_budget(self, 'section-list-create')
+        assert_within_query_budget(self, 'section-detail', args=[self.section.pk])
+        assert_within_query_budget(self, 'content-list-create')
+        assert_within_query_budget(self, 'content-detail', args=[self.content.pk])
+
+    def test_sections_write_endpoints(self):
+        self.authenticate(self.member_user)
+        assert_within_query_budget(self, 'section-list-create', method='post', data={'title': 'Новый раздел'})
+        assert_within_query_budget(self, 'section-detail', args=[self.section.pk], method='patch', data={'title': 'Раздел'})
+        assert_within_query_budget(self, 'section-detail', args=[self.section.pk], method='put', data={'title': 'Раздел'})
+        assert_within_query_budget(self, 'content-list-create', method='post', data={'section': self.section.pk, 'title': 'Лекция'})
+        assert_within_query_budget(self, 'content-detail', args=[self.content.pk], method='patch', data={'title': 'Лекция'})
+        assert_within_query_budget(self, 'content-detail', args=[self.content.pk], method='put',
+                                   data={'section': self.section.pk, 'title': 'Лекция'})
+        assert_within_query_budget(self, 'content-detail', args=[self.content.pk], method='delete')
+        # Содержимое раздела снимается с поискового индекса одним запросом, а не по запросу на объект
+        assert_within_query_budget(self, 'section-detail', args=[self.section.pk], method='delete')
+
+    def test_content_file_endpoints(self):
+        media_root, upload_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, upload_dir)
+        self.authenticate(self.member_user)
+        data = b'x' * 1500
+        with override_settings(MEDIA_ROOT=media_root, CONTENT_UPLOAD_DIR=upload_dir,
+                               CONTENT_UPLOAD_CHUNK_SIZE=1024, SENDFILE_BACKEND=''):
+            response = assert_within_query_budget(self, 'content-upload-create', args=[self.content.pk], method='post',
+                                                  data={'filename': 'lecture.pdf', 'size': len(data)})
+            upload_id = response.data['id']
+            assert_within_query_budget(self, 'content-upload', args=[upload_id])
+            for offset in (0, 1000):
+                assert_within_query_budget(self, 'content-upload', args=[upload_id], method='put',
+                                           data=data[offset:offset + 1000],
+                                           content_type='application/offset+octet-stream',
+                                           HTTP_UPLOAD_OFFSET=str(offset))
+            response = assert_within_query_budget(self, 'content-file', args=[self.content.pk])
+            self.assertEqual(b''.join(response.streaming_content), data)
+
+    def test_search_endpoint(self):
+        self.authenticate(self.member_user)
+        assert_within_query_budget(self, 'search', data={'q': 'content'})
+
+    def test_users_endpoints(self):
+        self.authenticate(self.admin_user)
+        assert_within_query_budget(self, 'user-list')
+        assert_within_query_budget(self, 'user-detail', args=[self.member_user.pk])
+        assert_within_query_budget(self, 'user-detail', args=[self.member_user.pk], method='patch', data={'first_name': 'Иван'})
+        password = 'Very-long-pass-123'
+        assert_within_query_budget(self, 'user-detail', args=[self.member_user.pk], method='put',
+                                   data={'username': 'member_test', 'email': 'member@example.com',
+                                         'password': password, 'password2': password})
+        assert_within_query_budget(self, 'user-detail', args=[self.member_user.pk], method='delete')
+
+
+class QueryBudgetMiddlewareTests(APITestCase):
+    def setUp(self):
+        self.member_user = create_user(username="member_test", password="password123", email="member@example.com")
+        self.client.force_authenticate(user=self.member_user)
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True, CACHE_ENABLED=False)
+    def test_headers(self):
+        """Число запросов, время и повторы возвращаются в заголовках."""
+        Section.objects.create(title="Section", owner=self.member_user)
+        response = self.client.get(reverse('section-list-create'))
+        self.assertEqual(response['X-DB-Queries'], '2')
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertEqual(response['X-DB-Duplicates'], '0')
+        self.assertEqual(response['X-DB-Budget'], '3')
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True, CACHE_ENABLED=False)
+    async def test_async_view_queries_are_counted(self):
+        """Запросы async-представлений, выполненные через sync_to_async в другом потоке, тоже считаются."""
+        question = await Question.objects.acreate(
+            category=await QuestionCategory.objects.acreate(name="Категория"), text="Вопрос", difficulty='easy'
+        )
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.member_user).access_token}'}
+        response = await self.async_client.get(reverse('async-question-detail', args=[question.pk]), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+        self.assertLessEqual(int(response['X-DB-Queries']), int(response['X-DB-Budget']))
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True, QUERY_BUDGETS={'section-list-create': 0})
+    def test_budget_exceeded_logs_warning(self):
+        """Превышение бюджета пишется в лог."""
+        with self.assertLogs('config.middleware', level='WARNING') as logs:
+            self.client.get(reverse('section-list-create'))
+        self.assertIn('section-list-create', logs.output[0])
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True, CACHE_ENABLED=False,
+                       QUERY_BUDGETS={'section-detail': 0, 'section-detail:PATCH': 50})
+    def test_budget_by_method(self):
+        """Изменяющий метод проверяется по бюджету 'имя:МЕТОД', остальные - по бюджету имени URL."""
+        section = Section.objects.create(title="Section", owner=self.member_user)
+        response = self.client.patch(reverse('section-detail', args=[section.pk]), {'title': 'Новое'}, format='json')
+        self.assertEqual(response['X-DB-Budget'], '50')
+        self.assertEqual(self.client.get(reverse('section-detail', args=[section.pk]))['X-DB-Budget'], '0')
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('section-list-create'))
+        self.assertFalse(response.has_header('X-DB-Queries'))
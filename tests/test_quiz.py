@@ -3,11 +3,39 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
-from quiz.models import QuestionCategory, Question, Answer
+from quiz.models import QuestionCategory, Question, Answer, QuizSession, Attempt, QuestionStats, AnswerStats, CategoryStats
+from quiz import adaptive, attempts, sessions, stats
+from unittest import mock
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from sections.models import Section, Content
+from django.db import OperationalError, connection
+from django.core.cache import cache
+from django.db.models import Count, Max
+from unittest import skipUnless
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from quiz import answer_key
+from quiz.models import content_hash
 from rest_framework import permissions
+import gzip
+import importlib
+import io
+import json
 import logging
+import os
+import tempfile
+import threading
 import time
+from array import array
+
+try:
+    import numpy as np
+    from quiz import calibration
+except ImportError:
+    np = calibration = None
 
 logger = logging.getLogger(__name__)
 
@@ -95,4 +123,1005 @@ class QuizTests(APITestCase):
         response_get = self.client.get(url)
         self.assertEqual(response_get.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response_get.data), initial_count + 1)
-        self.assertEqual(response_get.data[-1]['name'], 'New category')
\ No newline at end of file
+        self.assertEqual(response_get.data[-1]['name'], 'New category')
+
+    @override_settings(QUIZ_ANSWER_KEY_ENABLED=False)
+    def test_check_answer_single_query(self):
+        """Проверка одного ответа выполняется одним запросом."""
+        url = reverse('check_answer')
+        data = {'question_id': self.question.pk, 'answer_id': self.correct_answer.pk}
+        with self.assertNumQueries(1):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_check_answer_mismatch(self):
+        """Ответ от другого вопроса отклоняется с кодом 400."""
+        other = Question.objects.exclude(pk=self.question.pk).first()
+        other_answer = other.answers.first()
+        url = reverse('check_answer')
+        data = {'question_id': self.question.pk, 'answer_id': other_answer.pk}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(QUIZ_ANSWER_KEY_ENABLED=False)
+    def test_check_answers_batch(self):
+        """Пакетная проверка возвращает результат по каждой паре и общий счет."""
+        other = Question.objects.exclude(pk=self.question.pk).first()
+        url = reverse('check_answers')
+        data = {'answers': [
+            {'question_id': self.question.pk, 'answer_id': self.correct_answer.pk},
+            {'question_id': self.question.pk, 'answer_id': self.incorrect_answer.pk},
+            {'question_id': other.pk, 'answer_id': self.correct_answer.pk},
+            {'question_id': 99999, 'answer_id': self.correct_answer.pk},
+            {'question_id': other.pk, 'answer_id': 99999},
+        ]}
+        with self.assertNumQueries(2):  # Ответы и проверка существования вопросов для ошибочных пар
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertTrue(results[0]['is_correct'])
+        self.assertFalse(results[1]['is_correct'])
+        self.assertEqual([r.get('code') for r in results[2:]], ['answer_mismatch', 'question_not_found', 'answer_not_found'])
+        self.assertEqual(response.data['total'], 5)
+        self.assertEqual(response.data['correct'], 1)
+        self.assertEqual(response.data['score'], 0.2)
+
+    @override_settings(QUIZ_ANSWER_KEY_ENABLED=False)
+    def test_check_answers_batch_single_query(self):
+        """Пакет из корректных пар проверяется одним запросом."""
+        url = reverse('check_answers')
+        pairs = [{'question_id': a.question_id, 'answer_id': a.pk} for a in Answer.objects.all()]
+        with self.assertNumQueries(1):
+            response = self.client.post(url, {'answers': pairs}, format='json')
+        self.assertEqual(response.data['total'], len(pairs))
+
+    def test_check_answers_batch_empty(self):
+        """Пустой список ответов отклоняется."""
+        response = self.client.post(reverse('check_answers'), {'answers': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def add_questions(self, count):
+        category = QuestionCategory.objects.create(name='Extra')
+        for i in range(count):
+            question = Question.objects.create(category=category, text=f'Q{i}', difficulty='easy')
+            Answer.objects.create(question=question, text='A', is_correct=True)
+            Answer.objects.create(question=question, text='B', is_correct=False)
+
+    def test_question_play_list_embeds_answers(self):
+        """Вопросы для прохождения содержат категорию и ответы, но не раскрывают правильный ответ."""
+        url = reverse('question-play-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        question = response.data['results'][0]
+        self.assertEqual(question['category']['name'], self.question.category.name)
+        self.assertEqual(len(question['answers']), self.question.answers.count())
+        self.assertNotIn('is_correct', question['answers'][0])
+
+    def test_question_play_list_query_count(self):
+        """Страница вопросов для прохождения стоит фиксированное число запросов независимо от размера."""
+        self.add_questions(30)
+        url = reverse('question-play-list')
+        for page_size in (2, 30):
+            with self.assertNumQueries(3):  # COUNT, вопросы с категориями, ответы
+                response = self.client.get(url, {'page_size': page_size})
+            self.assertEqual(len(response.data['results']), page_size)
+
+    def test_question_list_query_count(self):
+        """Категории вопросов загружаются в том же запросе, что и сами вопросы."""
+        self.add_questions(30)
+        url = reverse('question-list-create')
+        with self.assertNumQueries(2):  # COUNT и вопросы с категориями
+            response = self.client.get(url, {'page_size': 30})
+        self.assertEqual(len(response.data['results']), 30)
+
+    def test_question_list_cursor_pagination(self):
+        """В режиме ?cursor= список вопросов не выполняет COUNT."""
+        self.add_questions(10)
+        url = reverse('question-list-create')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'cursor': ''})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertNotIn('count', response.data)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+    def test_answer_list_paginated(self):
+        """Список ответов разбит на страницы."""
+        self.add_questions(30)
+        response = self.client.get(reverse('answer-list-create'))
+        self.assertEqual(response.data['count'], Answer.objects.count())
+        self.assertEqual(len(response.data['results']), 50)
+
+    def test_answer_list_ndjson_stream(self):
+        """?format=ndjson отдает все ответы потоком."""
+        self.add_questions(30)
+        response = self.client.get(reverse('answer-list-create'), {'format': 'ndjson'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), Answer.objects.count())
+        self.assertIn('is_correct', json.loads(lines[0]))
+
+
+    def test_question_list_cached(self):
+        """Повторный запрос той же страницы отдается из кэша без запросов к БД."""
+        url = reverse('question-list-create')
+        first = self.client.get(url, {'page': 1})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get(url, {'page': 1})
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_category_write_invalidates_cached_list(self):
+        """Создание категории поднимает поколение, и список перестраивается."""
+        url = reverse('category-list-create')
+        self.client.get(url)
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.post(url, {'name': 'Cached category'}, format='json')
+        self.client.force_authenticate(user=self.member_user)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data[-1]['name'], 'Cached category')
+
+    @override_settings(CACHE_ENABLED=False)
+    def test_response_cache_disabled(self):
+        """CACHE_ENABLED=False полностью отключает кэш ответов."""
+        url = reverse('question-list-create')
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('X-Cache'))
+
+
+class AnswerKeyTests(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username="admin_test", password="password123", email="admin@example.com")
+        self.client.force_authenticate(user=self.admin_user)
+        call_command('load_quiz_data', stdout=io.StringIO())
+        self.question = Question.objects.first()
+        self.correct_answer = self.question.answers.get(is_correct=True)
+        answer_key.rebuild()
+
+    def test_check_answer_without_queries(self):
+        """При загруженном ключе проверка ответа не обращается к БД, кроме первого чтения текста вопроса."""
+        url = reverse('check_answer')
+        data = {'question_id': self.question.pk, 'answer_id': self.correct_answer.pk}
+        self.assertEqual(answer_key.stats()['texts'], 0)
+        with self.assertNumQueries(1):
+            self.client.post(url, data, format='json')
+        with self.assertNumQueries(0):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_correct'])
+        self.assertEqual(response.data['question_text'], self.question.text)
+        self.assertEqual(answer_key.stats()['texts'], 1)
+
+    def test_counters_are_thread_safe(self):
+        hits = answer_key.stats()['hits']
+        threads = [threading.Thread(target=lambda: [answer_key.record(hits=1) for _ in range(10000)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(answer_key.stats()['hits'], hits + 40000)
+
+    def test_answer_change_invalidates_key(self):
+        """Изменение ответа сбрасывает ключ, и следующая проверка видит новое значение."""
+        self.correct_answer.is_correct = False
+        self.correct_answer.save()
+        url = reverse('check_answer')
+        data = {'question_id': self.question.pk, 'answer_id': self.correct_answer.pk}
+        response = self.client.post(url, data, format='json')
+        self.assertFalse(response.data['is_correct'])
+
+    def test_unknown_answer_falls_back_to_db(self):
+        """Неизвестный ключу ответ проверяется в БД и считается промахом."""
+        misses = answer_key.stats()['misses']
+        url = reverse('check_answer')
+        data = {'question_id': self.question.pk, 'answer_id': 99999}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(answer_key.stats()['misses'], misses + 1)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_answer_key поднимает версию ключа."""
+        version = answer_key.stats()['version']
+        out = io.StringIO()
+        call_command('rebuild_answer_key', stdout=out)
+        self.assertEqual(answer_key.stats()['version'], version + 1)
+        self.assertIn('Answer key rebuilt', out.getvalue())
+
+    def test_stats_superuser_only(self):
+        """Счетчики ключа доступны только суперпользователю."""
+        url = reverse('answer-key-stats')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['loaded'])
+        self.assertEqual(response.data['answers'], Answer.objects.count())
+        member = User.objects.create_user(username="member_test", password="password123", email="member@example.com")
+        self.client.force_authenticate(user=member)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AsyncQuizTests(TestCase):
+    """Асинхронные эндпоинты отвечают так же, как синхронные."""
+
+    def setUp(self):
+        self.member_user = User.objects.create_user(username="member_test", password="password123", email="member@example.com")
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.member_user).access_token}'}
+        call_command('load_quiz_data', stdout=io.StringIO())
+        self.question = Question.objects.first()
+        self.correct_answer = self.question.answers.get(is_correct=True)
+
+    async def test_check_answer(self):
+        url = reverse('async-check-answer')
+        data = {'question_id': self.question.pk, 'answer_id': self.correct_answer.pk}
+        response = await self.async_client.post(url, data, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'question_text': self.question.text, 'is_correct': True})
+
+    async def test_check_answer_not_found(self):
+        url = reverse('async-check-answer')
+        data = {'question_id': 99999, 'answer_id': self.correct_answer.pk}
+        response = await self.async_client.post(url, data, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_check_answers_batch(self):
+        url = reverse('async-check-answers')
+        data = {'answers': [{'question_id': self.question.pk, 'answer_id': self.correct_answer.pk}]}
+        response = await self.async_client.post(url, data, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.json()['score'], 1.0)
+
+    async def test_question_detail(self):
+        url = reverse('async-question-detail', args=[self.question.pk])
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['id'], self.question.pk)
+        self.assertNotIn('is_correct', response.json()['answers'][0])
+
+    async def test_category_list(self):
+        url = reverse('async-category-list')
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({category['name'] for category in response.json()}, {'Млекопитающие', 'Птицы'})
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(reverse('async-category-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_method_not_allowed(self):
+        response = await self.async_client.get(reverse('async-check-answer'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    async def test_authentication_skips_shared_sync_thread(self):
+        """Снимок пользователя читается из кэша без общего потока синхронного кода (thread_sensitive=True)."""
+        from asgiref.sync import sync_to_async
+        from config import cache_backends
+        from users.authentication import get_snapshot
+        await sync_to_async(get_snapshot)(self.member_user.pk)
+        with mock.patch.object(cache_backends, 'sync_to_async', wraps=sync_to_async) as offload, \
+                mock.patch('users.authentication.sync_to_async', side_effect=AssertionError("запрос к БД")):
+            response = await self.async_client.get(reverse('async-category-list'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(offload.call_args_list)
+        self.assertTrue(all(call.kwargs['thread_sensitive'] is False for call in offload.call_args_list))
+
+    def test_benchmark_requires_answers(self):
+        """Без вопросов с ответами benchmark_async сообщает об ошибке, а не падает с IndexError."""
+        Answer.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, 'Нет вопросов с ответами'):
+            call_command('benchmark_async', token='token', stdout=io.StringIO())
+
+
+class LoadQuizDataTests(APITestCase):
+    def write_file(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_rerun_skips_existing_questions(self):
+        """Повторная загрузка не создает дубликаты, а русские подписи сложности приводятся к ключам."""
+        call_command('load_quiz_data', stdout=io.StringIO())
+        questions = Question.objects.count()
+        answers = Answer.objects.count()
+        call_command('load_quiz_data', stdout=io.StringIO())
+        self.assertEqual(Question.objects.count(), questions)
+        self.assertEqual(Answer.objects.count(), answers)
+        self.assertEqual(questions, 2)  # В quiz_data.json два уникальных вопроса
+        self.assertEqual(set(Question.objects.values_list('difficulty', flat=True)), {'easy', 'medium'})
+
+    def test_load_small_batches(self):
+        """Маленький размер пачки дает тот же результат, что и загрузка целиком."""
+        call_command('load_quiz_data', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(Question.objects.count(), 2)
+        self.assertEqual(Answer.objects.count(), 8)
+
+    def test_load_ndjson(self):
+        path = self.write_file('.ndjson', '\n'.join([
+            '{"category": "Рыбы", "question": "Q1", "difficulty": "Сложный", "answers": [{"text": "A", "is_correct": true}]}',
+            '',
+            '{"category": "Рыбы", "question": "Q2", "difficulty": "easy", "answers": []}',
+        ]))
+        call_command('load_quiz_data', path, stdout=io.StringIO())
+        self.assertEqual(QuestionCategory.objects.get(name='Рыбы').questions.count(), 2)
+        self.assertEqual(Question.objects.get(text='Q1').difficulty, 'hard')
+
+    def test_invalid_answer_reported_per_record(self):
+        """Ответ без текста отклоняет только свою запись, остальные загружаются."""
+        path = self.write_file('.ndjson', '\n'.join([
+            '{"category": "Рыбы", "question": "Q1", "difficulty": "easy", "answers": [{"text": "A"}, {"is_correct": true}]}',
+            '{"category": "Рыбы", "question": "Q2", "difficulty": "easy", "answers": [{"text": "B", "is_correct": true}]}',
+        ]))
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('load_quiz_data', path, stdout=stdout, stderr=stderr)
+        self.assertEqual(list(Question.objects.values_list('text', flat=True)), ['Q2'])
+        self.assertIn('1 invalid', stdout.getvalue())
+        self.assertIn('Запись 1 пропущена: у ответа 2 нет текста', stderr.getvalue())
+
+    def test_api_questions_have_content_hash(self):
+        """Вопрос, созданный через API, получает хэш и не дублируется повторной загрузкой."""
+        admin = User.objects.create_superuser(username="admin_test", password="password123")
+        self.client.force_authenticate(user=admin)
+        category = QuestionCategory.objects.create(name="Рыбы")
+        response = self.client.post(reverse('question-list-create'),
+                                    {'category_id': category.pk, 'text': 'Q1', 'difficulty': 'easy'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(Question.objects.get().content_hash, content_hash("Рыбы", 'Q1', 'easy'))
+        path = self.write_file('.ndjson', '{"category": "Рыбы", "question": "Q1", "difficulty": "easy", "answers": []}')
+        call_command('load_quiz_data', path, stdout=io.StringIO())
+        self.assertEqual(Question.objects.count(), 1)
+
+    def test_hash_recomputed_only_when_content_changes(self):
+        """Сохранение других полей не читает категорию; смена текста или категории обновляет хэш."""
+        category = QuestionCategory.objects.create(name="Рыбы")
+        other = QuestionCategory.objects.create(name="Птицы")
+        question = Question.objects.create(category=category, text='Q1', difficulty='easy')
+        question = Question.objects.get(pk=question.pk)
+        question.discrimination = 1.5
+        with CaptureQueriesContext(connection) as queries:
+            question.save()
+            question.save(update_fields=['discrimination'])
+        self.assertFalse([query for query in queries if 'quiz_questioncategory' in query['sql']])
+        question.category_id = other.pk
+        question.save(update_fields=['category_id'])
+        self.assertEqual(Question.objects.get().content_hash, content_hash("Птицы", 'Q1', 'easy'))
+
+    def test_backfill_migration(self):
+        """Миграция заполняет хэш вопросов, загруженных до его появления, и повторная загрузка их пропускает."""
+        from django.apps import apps
+        backfill = importlib.import_module('quiz.migrations.0008_backfill_question_content_hash')
+        category = QuestionCategory.objects.create(name="Рыбы")
+        for text in ('Q1', 'Q2', 'Q3'):
+            Question.objects.create(category=category, text=text, difficulty='easy')
+        Question.objects.update(content_hash='')
+        with mock.patch.object(backfill, 'BATCH_SIZE', 2):
+            backfill.backfill(apps, mock.Mock(connection=connection))
+        self.assertEqual(Question.objects.get(text='Q2').content_hash, content_hash("Рыбы", 'Q2', 'easy'))
+        path = self.write_file('.ndjson', '{"category": "Рыбы", "question": "Q3", "difficulty": "easy", "answers": []}')
+        call_command('load_quiz_data', path, stdout=io.StringIO())
+        self.assertEqual(Question.objects.count(), 3)
+
+    def test_load_csv(self):
+        path = self.write_file('.csv', (
+            'category,question,difficulty,answer,is_correct\n'
+            'Рыбы,Q1,Средний,A,true\n'
+            'Рыбы,Q1,Средний,B,false\n'
+            'Рыбы,Q2,Легкий,C,1\n'
+        ))
+        call_command('load_quiz_data', path, stdout=io.StringIO())
+        question = Question.objects.get(text='Q1')
+        self.assertEqual(question.answers.count(), 2)
+        self.assertTrue(question.answers.get(text='A').is_correct)
+        self.assertEqual(Question.objects.get(text='Q2').difficulty, 'easy')
+
+
+class GenerateDataTests(TestCase):
+    options = dict(users=5, categories=3, questions=40, answers_per_question=3, sections=10, contents=200,
+                   batch_size=7, stdout=io.StringIO())
+
+    def test_generates_requested_rows(self):
+        call_command('generate_data', **self.options)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(QuestionCategory.objects.count(), 3)
+        self.assertEqual(Question.objects.count(), 40)
+        self.assertEqual(Answer.objects.count(), 120)
+        self.assertEqual(Answer.objects.filter(is_correct=True).count(), 40)  # Ровно один верный ответ на вопрос
+        self.assertEqual(Section.objects.count(), 10)
+        self.assertEqual(Content.objects.count(), 200)
+        # Перекос: самый большой раздел заметно больше среднего
+        largest = Section.objects.annotate(size=Count('contents')).aggregate(largest=Max('size'))['largest']
+        self.assertGreater(largest, 200 / 10 * 2)
+
+    def test_sections_owned_only_by_generated_users(self):
+        admin = User.objects.create_superuser(username="admin_test", password="password123")
+        call_command('generate_data', **self.options)
+        self.assertFalse(Section.objects.filter(owner=admin).exists())
+        # Повторный запуск без --users использует пользователей прошлого запуска
+        call_command('generate_data', **{**self.options, 'users': 0})
+        self.assertEqual(User.objects.count(), 6)
+        self.assertFalse(Section.objects.filter(owner=admin).exists())
+
+    def test_same_seed_same_data(self):
+        call_command('generate_data', seed=7, **self.options)
+        first = list(Question.objects.order_by('id').values_list('text', 'difficulty'))
+        Question.objects.all().delete()
+        QuestionCategory.objects.all().delete()
+        User.objects.all().delete()
+        call_command('generate_data', seed=7, **self.options)
+        self.assertEqual(list(Question.objects.order_by('id').values_list('text', 'difficulty')), first)
+
+
+class ExportQuizDataTests(APITestCase):
+    def setUp(self):
+        call_command('generate_data', users=0, categories=3, questions=25, sections=0, contents=0,
+                     stdout=io.StringIO())
+        Question.objects.create(category=QuestionCategory.objects.first(), text='Без ответов, "с кавычками"', difficulty='hard')
+
+    def snapshot(self):
+        return sorted(
+            (question.category.name, question.text, question.difficulty,
+             tuple(question.answers.order_by('id').values_list('text', 'is_correct')))
+            for question in Question.objects.select_related('category')
+        )
+
+    def test_round_trip_through_load_quiz_data(self):
+        """Выгрузка в каждом формате загружается обратно без потерь."""
+        expected = self.snapshot()
+        for name in ('quiz.json', 'quiz.ndjson', 'quiz.csv', 'quiz.csv.gz'):
+            with self.subTest(name=name), tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, name)
+                call_command('export_quiz_data', path, chunk_size=4, stdout=io.StringIO())
+                Question.objects.all().delete()
+                QuestionCategory.objects.all().delete()
+                call_command('load_quiz_data', path, stdout=io.StringIO())
+                self.assertEqual(self.snapshot(), expected)
+
+    def test_answers_prefetched_per_chunk(self):
+        """Ответы дочитываются одним запросом на пачку вопросов, а не на каждый вопрос."""
+        from quiz.exporters import iter_records
+        with self.assertNumQueries(1 + 3):  # Вопросы и 26 / 10 -> 3 пачки ответов
+            records = list(iter_records(chunk_size=10))
+        self.assertEqual(len(records), 26)
+
+    def test_export_endpoint(self):
+        url = reverse('quiz-export')
+        self.client.force_authenticate(User.objects.create_user(username="member", password="password123"))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(User.objects.create_superuser(username="admin", password="password123"))
+        response = self.client.get(url, {'file_format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 26)
+        self.assertEqual(set(json.loads(lines[0])), {'category', 'question', 'difficulty', 'answers'})
+
+        response = self.client.get(url, {'file_format': 'csv', 'gzip': '1'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="quiz_data.csv.gz"')
+        rows = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(rows[0], 'category,question,difficulty,answer,is_correct')
+        self.assertEqual(len(rows), 1 + 25 * 4 + 1)
+
+        self.assertEqual(self.client.get(url, {'file_format': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkCreateQuestionsTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_superuser(username="admin", password="password123"))
+        self.category = QuestionCategory.objects.create(name="Рыбы")
+        self.url = reverse('question-bulk-create')
+
+    def payload(self, count, **overrides):
+        return {'questions': [
+            {
+                'category': self.category.pk,
+                'text': f'Вопрос {i}',
+                'difficulty': 'easy',
+                'answers': [{'text': 'Да', 'is_correct': True}, {'text': 'Нет'}],
+                **overrides,
+            }
+            for i in range(count)
+        ]}
+
+    def test_bulk_create(self):
+        response = self.client.post(self.url, self.payload(50), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 50)
+        self.assertEqual(response.data['answers'], 100)
+        self.assertEqual(sorted(response.data['ids']), list(Question.objects.order_by('id').values_list('id', flat=True)))
+        question = Question.objects.get(pk=response.data['ids'][0])
+        self.assertEqual(question.category, self.category)
+        self.assertTrue(question.content_hash)
+        self.assertEqual(list(question.answers.order_by('id').values_list('text', 'is_correct')), [('Да', True), ('Нет', False)])
+
+    def test_invalid_item_rejects_whole_list(self):
+        """Ошибка в любом вопросе отклоняет весь список, ошибки возвращаются по позициям."""
+        data = self.payload(3)
+        data['questions'][1]['category'] = 999999
+        data['questions'][2]['answers'] = [{'text': 'Нет', 'is_correct': False}]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data['questions']), 3)
+        self.assertIn('answers', response.data['questions'][2])
+        self.assertEqual(Question.objects.count(), 0)
+
+        response = self.client.post(self.url, self.payload(2, text='Один и тот же'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['questions'][0], {})
+        self.assertIn('text', response.data['questions'][1])
+
+    def test_requires_superuser(self):
+        self.client.force_authenticate(User.objects.create_user(username="member", password="password123"))
+        response = self.client.post(self.url, self.payload(1), format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_single_create_sets_category(self):
+        response = self.client.post(reverse('question-list-create'),
+                                    {'category_id': self.category.pk, 'text': 'Q', 'difficulty': 'hard'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['category']['id'], self.category.pk)
+
+
+class QuestionFilterTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username="member", password="password123"))
+        self.fish = QuestionCategory.objects.create(name="Рыбы")
+        self.birds = QuestionCategory.objects.create(name="Птицы")
+        Question.objects.create(category=self.fish, text="Какая рыба самая большая?", difficulty='easy')
+        Question.objects.create(category=self.fish, text="Где живет сом?", difficulty='easy')
+        Question.objects.create(category=self.fish, text="Какая рыба самая быстрая?", difficulty='hard')
+        Question.objects.create(category=self.birds, text="Какая птица самая большая?", difficulty='easy')
+
+    def test_filters(self):
+        url = reverse('question-list-create')
+        response = self.client.get(url, {'category': self.fish.pk, 'difficulty': 'easy'})
+        self.assertEqual(response.data['count'], 2)
+        response = self.client.get(url, {'category': self.fish.pk, 'text__startswith': 'Какая'})
+        self.assertEqual([item['difficulty'] for item in response.data['results']], ['easy', 'hard'])
+        response = self.client.get(reverse('question-play-list'), {'category': self.birds.pk, 'cursor': ''})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(self.client.get(url, {'difficulty': 'unknown'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters_are_part_of_cache_key(self):
+        url = reverse('question-list-create')
+        self.assertEqual(self.client.get(url, {'category': self.fish.pk}).data['count'], 3)
+        self.assertEqual(self.client.get(url, {'category': self.birds.pk}).data['count'], 1)
+
+    @skipUnless(connection.vendor == 'sqlite', "План запроса проверяется на SQLite")
+    def test_filtered_page_uses_index(self):
+        plan = Question.objects.filter(category_id=self.fish.pk, difficulty='easy').order_by('id')[:5].explain()
+        self.assertIn('question_cat_diff_id_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)  # Порядок по id берется из индекса, без сортировки
+
+
+class QuizSessionTests(APITestCase):
+    def setUp(self):
+        self.member_user = User.objects.create_user(username="member_test", password="password123")
+        self.client.force_authenticate(user=self.member_user)
+        self.category = QuestionCategory.objects.create(name="Рыбы")
+        for difficulty, count in (('easy', 10), ('medium', 6), ('hard', 4)):
+            for i in range(count):
+                question = Question.objects.create(category=self.category, text=f"{difficulty} {i}", difficulty=difficulty)
+                Answer.objects.create(question=question, text="Да", is_correct=True)
+                Answer.objects.create(question=question, text="Нет")
+
+    def start(self, **data):
+        response = self.client.post(reverse('quiz-session-start'), {'category': self.category.pk, **data}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return response.data
+
+    def test_session_flow(self):
+        session = self.start(count=5)
+        self.assertEqual(len({question['id'] for question in session['questions']}), 5)
+        self.assertNotIn('is_correct', session['questions'][0]['answers'][0])
+
+        answer_url = reverse('quiz-session-answer', args=[session['id']])
+        for question in session['questions'][:3]:
+            correct = Answer.objects.get(question_id=question['id'], is_correct=True)
+            response = self.client.post(answer_url, {'question_id': question['id'], 'answer_id': correct.pk}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        wrong = Answer.objects.get(question_id=session['questions'][3]['id'], is_correct=False)
+        self.client.post(answer_url, {'question_id': session['questions'][3]['id'], 'answer_id': wrong.pk}, format='json')
+        # Первый ответ окончательный
+        response = self.client.post(answer_url, {'question_id': session['questions'][3]['id'], 'answer_id': wrong.pk - 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.get(reverse('quiz-session-detail', args=[session['id']])).data['answered'], 4)
+
+        response = self.client.post(reverse('quiz-session-finish', args=[session['id']]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['correct'], response.data['total'], response.data['score']), (3, 5, 0.6))
+        self.assertEqual([result['is_correct'] for result in response.data['results']], [True, True, True, False, False])
+        self.assertEqual(QuizSession.objects.get().correct, 3)
+
+        self.assertEqual(self.client.post(reverse('quiz-session-finish', args=[session['id']])).status_code,
+                         status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.get(reverse('quiz-session-detail', args=[session['id']])).data['score'], 0.6)
+
+    def test_answer_validation(self):
+        session = self.start(count=2)
+        answer_url = reverse('quiz-session-answer', args=[session['id']])
+        other = Question.objects.exclude(id__in=[q['id'] for q in session['questions']]).first()
+        response = self.client.post(answer_url, {'question_id': other.pk, 'answer_id': other.answers.first().pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(answer_url, {'question_id': session['questions'][0]['id'], 'answer_id': other.answers.first().pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Чужой сеанс не виден
+        self.client.force_authenticate(User.objects.create_user(username="other", password="password123"))
+        self.assertEqual(self.client.get(reverse('quiz-session-detail', args=[session['id']])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_difficulty_mix(self):
+        session = self.start(count=10, difficulty={'easy': 0.5, 'hard': 0.5})
+        difficulties = [question['difficulty'] for question in session['questions']]
+        # Сложных вопросов только 4 - недостающие добираются из легких
+        self.assertEqual((difficulties.count('easy'), difficulties.count('hard')), (6, 4))
+        self.assertEqual(sessions.allocate(10, {'easy': 0.5, 'medium': 0.3, 'hard': 0.2}, {'easy': 10, 'medium': 6, 'hard': 4}),
+                         {'easy': 5, 'medium': 3, 'hard': 2})
+
+        response = self.client.post(reverse('quiz-session-start'),
+                                    {'category': self.category.pk, 'count': 8, 'difficulty': {'hard': 1}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_draw_uses_cached_id_lists(self):
+        """Случайная выборка не сортирует таблицу в случайном порядке; повторная выборка идет без запросов к Question."""
+        with CaptureQueriesContext(connection) as queries:
+            sessions.draw(self.category.pk, 5)
+        self.assertTrue(queries.captured_queries)
+        self.assertFalse(any('RANDOM()' in q['sql'].upper() or 'NEWID' in q['sql'].upper() for q in queries.captured_queries))
+        with CaptureQueriesContext(connection) as queries:
+            sessions.draw(self.category.pk, 5)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        Question.objects.create(category=self.category, text="new", difficulty='easy')
+        self.assertEqual(sum(len(ids) for ids in sessions.question_ids(self.category.pk, sessions.DIFFICULTIES).values()), 21)
+
+
+@override_settings(QUIZ_ATTEMPT_LOG_ENABLED=True)
+class AttemptLogTests(APITestCase):
+    def setUp(self):
+        self.member_user = User.objects.create_user(username="member_test", password="password123")
+        self.client.force_authenticate(user=self.member_user)
+        category = QuestionCategory.objects.create(name="Рыбы")
+        self.question = Question.objects.create(category=category, text="Щука - рыба?", difficulty='easy')
+        self.correct = Answer.objects.create(question=self.question, text="Да", is_correct=True)
+        self.wrong = Answer.objects.create(question=self.question, text="Нет")
+        # Без фонового потока: тест сам решает, когда записывать буфер
+        self.buffer = attempts.AttemptBuffer(batch_size=100, interval=60, max_size=1000, background=False)
+        patcher = mock.patch.object(attempts, '_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_check_answer_buffers_attempts(self):
+        self.client.post(reverse('check_answer'), {'question_id': self.question.pk, 'answer_id': self.correct.pk}, format='json')
+        pairs = [{'question_id': self.question.pk, 'answer_id': self.wrong.pk}, {'question_id': 99999, 'answer_id': self.wrong.pk}]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('check_answers'), {'answers': pairs}, format='json')
+        self.assertFalse(any('quiz_attempt' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual(Attempt.objects.count(), 0)
+        self.assertEqual(self.buffer.stats()['pending'], 2)
+
+        self.buffer.flush()
+        self.assertEqual(
+            list(Attempt.objects.order_by('id').values_list('user_id', 'answer_id', 'is_correct')),
+            [(self.member_user.pk, self.correct.pk, True), (self.member_user.pk, self.wrong.pk, False)],
+        )
+
+    def test_overflow_policies(self):
+        def make(n):
+            return [Attempt(user_id=self.member_user.pk, question_id=self.question.pk, answer_id=self.correct.pk,
+                            is_correct=True, created_at=timezone.now()) for _ in range(n)]
+
+        written = []
+        newest = attempts.AttemptBuffer(batch_size=10, interval=60, max_size=3, writer=lambda batch: written.append(batch) or len(batch),
+                                        background=False)
+        batch = make(5)
+        newest.add(batch)
+        newest.flush()
+        self.assertEqual(written[0], batch[:3])
+        self.assertEqual(newest.stats()['dropped'], 2)
+
+        oldest = attempts.AttemptBuffer(batch_size=10, interval=60, max_size=3, policy=attempts.DROP_OLDEST,
+                                        writer=lambda batch: written.append(batch) or len(batch), background=False)
+        oldest.add(batch)
+        oldest.flush()
+        self.assertEqual(written[1], batch[2:])
+
+    def test_background_flush_by_size_and_stop(self):
+        batches = []
+        flushed = threading.Event()
+
+        def writer(batch):
+            batches.append(len(batch))
+            flushed.set()
+            return len(batch)
+
+        attempt = Attempt(user_id=1, question_id=1, answer_id=1, is_correct=True, created_at=timezone.now())
+        buffer = attempts.AttemptBuffer(batch_size=3, interval=60, max_size=100, writer=writer)
+        buffer.add([attempt] * 3)
+        self.assertTrue(flushed.wait(5))
+        buffer.add([attempt])
+        buffer.stop()
+        self.assertEqual(batches, [3, 1])
+        self.assertEqual(buffer.stats()['written'], 4)
+
+    def test_deleted_question_does_not_lose_batch(self):
+        other = Question.objects.create(category=self.question.category, text="Удаленный", difficulty='easy')
+        other_answer = Answer.objects.create(question=other, text="Да", is_correct=True)
+        attempts.record(self.member_user, [
+            {'question_id': self.question.pk, 'answer_id': self.correct.pk, 'is_correct': True},
+            {'question_id': other.pk, 'answer_id': other_answer.pk, 'is_correct': True},
+        ])
+        other.delete()
+        self.buffer.flush()
+        self.assertEqual(list(Attempt.objects.values_list('question_id', flat=True)), [self.question.pk])
+
+
+class DriverError(Exception):
+    """Ошибка драйвера БД в виде pyodbc: SQLSTATE первым аргументом."""
+
+
+class QuizStatsTests(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username="admin_test", password="password123", email="admin@example.com")
+        self.member_user = User.objects.create_user(username="member_test", password="password123")
+        self.category = QuestionCategory.objects.create(name="Птицы")
+        self.other_category = QuestionCategory.objects.create(name="Звери")
+        self.question = Question.objects.create(category=self.category, text="Пингвин летает?", difficulty='easy')
+        self.yes = Answer.objects.create(question=self.question, text="Да")
+        self.no = Answer.objects.create(question=self.question, text="Нет", is_correct=True)
+        self.second = Question.objects.create(category=self.category, text="Сова - птица?", difficulty='easy')
+        self.second_yes = Answer.objects.create(question=self.second, text="Да", is_correct=True)
+
+    def write(self, *pairs):
+        attempts.write_attempts([
+            Attempt(user_id=self.member_user.pk, question_id=answer.question_id, answer_id=answer.pk,
+                    is_correct=answer.is_correct, created_at=timezone.now())
+            for answer in pairs
+        ])
+
+    def test_batches_increment_rollups(self):
+        self.write(self.no, self.no, self.yes, self.second_yes)
+        self.write(self.yes)
+        self.assertEqual(QuestionStats.objects.values_list('attempts', 'correct').get(pk=self.question.pk), (4, 2))
+        self.assertEqual(CategoryStats.objects.values_list('attempts', 'correct').get(pk=self.category.pk), (5, 3))
+        self.assertEqual(dict(AnswerStats.objects.values_list('pk', 'picks')), {self.no.pk: 2, self.yes.pk: 2, self.second_yes.pk: 1})
+        self.assertEqual(stats.compare(stats.compute(), stats.current()), {})
+
+    def test_deleting_and_moving_questions_keeps_rollups_consistent(self):
+        self.write(self.no, self.yes, self.second_yes)
+        self.yes.delete()
+        self.assertEqual(stats.compare(stats.compute(), stats.current()), {})
+        self.second.category = self.other_category
+        self.second.save()
+        self.assertEqual(CategoryStats.objects.values_list('attempts', 'correct').get(pk=self.other_category.pk), (1, 1))
+        self.question.delete()
+        self.assertEqual(stats.compare(stats.compute(), stats.current()), {})
+
+    def test_move_with_update_fields(self):
+        """Перенос сохраняется и через update_fields с любым именем поля; другие поля не читают прежнюю категорию."""
+        self.write(self.second_yes)
+        second = Question.objects.get(pk=self.second.pk)
+        with CaptureQueriesContext(connection) as queries:
+            second.discrimination = 1.2
+            second.save(update_fields=['discrimination'])
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT') and '"quiz_question"' in query['sql']])
+        for field, category in (('category_id', self.other_category), ('category', self.category)):
+            second.category = category
+            second.save(update_fields=[field])
+            self.assertEqual(stats.compare(stats.compute(), stats.current()), {})
+        self.assertEqual(CategoryStats.objects.values_list('attempts', 'correct').get(pk=self.other_category.pk), (0, 0))
+
+    def test_rows_locked_in_pk_order_before_updates(self):
+        """Строки сводки блокируются одним запросом по возрастанию pk, и только затем обновляются группами."""
+        stats.increment(QuestionStats, ('attempts', 'correct'), {self.question.pk: (1, 0), self.second.pk: (1, 1)})
+        deltas = {self.second.pk: (1, 0), self.question.pk: (2, 0)}
+        with CaptureQueriesContext(connection) as queries:
+            stats.increment(QuestionStats, ('attempts', 'correct'), deltas, create=False)
+        sql = [query['sql'] for query in queries]
+        self.assertTrue(sql[0].startswith('SELECT') and sql[0].endswith('ORDER BY "quiz_questionstats"."question_id" ASC'), sql[0])
+        self.assertTrue(all(statement.startswith('UPDATE') for statement in sql[1:]))
+
+    def test_stats_endpoints(self):
+        self.write(self.no, self.yes, self.second_yes)
+        self.client.force_authenticate(user=self.member_user)
+        self.assertEqual(self.client.get(reverse('quiz-stats')).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quiz-stats'))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data, [
+            {'id': self.category.pk, 'name': "Птицы", 'attempts': 3, 'correct': 2, 'correct_rate': 0.6667},
+            {'id': self.other_category.pk, 'name': "Звери", 'attempts': 0, 'correct': 0, 'correct_rate': None},
+        ])
+
+        response = self.client.get(reverse('quiz-stats-category', args=[self.category.pk]))
+        question = response.data['results'][0]
+        self.assertEqual((question['attempts'], question['correct'], question['correct_rate']), (2, 1, 0.5))
+        self.assertEqual([answer['picks'] for answer in question['answers']], [1, 1])
+
+    def test_deadlocked_batch_is_retried(self):
+        """Пачка, выбранная жертвой взаимоблокировки, повторяется целиком и учитывается в сводках один раз."""
+        merge = stats.merge
+        calls = []
+
+        def deadlock_once(batch, categories):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise OperationalError("deadlocked") from DriverError('40001', "Transaction was deadlocked on lock resources (1205)")
+            merge(batch, categories)
+
+        with mock.patch.object(stats, 'merge', deadlock_once), mock.patch.object(attempts.time, 'sleep'), \
+                self.assertLogs('quiz.attempts', level='WARNING'):
+            self.write(self.no, self.yes)
+        self.assertEqual(calls, [2, 2])
+        self.assertEqual(Attempt.objects.count(), 2)
+        self.assertEqual(stats.compare(stats.compute(), stats.current()), {})
+
+        with mock.patch.object(stats, 'merge', side_effect=OperationalError("no such table")):
+            with self.assertRaises(OperationalError):
+                self.write(self.no)
+
+    def test_is_deadlock_checks_sqlstate(self):
+        """Взаимоблокировку определяет SQLSTATE ошибки драйвера, а не число в тексте сообщения."""
+        def error(sqlstate, message):
+            try:
+                raise OperationalError(message) from DriverError(sqlstate, message)
+            except OperationalError as e:
+                return e
+
+        self.assertTrue(attempts.is_deadlock(error('40001', "[40001] deadlocked (1205)")))
+        self.assertFalse(attempts.is_deadlock(error('42S02', "Invalid object name 'quiz_1205'")))
+        self.assertFalse(attempts.is_deadlock(OperationalError("deadlock 1205 40001")))
+
+    def test_rebuild_command_repairs_drift(self):
+        self.write(self.no, self.yes)
+        QuestionStats.objects.filter(pk=self.question.pk).update(attempts=10)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_quiz_stats', '--check', stdout=io.StringIO())
+        call_command('rebuild_quiz_stats', stdout=io.StringIO())
+        call_command('rebuild_quiz_stats', '--check', stdout=io.StringIO())
+        self.assertEqual(QuestionStats.objects.get(pk=self.question.pk).attempts, 2)
+
+
+@skipUnless(np, "numpy не установлен")
+class CalibrationTests(TestCase):
+    def test_fit_recovers_difficulty(self):
+        rng = np.random.default_rng(7)
+        ability, difficulty = rng.normal(size=400), np.linspace(-2, 2, 20)
+        users, questions = rng.integers(0, 400, 16000), rng.integers(0, 20, 16000)
+        correct = rng.random(16000) < 1 / (1 + np.exp(difficulty[questions] - ability[users]))
+        for model in calibration.MODELS:
+            with calibration.Responses.from_arrays(np.arange(400), np.arange(20), users, questions,
+                                                   np.ones(16000), correct) as responses:
+                result = calibration.fit(responses, model=model, chunk_size=1000)
+            self.assertTrue(result.converged, model)
+            self.assertGreater(np.corrcoef(result.difficulty, difficulty)[0, 1], 0.95, model)
+            self.assertEqual(result.attempts.sum(), 16000)
+
+    def test_command_saves_difficulty_and_suggests_labels(self):
+        category = QuestionCategory.objects.create(name="Калибровка")
+        users = [User.objects.create_user(username=f"user_{i}", password="password123") for i in range(20)]
+        labelled = {
+            'easy': Question.objects.create(category=category, text="Легкий?", difficulty='easy'),
+            'hard': Question.objects.create(category=category, text="Сложный?", difficulty='hard'),
+            'rare': Question.objects.create(category=category, text="Редкий?", difficulty='medium'),
+        }
+        answers = {key: Answer.objects.create(question=question, text="Да", is_correct=True) for key, question in labelled.items()}
+        now = timezone.now()
+        rows = []
+        for i, user in enumerate(users):
+            # "Легкий" вопрос почти никто не решает, "сложный" решают почти все
+            rows.append(Attempt(user=user, question=labelled['easy'], answer=answers['easy'], is_correct=i < 2, created_at=now))
+            rows.append(Attempt(user=user, question=labelled['hard'], answer=answers['hard'], is_correct=i >= 2, created_at=now))
+        rows.append(Attempt(user=users[0], question=labelled['rare'], answer=answers['rare'], is_correct=True, created_at=now))
+        Attempt.objects.bulk_create(rows)
+
+        out = io.StringIO()
+        call_command('calibrate_questions', '--min-attempts', '10', '--chunk-size', '7', stdout=out, stderr=io.StringIO())
+        self.assertIn(f"Question {labelled['easy'].pk}: easy -> hard", out.getvalue())
+        self.assertIn(f"Question {labelled['hard'].pk}: hard -> easy", out.getvalue())
+        labelled['easy'].refresh_from_db()
+        labelled['rare'].refresh_from_db()
+        self.assertGreater(labelled['easy'].calibrated_difficulty, 0.5)
+        self.assertIsNotNone(labelled['easy'].discrimination)
+        self.assertIsNone(labelled['rare'].calibrated_difficulty)
+
+
+class AdaptiveTests(APITestCase):
+    def setUp(self):
+        self.member_user = User.objects.create_user(username="member_test", password="password123")
+        self.client.force_authenticate(user=self.member_user)
+        self.category = QuestionCategory.objects.create(name="Адаптивная")
+        self.questions = []
+        for i in range(9):
+            question = Question.objects.create(category=self.category, text=f"Вопрос {i}", difficulty='medium')
+            self.questions.append(question)
+            Answer.objects.create(question=question, text="Да", is_correct=True)
+            Answer.objects.create(question=question, text="Нет")
+        # Трудности -2..2 с шагом 0.5: вопрос 4 - средний
+        for i, question in enumerate(self.questions):
+            question.calibrated_difficulty = (i - 4) / 2
+            question.save()
+
+    def state(self, ability):
+        index = adaptive.get_index(self.category.pk)
+        return index, {'ability': ability, 'information': 1.0, 'answered': 0, 'last': None, 'served': None,
+                       'seen': bytearray((len(index) + 7) // 8)}
+
+    def test_pick_nearest_unseen(self):
+        index, state = self.state(1.1)
+        self.assertEqual(adaptive.pick(index, state, window=1), self.questions[6].pk)
+        adaptive.update(state, index, index.rank(self.questions[6].pk), True)
+        self.assertGreater(state['ability'], 1.1)
+        self.assertNotEqual(adaptive.pick(index, state, window=1), self.questions[6].pk)
+        for question in self.questions:
+            adaptive.update(state, index, index.rank(question.pk), True)
+        self.assertIsNone(adaptive.pick(index, state))
+
+    def test_pick_is_fast_on_large_category(self):
+        ids = array('q', range(1, 50001))
+        difficulty = array('d', (((i * 7919) % 50000) / 10000 - 2.5 for i in range(50000)))
+        index = adaptive.CategoryIndex(0, 0, ids, difficulty, array('d', [1.0]) * 50000)
+        state = {'ability': 0.3, 'seen': bytearray(6250)}
+        started = time.perf_counter()
+        for _ in range(1000):
+            adaptive.pick(index, state)
+        self.assertLess((time.perf_counter() - started) / 1000, 0.001)
+
+    def test_adaptive_flow_and_replay(self):
+        response = self.client.get(reverse('quiz-adaptive-next', args=[self.category.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['ability'], 0.0)
+        question_id = response.data['question']['id']
+        self.assertIn(question_id, [q.pk for q in self.questions[3:6]])
+
+        correct = Answer.objects.get(question_id=question_id, is_correct=True)
+        url = reverse('quiz-adaptive-answer', args=[self.category.pk])
+        with mock.patch('quiz.attempts.record') as record:
+            response = self.client.post(url, {'question_id': question_id, 'answer_id': correct.pk}, format='json')
+        record.assert_called_once()
+        self.assertTrue(response.data['is_correct'])
+        self.assertGreater(response.data['ability'], 0)
+        self.assertNotEqual(response.data['question']['id'], question_id)
+        ability, served = response.data['ability'], response.data['question']['id']
+
+        # Повтор ответа и ответ на невыданный вопрос отклоняются и способность не меняют
+        unserved = next(q for q in self.questions if q.pk not in (question_id, served))
+        for other_id in (question_id, unserved.pk):
+            answer = Answer.objects.get(question_id=other_id, is_correct=True)
+            with mock.patch('quiz.attempts.record') as record:
+                response = self.client.post(url, {'question_id': other_id, 'answer_id': answer.pk}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            record.assert_not_called()
+        state = cache.get(adaptive.state_key(self.member_user.pk, self.category.pk))
+        self.assertEqual(round(state['ability'], 3), ability)
+        self.assertEqual(state['served'], served)
+        response = self.client.get(reverse('quiz-adaptive-next', args=[self.category.pk]))
+        self.assertEqual(response.data['question']['id'], served)
+
+        # Пока обрабатывается другой запрос пользователя, состояние не меняется
+        cache.add(adaptive.lock_key(self.member_user.pk, self.category.pk), 1)
+        response = self.client.get(reverse('quiz-adaptive-next', args=[self.category.pk]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        cache.delete(adaptive.lock_key(self.member_user.pk, self.category.pk))
+
+        other = QuestionCategory.objects.create(name="Другая")
+        foreign = Question.objects.create(category=other, text="Чужой", difficulty='easy')
+        foreign_answer = Answer.objects.create(question=foreign, text="Да", is_correct=True)
+        response = self.client.post(url, {'question_id': foreign.pk, 'answer_id': foreign_answer.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Без состояния в кэше верные ответы восстанавливаются по журналу попыток
+        cache.delete(adaptive.state_key(self.member_user.pk, self.category.pk))
+        Attempt.objects.bulk_create([
+            Attempt(user=self.member_user, question=question, answer=question.answers.get(is_correct=True),
+                    is_correct=True, created_at=timezone.now())
+            for question in self.questions[:8]
+        ])
+        response = self.client.get(reverse('quiz-adaptive-next', args=[self.category.pk]))
+        self.assertEqual(response.data['question']['id'], self.questions[8].pk)
+        self.assertEqual(response.data['answered'], 8)
@@ -0,0 +1,118 @@
+#test_search.py
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from quiz.models import QuestionCategory, Question
+from sections.models import Section, Content
+from search.backends import document_count
+from search.models import SearchEntry
+from search.tokenizer import stem, tokenize
+import io
+
+User = get_user_model()
+
+
+class TokenizerTests(TestCase):
+    def test_inflected_forms_share_stem(self):
+        self.assertEqual({stem(word) for word in ('рыба', 'рыбы', 'рыбой', 'рыбу')}, {'рыб'})
+        self.assertEqual(stem('плавать'), stem('плавает'))
+
+    def test_stop_words_and_case(self):
+        self.assertEqual(tokenize('Где живёт ЁЖ и рыба?'), [stem('живет'), stem('еж'), 'рыб'])
+        self.assertEqual(tokenize('Python 3'), ['python', '3'])
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username="admin", password="password123")
+        self.member_user = User.objects.create_user(username="member", password="password123")
+        self.other_user = User.objects.create_user(username="other", password="password123")
+        self.category = QuestionCategory.objects.create(name="Природа")
+        self.fish = Question.objects.create(category=self.category, text="Какая рыба живет в реке?", difficulty='easy')
+        self.bird = Question.objects.create(category=self.category, text="Какая птица не летает?", difficulty='easy')
+        own = Section.objects.create(title="Мой раздел", owner=self.member_user)
+        foreign = Section.objects.create(title="Чужой раздел", owner=self.other_user)
+        self.own_content = Content.objects.create(section=own, title="Рыбы озер", text="Про окуня")
+        self.foreign_content = Content.objects.create(section=foreign, title="Рыбой питаются", text="Про цапель")
+        self.url = reverse('search')
+
+    def search(self, user, **params):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [(hit['type'], hit['id']) for hit in response.data['results']], response.data
+
+    def test_inflected_match_and_title_weight(self):
+        """Запрос "рыбой" находит "рыба" и "Рыбы"; совпадение в заголовке ранжируется выше."""
+        hits, data = self.search(self.member_user, q='рыбой')
+        self.assertEqual(hits, [('content', self.own_content.pk), ('question', self.fish.pk)])
+        self.assertEqual(data['results'][1]['object']['text'], self.fish.text)
+
+    def test_more_matched_terms_rank_higher(self):
+        hits, _ = self.search(self.member_user, q='рыба в реке', type='question')
+        self.assertEqual(hits[0], ('question', self.fish.pk))
+
+    def test_content_scoped_to_owner(self):
+        hits, _ = self.search(self.member_user, q='рыба', type='content')
+        self.assertEqual(hits, [('content', self.own_content.pk)])
+        hits, _ = self.search(self.admin_user, q='рыба', type='content')
+        self.assertCountEqual(hits, [('content', self.own_content.pk), ('content', self.foreign_content.pk)])
+
+    def test_index_follows_save_and_delete(self):
+        self.bird.text = "Какая рыба умеет летать?"
+        self.bird.save()
+        hits, _ = self.search(self.member_user, q='летать', type='question')
+        self.assertEqual(hits, [('question', self.bird.pk)])
+        self.fish.delete()
+        hits, _ = self.search(self.member_user, q='рыба', type='question')
+        self.assertEqual(hits, [('question', self.bird.pk)])
+        self.assertFalse(SearchEntry.objects.filter(kind='question', object_id=self.fish.pk).exists())
+
+    def test_cascade_deletes_leave_index(self):
+        """Объекты, удаленные каскадом с разделом, пользователем или категорией, снимаются с индекса."""
+        self.own_content.section.delete()
+        self.other_user.delete()
+        self.category.delete()
+        self.assertFalse(SearchEntry.objects.exists())
+
+    def test_bulk_created_questions_are_indexed(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(reverse('question-bulk-create'), {'questions': [
+            {'category': self.category.pk, 'text': f'Сколько лап у паука {i}?', 'difficulty': 'easy',
+             'answers': [{'text': 'Восемь', 'is_correct': True}]}
+            for i in range(3)
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        hits, _ = self.search(self.member_user, q='пауки')
+        self.assertCountEqual(hits, [('question', pk) for pk in response.data['ids']])
+
+    def test_document_count_cached_until_change(self):
+        """Счетчики документов для IDF не пересчитываются на каждый поиск, но следуют за изменениями."""
+        kinds = ['question', 'content']
+        self.assertEqual(document_count(kinds), 4)
+        with self.assertNumQueries(0):
+            self.assertEqual(document_count(kinds), 4)
+        Content.objects.create(section=self.own_content.section, title="Раки", text="Про раков")
+        self.assertEqual(document_count(kinds), 5)
+        self.bird.delete()
+        self.assertEqual(document_count(['question']), 1)
+
+    def test_pagination(self):
+        Question.objects.bulk_create([
+            Question(category=self.category, text=f"Рыба номер {i}", difficulty='easy') for i in range(15)
+        ])
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        hits, data = self.search(self.member_user, q='рыба', type='question', page_size=10)
+        self.assertEqual(data['count'], 16)
+        self.assertEqual(len(hits), 10)
+        self.assertIsNotNone(data['next'])
+
+    def test_query_required(self):
+        self.client.force_authenticate(user=self.member_user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'q': 'рыба', 'type': 'user'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search(self.member_user, q='и в на')[1]['count'], 0)
@@ -3,8 +3,20 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
-from sections.models import Section, Content
+from sections.models import Section, Content, ContentUpload
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import override_settings
 from rest_framework.test import force_authenticate  # Import force_authenticate
+from django.db import connection
+from django.utils import timezone
+from datetime import timedelta
+from unittest import mock, skipUnless
+from sections import uploads
+import io
+import os
+import shutil
+import tempfile
 
 User = get_user_model()
 
@@ -90,4 +102,209 @@ class SectionTests(APITestCase):
         admin_section = Section.objects.create(title="Section 2", owner=other_user, description='test')
         url = reverse('section-detail', args=[admin_section.pk])
         response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_content_list_cursor_pagination(self):
+        """В режиме ?cursor= страницы идут по ключу id без запроса COUNT."""
+        self.client.force_authenticate(user=self.member_user)
+        section = Section.objects.create(title="Section 1", owner=self.member_user)
+        for i in range(25):
+            Content.objects.create(section=section, title=f"Content {i}")
+        url = reverse('content-list-create')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'cursor': ''})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        titles = [item['title'] for item in response.data['results']]
+        self.assertEqual(titles, [f"Content {i}" for i in range(10)])
+
+        seen = list(titles)
+        next_url = response.data['next']
+        while next_url:
+            response = self.client.get(next_url)
+            seen.extend(item['title'] for item in response.data['results'])
+            next_url = response.data['next']
+        self.assertEqual(seen, [f"Content {i}" for i in range(25)])
+
+    def test_section_list_page_number_pagination_kept(self):
+        """Без ?cursor= сохраняется постраничная навигация с count."""
+        self.client.force_authenticate(user=self.member_user)
+        Section.objects.create(title="Section 1", owner=self.member_user)
+        response = self.client.get(reverse('section-list-create'))
+        self.assertEqual(response.data['count'], 1)
+
+    def test_content_list_filters(self):
+        """Содержимое фильтруется по разделу и дате создания."""
+        self.client.force_authenticate(user=self.member_user)
+        first = Section.objects.create(title="First", owner=self.member_user)
+        second = Section.objects.create(title="Second", owner=self.member_user)
+        old = Content.objects.create(section=first, title="Old")
+        Content.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+        Content.objects.create(section=first, title="New")
+        Content.objects.create(section=second, title="Other")
+        url = reverse('content-list-create')
+
+        response = self.client.get(url, {'section': first.pk})
+        self.assertEqual([item['title'] for item in response.data['results']], ["Old", "New"])
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = self.client.get(url, {'section': first.pk, 'created_at__gte': since})
+        self.assertEqual([item['title'] for item in response.data['results']], ["New"])
+
+    @skipUnless(connection.vendor == 'sqlite', "План запроса проверяется на SQLite")
+    def test_content_filter_uses_index(self):
+        """Фильтр по разделу с сортировкой списка (ORDER BY id) идет по индексу без отдельной сортировки."""
+        plan = Content.objects.filter(section_id=1).order_by('id').explain()
+        self.assertIn('content_section_id_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    @skipUnless(connection.vendor == 'sqlite', "План запроса проверяется на SQLite")
+    def test_content_date_filter_uses_index(self):
+        """Отбор содержимого раздела за период (created_at__gte/lt в ContentFilter) идет по индексу (section, created_at)."""
+        now = timezone.now()
+        plan = Content.objects.filter(
+            section_id=1, created_at__gte=now - timedelta(days=7), created_at__lt=now,
+        ).values('pk').explain()
+        self.assertIn('content_section_created_idx', plan)
+
+
+class ContentFileTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.addCleanup(shutil.rmtree, self.upload_dir)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, CONTENT_UPLOAD_DIR=self.upload_dir, CONTENT_UPLOAD_CHUNK_SIZE=1024,
+            SENDFILE_BACKEND='',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.member_user = User.objects.create_user(username="member_test", password="password123")
+        self.other_user = User.objects.create_user(username="other_test", password="password123")
+        section = Section.objects.create(title="Lectures", owner=self.member_user)
+        self.content = Content.objects.create(section=section, title="Lecture 1")
+        self.data = bytes(range(256)) * 10  # 2560 байт
+        self.client.force_authenticate(user=self.member_user)
+
+    def start_upload(self, size=None):
+        response = self.client.post(
+            reverse('content-upload-create', args=[self.content.pk]),
+            {'filename': 'lecture.pdf', 'size': size or len(self.data)}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return reverse('content-upload', args=[response.data['id']])
+
+    def put_chunk(self, url, offset, chunk):
+        return self.client.put(url, chunk, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunked_upload_with_resume(self):
+        url = self.start_upload()
+        response = self.put_chunk(url, 0, self.data[:1000])
+        self.assertEqual(response.data['offset'], 1000)
+        self.assertFalse(response.data['complete'])
+
+        # Повтор уже принятой части отклоняется с текущим смещением, с которого клиент продолжает
+        response = self.put_chunk(url, 0, self.data[:1000])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.get(url)['Upload-Offset'], '1000')
+
+        self.put_chunk(url, 1000, self.data[1000:2000])
+        response = self.put_chunk(url, 2000, self.data[2000:])
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertTrue(response.data['complete'])
+        self.content.refresh_from_db()
+        with self.content.file.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertFalse(ContentUpload.objects.exists())
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_chunk_is_read_before_lock(self):
+        """Тело части читается вне транзакции, а смещение сверяется заново уже под блокировкой."""
+        url = self.start_upload()
+        upload = ContentUpload.objects.get()
+        receive = uploads.receive
+        depth = []
+
+        def racing_receive(stream, length):
+            depth.append(len(connection.savepoint_ids))
+            # Пока часть читается, параллельный запрос успевает записать свою часть с тем же смещением
+            ContentUpload.objects.filter(pk=upload.pk).update(offset=1000)
+            return receive(stream, length)
+
+        outer = len(connection.savepoint_ids)
+        with mock.patch.object(uploads, 'receive', side_effect=racing_receive):
+            response = self.put_chunk(url, 0, self.data[:1000])
+        self.assertEqual(depth, [outer])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Upload-Offset'], '1000')
+        self.assertEqual(os.path.getsize(uploads.part_path(upload)), 0)
+        self.assertEqual(os.listdir(self.upload_dir), [f'{upload.pk}.part'])
+
+    def test_upload_limits(self):
+        url = self.start_upload()
+        self.assertEqual(self.put_chunk(url, 0, b'x' * 1025).status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.put_chunk(url, 0, self.data[:1000])
+        self.put_chunk(url, 1000, self.data[1000:2000])
+        self.assertEqual(self.put_chunk(url, 2000, b'x' * 1000).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.other_user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            self.client.post(reverse('content-upload-create', args=[self.content.pk]),
+                             {'filename': 'x.pdf', 'size': 10}, format='json').status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+
+    def test_cancel_and_cleanup(self):
+        url = self.start_upload()
+        self.put_chunk(url, 0, self.data[:100])
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+        self.start_upload()
+        ContentUpload.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        call_command('cleanup_uploads', stdout=io.StringIO())
+        self.assertFalse(ContentUpload.objects.exists())
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_range_and_conditional_download(self):
+        self.content.file.save('lecture.pdf', ContentFile(self.data))
+        url = reverse('content-file', args=[self.content.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.data)}')
+        self.assertEqual(b''.join(response.streaming_content), self.data[100:200])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.data[-10:])
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=5000-').status_code,
+                         status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        # Неверный диапазон (конец раньше начала) игнорируется - файл отдается целиком
+        response = self.client.get(url, HTTP_RANGE='bytes=5-3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        # If-Range с устаревшим ETag - файл отдается целиком
+        response = self.client.get(url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.other_user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(SENDFILE_BACKEND='x-accel-redirect', SENDFILE_URL='/protected/')
+    def test_sendfile_download(self):
+        self.content.file.save('lecture.pdf', ContentFile(self.data))
+        response = self.client.get(reverse('content-file', args=[self.content.pk]))
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/' + self.content.file.name)
+        self.assertEqual(response.content, b'')
@@ -3,6 +3,22 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
+import json
+from unittest import mock
+import io
+import os
+import shutil
+import tempfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.authentication import snapshot_key
+from django.core.cache import cache
+from PIL import Image
+from users import imaging, renditions
+from sections.models import Section
 from tests.utils import create_user, create_superuser, get_admin_user, create_member_user  # utils.py находится в папке tests
 from users.serializers import UserSerializer  # serializers.py находится в папке users
 from users.permissions import IsSuperUser, IsSelf  # permissions.py находится в папке users
@@ -115,3 +131,175 @@ class UserTests(APITestCase):
         url = reverse('user-detail', args=[other_user.pk])
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_list_cursor_pagination(self):
+        """Список пользователей поддерживает навигацию по ключу ?cursor=."""
+        for i in range(12):
+            create_user(username=f"user_{i}", password="password123", email=f"user_{i}@example.com")
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('user-list'), {'cursor': '', 'page_size': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+        self.assertNotIn('count', response.data)
+
+    def test_user_list_paginated_by_default(self):
+        """Список пользователей по умолчанию разбит на страницы."""
+        for i in range(12):
+            create_user(username=f"user_{i}", password="password123", email=f"user_{i}@example.com")
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('user-list'))
+        self.assertEqual(response.data['count'], User.objects.count())
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_user_list_ndjson_stream(self):
+        """?format=ndjson отдает всех пользователей потоком, по одному на строку."""
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('user-list'), {'format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['id'] for row in rows], list(User.objects.order_by('id').values_list('id', flat=True)))
+        self.assertNotIn('password', rows[0])
+
+    def test_user_list_ndjson_member_denied(self):
+        """Потоковый режим подчиняется тем же правам доступа."""
+        self.client.force_authenticate(user=self.member_user)
+        response = self.client.get(reverse('user-list'), {'format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+def make_image(size=(1200, 800), image_format='JPEG', **options):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+class ProfilePictureTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, PROFILE_PICTURE_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.member_user = create_member_user(username="member_test", password="password123", email="member@example.com")
+        self.client.force_authenticate(user=self.member_user)
+        self.url = reverse('user-detail', args=[self.member_user.pk])
+
+    def upload(self, data, name='avatar.jpg'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(self.url, {'profile_picture': SimpleUploadedFile(name, data)}, format='multipart')
+
+    def test_renditions_generated_after_upload(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        response = self.upload(make_image(exif=exif.tobytes()))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+        renditions = self.client.get(self.url).data['profile_picture_renditions']
+        self.assertEqual(set(renditions), {'small', 'medium', 'large'})
+        version = User.objects.get(pk=self.member_user.pk).profile_picture_version
+        path = os.path.join(self.media_root, 'profile_pictures', 'renditions', str(self.member_user.pk), version)
+        self.assertTrue(renditions['large']['webp'].endswith(f'/{version}/large.webp'))
+        with Image.open(os.path.join(path, 'large.jpeg')) as image:
+            self.assertEqual(image.size, (512, 341))
+            self.assertNotIn('exif', image.info)
+        with Image.open(os.path.join(path, 'small.webp')) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(max(image.size), 64)
+
+        # Новое фото - новые копии, прежние удаляются
+        self.upload(make_image(size=(300, 300)), name='second.png')
+        new_version = User.objects.get(pk=self.member_user.pk).profile_picture_version
+        self.assertNotEqual(new_version, version)
+        self.assertFalse(os.path.exists(path))
+
+    def test_unchanged_picture_not_regenerated(self):
+        self.upload(make_image())
+        user = User.objects.get(pk=self.member_user.pk)
+        version = user.profile_picture_version
+        with mock.patch('users.renditions.schedule') as schedule, self.captureOnCommitCallbacks(execute=True):
+            user.first_name = 'Иван'
+            user.save()
+        schedule.assert_not_called()
+        self.assertEqual(User.objects.get(pk=user.pk).profile_picture_version, version)
+
+    @override_settings(PROFILE_PICTURE_MAX_PIXELS=1000)
+    def test_rejects_too_many_pixels_and_non_images(self):
+        response = self.upload(make_image(size=(100, 100)))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.upload(b'not an image', name='avatar.jpg')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_render_caps_pixels(self):
+        source = os.path.join(self.media_root, 'big.png')
+        with open(source, 'wb') as f:
+            f.write(make_image(size=(200, 200), image_format='PNG'))
+        with self.assertRaises(imaging.ImageTooLarge):
+            imaging.render(source, os.path.join(self.media_root, 'out'), {'small': 64}, max_pixels=100)
+
+    def test_render_keeps_newer_renditions(self):
+        """Удаляются только копии прежних исходников, а не каталог фото, которое строится параллельно."""
+        target = os.path.join(self.media_root, 'out')
+        sources = []
+        for name in ('old.png', 'new.png'):
+            sources.append(os.path.join(self.media_root, name))
+            with open(sources[-1], 'wb') as f:
+                f.write(make_image(size=(100, 100), image_format='PNG'))
+        os.utime(sources[0], ns=(1, 10 ** 18))
+        os.utime(sources[1], ns=(1, 2 * 10 ** 18))
+        old_key = imaging.render(sources[0], target, {'small': 64}, max_pixels=10 ** 6)
+        new_key = imaging.render(sources[1], target, {'small': 64}, max_pixels=10 ** 6)
+        self.assertEqual(os.listdir(target), [new_key])
+
+        # Запоздавшее построение прежнего фото не трогает готовые копии нового
+        imaging.render(sources[0], target, {'small': 64}, max_pixels=10 ** 6)
+        self.assertEqual(sorted(os.listdir(target)), sorted([old_key, new_key]))
+        imaging.render(sources[1], target, {'small': 64}, max_pixels=10 ** 6)
+        self.assertEqual(os.listdir(target), [new_key])
+
+    @override_settings(PROFILE_PICTURE_WORKERS=1)
+    def test_pool_uses_spawn(self):
+        with mock.patch.object(renditions, '_pool', None), \
+                mock.patch.object(renditions, 'ProcessPoolExecutor') as executor:
+            renditions.get_pool()
+        self.assertEqual(executor.call_args.kwargs['mp_context'].get_start_method(), 'spawn')
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.member_user = create_member_user(username="member_test", password="password123", email="member@example.com")
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.member_user).access_token}')
+        cache.delete(snapshot_key(self.member_user.pk))
+
+    def get(self, url_name):
+        """Запрос и число запросов к таблице пользователей за него."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        user_queries = [q['sql'] for q in queries.captured_queries if 'FROM "users_user"' in q['sql']]
+        return response, len(user_queries)
+
+    def test_snapshot_cached(self):
+        response, user_queries = self.get('section-list-create')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(user_queries, 1)
+        response, user_queries = self.get('section-list-create')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(user_queries, 0)
+
+    def test_user_changes_take_effect(self):
+        self.get('section-list-create')
+        self.assertEqual(self.get('user-list')[0].status_code, status.HTTP_403_FORBIDDEN)
+        self.member_user.is_superuser = True
+        self.member_user.save()
+        self.assertEqual(self.get('user-list')[0].status_code, status.HTTP_200_OK)
+        self.member_user.is_active = False
+        self.member_user.save()
+        self.assertEqual(self.get('section-list-create')[0].status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_snapshot_user_usable_as_owner(self):
+        """Пользователь из снимка подходит для ORM, остальные поля загружаются при обращении."""
+        response = self.client.post(reverse('section-list-create'), {'title': 'Моя', 'description': ''}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['owner'], self.member_user.username)
+        self.assertEqual(Section.objects.get().owner_id, self.member_user.pk)
@@ -1,6 +1,11 @@
 #utils.py
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from config.middleware import get_query_budget, sql_shape
 
 User = get_user_model()
 
@@ -66,3 +71,23 @@ def get_member_user():
     user.set_password('qwerty')
     user.save()
     return user
+
+
+def assert_within_query_budget(testcase, url_name, args=None, method='get', data=None, **extra):
+    """
+    Выполняет запрос к эндпоинту и проверяет, что число SQL-запросов не превышает
+    его бюджета из QUERY_BUDGETS. При превышении выводит все выполненные запросы.
+    extra передается клиенту (заголовки, content_type для тел не в JSON).
+    """
+    budget = get_query_budget(url_name, method)
+    if 'content_type' not in extra:
+        extra['format'] = 'json'
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(testcase.client, method)(reverse(url_name, args=args), data, **extra)
+    testcase.assertLess(response.status_code, 400, f"{url_name}: {response.status_code} {getattr(response, 'data', '')}")
+    testcase.assertLessEqual(
+        len(queries), budget,
+        f"{method.upper()} {url_name}: {len(queries)} запросов при бюджете {budget}:\n"
+        + "\n".join(sql_shape(query['sql']) for query in queries.captured_queries),
+    )
+    return response
@@ -0,0 +1,105 @@
+#users\authentication.py
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+# Поля, которых достаточно для проверки прав; остальные поля пользователя загружаются лениво
+SNAPSHOT_FIELDS = ('id', 'username', 'is_superuser', 'is_staff', 'is_active')
+
+
+def snapshot_key(user_id):
+    return f'{settings.CACHE_MIDDLEWARE_KEY_PREFIX}user:snapshot:{user_id}'
+
+
+def get_snapshot(user_id):
+    """Снимок пользователя из кэша, при промахе - одним запросом к БД. None, если пользователя нет."""
+    key = snapshot_key(user_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*SNAPSHOT_FIELDS).first()
+        if snapshot is not None:
+            cache.set(key, snapshot, timeout=settings.USER_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+async def aget_snapshot(user_id):
+    """
+    Асинхронный вариант get_snapshot: кэш читается без общего потока синхронного кода
+    (TwoTierCache.aget), к БД через sync_to_async обращается только промах.
+    """
+    key = snapshot_key(user_id)
+    snapshot = await cache.aget(key)
+    if snapshot is None:
+        snapshot = await User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*SNAPSHOT_FIELDS).afirst()
+        if snapshot is not None:
+            await cache.aset(key, snapshot, timeout=settings.USER_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def invalidate_snapshot(user_id):
+    """Сбрасывает снимок сразу и еще раз после фиксации транзакции, как bump_generation."""
+    key = snapshot_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def user_from_snapshot(snapshot):
+    """
+    Экземпляр User из снимка: поля снимка загружены, остальные отложены и читаются из БД
+    только при обращении (как у .only()), поэтому такой объект можно передавать в ORM.
+    """
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in snapshot]
+    # from_db ждет значения в порядке полей модели
+    return User.from_db(router.db_for_read(User), fields, [snapshot[field] for field in fields])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без запроса к БД на каждый запрос: пользователь строится из ID в токене
+    и снимка в кэше. Снимок сбрасывается при изменении пользователя (users/signals.py) и живет
+    не дольше USER_SNAPSHOT_TIMEOUT, так что блокировка и смена прав вступают в силу быстро
+    даже после изменений в обход сигналов (queryset.update()).
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Проверка отзыва сравнивает хэш пароля - нужен полный пользователь
+            return super().get_user(validated_token)
+        return self.user_from(get_snapshot(self.user_id(validated_token)))
+
+    async def aauthenticate(self, request):
+        """Асинхронный вариант authenticate для async-представлений (quiz/async_views.py)."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        # Разбор и проверка подписи токена не обращаются к БД и кэшу
+        validated_token = self.get_validated_token(raw_token)
+        if api_settings.CHECK_REVOKE_TOKEN:
+            user = await sync_to_async(super().get_user)(validated_token)
+        else:
+            user = self.user_from(await aget_snapshot(self.user_id(validated_token)))
+        return user, validated_token
+
+    def user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def user_from(self, snapshot):
+        if snapshot is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not snapshot['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user_from_snapshot(snapshot)
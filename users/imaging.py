@@ -0,0 +1,92 @@
+#users\imaging.py
+# Выполняется в процессах пула (users/renditions.py): модуль не импортирует Django,
+# чтобы дочерний процесс, запущенный через spawn, поднимался быстро.
+import hashlib
+import os
+import shutil
+
+from PIL import Image, ImageOps
+
+# Формат файла -> (формат Pillow, параметры сохранения). Метаданные (EXIF, ICC, XMP) не передаются.
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def source_key(path):
+    """Ключ версии исходника: меняется при замене файла, даже если имя совпало с прежним."""
+    stat = os.stat(path)
+    return hashlib.sha1(f'{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:16]
+
+
+def rendition_path(target_dir, key, name, extension):
+    return os.path.join(target_dir, key, f'{name}.{extension}')
+
+
+def prepare(image):
+    """Поворот по EXIF и приведение к RGB/RGBA; прозрачность сохраняется только для WebP."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+def save(image, path, extension):
+    image_format, options = FORMATS[extension]
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    # Запись во временный файл и os.replace: параллельная генерация не оставит половину файла
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    image.save(tmp_path, image_format, **options)
+    os.replace(tmp_path, path)
+
+
+def render(source, target_dir, sizes, max_pixels):
+    """
+    Строит уменьшенные копии source (имя -> максимальная сторона) во всех форматах FORMATS
+    в каталоге target_dir/<ключ исходника>. Уже построенные копии не пересчитываются.
+    Когда набор готов, удаляются копии прежних исходников. Возвращает ключ.
+    """
+    key = source_key(source)
+    key_dir = os.path.join(target_dir, key)
+    pending = {
+        name: [extension for extension in FORMATS if not os.path.exists(rendition_path(target_dir, key, name, extension))]
+        for name in sizes
+    }
+    if any(pending.values()):
+        os.makedirs(key_dir, exist_ok=True)
+        with Image.open(source) as original:
+            # Размер известен из заголовка, до декодирования пикселей
+            if original.width * original.height > max_pixels:
+                raise ImageTooLarge(f'{original.width}x{original.height} больше {max_pixels} пикселей')
+            # JPEG декодируется сразу в уменьшенном масштабе (1/2, 1/4, 1/8)
+            largest = max(sizes.values())
+            original.draft('RGB', (largest, largest))
+            image = prepare(original)
+        # От большей копии к меньшей: каждая следующая уменьшается из предыдущей
+        for name, size in sorted(sizes.items(), key=lambda item: -item[1]):
+            image = image.copy()
+            image.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)
+            for extension in pending[name]:
+                save(image, rendition_path(target_dir, key, name, extension), extension)
+
+    # Готовый каталог получает время изменения исходника, и удаляются только каталоги старше него.
+    # Каталог более нового фото, копии которого строятся параллельно, создан позже и остается.
+    source_mtime = os.stat(source).st_mtime_ns
+    os.utime(key_dir, ns=(source_mtime, source_mtime))
+    for entry in os.listdir(target_dir):
+        path = os.path.join(target_dir, entry)
+        try:
+            older = entry != key and os.stat(path).st_mtime_ns < source_mtime
+        except FileNotFoundError:
+            continue
+        if older:
+            shutil.rmtree(path, ignore_errors=True)
+    return key
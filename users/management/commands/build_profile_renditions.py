@@ -0,0 +1,27 @@
+from concurrent.futures import Future
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from users import renditions
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Builds profile picture renditions for users that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Проверить всех пользователей с фото, а не только без копий')
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        if not options['all']:
+            users = users.filter(profile_picture_version='')
+        jobs = [
+            renditions.schedule(pk, name)
+            for pk, name in users.order_by('pk').values_list('pk', 'profile_picture').iterator()
+        ]
+        # Готовые копии не пересчитываются, поэтому --all дешев для уже обработанных фото
+        failed = sum(1 for job in jobs if job is None or (isinstance(job, Future) and job.exception() is not None))
+        self.stdout.write(self.style.SUCCESS(f'Renditions built for {len(jobs) - failed} users, {failed} failed'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.12 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_version',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+    ]
@@ -11,6 +11,8 @@ class User(AbstractUser):
     phone_number = models.CharField(validators=[phone_regex], max_length=17, blank=True, null=True, verbose_name="Номер телефона")
     birth_date = models.DateField(blank=True, null=True, verbose_name="Дата рождения")
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True, verbose_name="Фото профиля")
+    # Ключ готовых уменьшенных копий фото (users/renditions.py); пусто, пока копии строятся
+    profile_picture_version = models.CharField(max_length=16, blank=True, default='', editable=False)
 
     class Meta:
         verbose_name = "Пользователь"
@@ -0,0 +1,7 @@
+#users\paginators.py
+from config.pagination import CursorOptionalPagination
+
+class UserResultsSetPagination(CursorOptionalPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
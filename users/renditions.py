@@ -0,0 +1,101 @@
+#users\renditions.py
+import logging
+import multiprocessing
+import posixpath
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connections
+
+from . import imaging
+
+logger = logging.getLogger(__name__)
+
+# Имя копии -> максимальная сторона в пикселях
+RENDITIONS = {
+    'small': 64,
+    'medium': 256,
+    'large': 512,
+}
+RENDITION_DIR = 'profile_pictures/renditions'
+
+_pool = None
+
+
+def get_pool():
+    """
+    Пул процессов создается при первой загрузке фото: декодирование не занимает потоки запросов и GIL.
+    Процессы запускаются через spawn: fork многопоточного сервера унаследовал бы блокировки, захваченные
+    другими потоками (логирование, кэш, соединения с БД), и дочерний процесс мог бы зависнуть.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.PROFILE_PICTURE_WORKERS,
+                                    mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def user_dir(user_id):
+    return f'{RENDITION_DIR}/{user_id}'
+
+
+def rendition_urls(user, request=None):
+    """URL копий фото профиля по имени и формату или None, пока копии текущего фото не готовы."""
+    if not user.profile_picture or not user.profile_picture_version:
+        return None
+    urls = {}
+    for name in RENDITIONS:
+        urls[name] = {}
+        for extension in imaging.FORMATS:
+            url = default_storage.url(posixpath.join(user_dir(user.pk), user.profile_picture_version, f'{name}.{extension}'))
+            urls[name][extension] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def schedule(user_id, source_name):
+    """
+    Ставит построение копий в пул процессов (PROFILE_PICTURE_WORKERS = 0 - в текущем потоке).
+    Готовность записывается в profile_picture_version, только если фото с тех пор не сменилось.
+    """
+    args = (
+        default_storage.path(source_name),
+        default_storage.path(user_dir(user_id)),
+        RENDITIONS,
+        settings.PROFILE_PICTURE_MAX_PIXELS,
+    )
+    if not settings.PROFILE_PICTURE_WORKERS:
+        try:
+            key = imaging.render(*args)
+        except Exception:
+            logger.warning("Не удалось построить копии фото пользователя %s (%s)", user_id, source_name, exc_info=True)
+            return None
+        store_version(user_id, source_name, key)
+        return key
+    future = get_pool().submit(imaging.render, *args)
+    future.add_done_callback(lambda done: finished(done, user_id, source_name))
+    return future
+
+
+def finished(future, user_id, source_name):
+    """Вызывается в служебном потоке пула: соединение с БД этого потока закрывается после записи."""
+    try:
+        key = future.result()
+    except Exception:
+        logger.warning("Не удалось построить копии фото пользователя %s (%s)", user_id, source_name, exc_info=True)
+        return
+    try:
+        close_old_connections()
+        store_version(user_id, source_name, key)
+    finally:
+        connections.close_all()
+
+
+def store_version(user_id, source_name, key):
+    get_user_model().objects.filter(pk=user_id, profile_picture=source_name).update(profile_picture_version=key)
+
+
+def remove(user_id):
+    shutil.rmtree(default_storage.path(user_dir(user_id)), ignore_errors=True)
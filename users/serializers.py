@@ -2,7 +2,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
-from .validators import ContainsLetterValidator
+from . import renditions
+from .validators import ContainsLetterValidator, validate_profile_picture
 from django.core.exceptions import ValidationError
 from django.core.validators import MinLengthValidator  # Импортируем валидатор длины
 
@@ -11,15 +12,21 @@ User = get_user_model()
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
     password2 = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'}) # Добавим поле для подтверждения пароля
+    # Изображение проверяется только по заголовку, без декодирования в потоке запроса
+    profile_picture = serializers.FileField(validators=[validate_profile_picture], required=False, allow_null=True)
+    profile_picture_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ('id', 'username', 'email', 'phone_number', 'birth_date', 'profile_picture', 'password', 'password2') # Добавим password2
+        fields = ('id', 'username', 'email', 'phone_number', 'birth_date', 'profile_picture', 'profile_picture_renditions', 'password', 'password2') # Добавим password2
         extra_kwargs = {
             'password': {'write_only': True, 'required': True, 'style': {'input_type': 'password'}},
             'email': {'required': True}, # Сделаем email обязательным
         }
 
+    def get_profile_picture_renditions(self, user):
+        return renditions.rendition_urls(user, self.context.get('request'))
+
     def validate_password(self, password):
         validator = ContainsLetterValidator()
         try:
@@ -0,0 +1,50 @@
+#users\signals.py
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from . import renditions
+from .authentication import SNAPSHOT_FIELDS, invalidate_snapshot
+from .models import User
+
+
+def picture_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=User)
+def remember_profile_picture(sender, instance, **kwargs):
+    # Значение поля берется без дескриптора, чтобы не создавать FieldFile для каждой строки списка
+    instance._profile_picture_name = picture_name(instance.__dict__.get('profile_picture'))
+
+
+@receiver(post_save, sender=User)
+def profile_picture_changed(sender, instance, update_fields=None, **kwargs):
+    """После загрузки нового фото копии строятся заново, прежние становятся недоступны сразу."""
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+    name = picture_name(instance.profile_picture)
+    if name == instance._profile_picture_name:
+        return
+    instance._profile_picture_name = name
+    if instance.profile_picture_version:
+        instance.profile_picture_version = ''
+        User.objects.filter(pk=instance.pk).update(profile_picture_version='')
+    if name:
+        transaction.on_commit(lambda: renditions.schedule(instance.pk, name))
+    else:
+        transaction.on_commit(lambda: renditions.remove(instance.pk))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot(sender, instance, update_fields=None, **kwargs):
+    """Снимок для CachedJWTAuthentication устаревает при изменении пользователя (кроме last_login и т.п.)."""
+    if update_fields is not None and not set(update_fields) & set(SNAPSHOT_FIELDS):
+        return
+    invalidate_snapshot(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def remove_renditions(sender, instance, **kwargs):
+    transaction.on_commit(lambda: renditions.remove(instance.pk))
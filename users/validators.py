@@ -1,6 +1,10 @@
 #users\validators.py
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext as _
+from PIL import Image
+
+PROFILE_PICTURE_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
 
 class ContainsLetterValidator:
     def validate(self, password, user=None):
@@ -13,4 +17,28 @@ class ContainsLetterValidator:
     def get_help_text(self):
         return _(
             "Ваш пароль должен содержать хотя бы одну букву."
-        )
\ No newline at end of file
+        )
+
+
+def validate_profile_picture(file):
+    """
+    Проверяет фото профиля по заголовку: формат и число пикселей. Пиксели не декодируются -
+    это делает пул процессов при построении копий (users/renditions.py).
+    """
+    try:
+        with Image.open(file) as image:
+            image_format, (width, height) = image.format, image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise ValidationError(_('Загрузите корректное изображение.'), code='invalid_image')
+    finally:
+        file.seek(0)
+    if image_format not in PROFILE_PICTURE_FORMATS:
+        raise ValidationError(
+            _('Поддерживаются форматы: %(formats)s.') % {'formats': ', '.join(PROFILE_PICTURE_FORMATS)},
+            code='invalid_image_format',
+        )
+    if width * height > settings.PROFILE_PICTURE_MAX_PIXELS:
+        raise ValidationError(
+            _('Изображение больше %(pixels)s пикселей.') % {'pixels': settings.PROFILE_PICTURE_MAX_PIXELS},
+            code='image_too_large',
+        )
@@ -3,6 +3,8 @@ from rest_framework import generics, status
 from django.contrib.auth import get_user_model
 from .serializers import UserSerializer
 from .permissions import IsSuperUser, IsSelf
+from .paginators import UserResultsSetPagination
+from config.streaming import NDJSONStreamMixin
 from rest_framework.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
@@ -12,14 +14,16 @@ logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
-class UserList(generics.ListCreateAPIView):
+class UserList(NDJSONStreamMixin, generics.ListCreateAPIView):
     """
     API view для просмотра списка пользователей и создания новых пользователей.
     Доступно только для суперпользователей.
+    Список разбит на страницы; ?format=ndjson отдает всю таблицу потоком.
     """
-    queryset = User.objects.all()
+    queryset = User.objects.order_by('id')
     serializer_class = UserSerializer
     permission_classes = [IsSuperUser]  # Только суперпользователи могут просматривать и создавать
+    pagination_class = UserResultsSetPagination
 
     def perform_create(self, serializer):
         """
@@ -31,7 +35,7 @@ class UserList(generics.ListCreateAPIView):
         """
         Логирует заголовок Authorization для отладки.
         """
-        logger.debug(f"Authorization header: {request.META.get('HTTP_AUTHORIZATION')}")
+        logger.debug("Authorization header: %s", request.META.get('HTTP_AUTHORIZATION'))
         return super().get(request, *args, **kwargs)
 
 